@@ -6,3 +6,22 @@ UAVSAR WebPy : Toolbox to download UAVSAR data from (password-protected) ASF
 import uavsar_insar_download
 import uavsar_polsar_download
 import http_retrieve 
+import download_queue
+import line_manifest
+import uavsar_batch_download
+import download_cache
+import async_download
+import retry_policy
+import throttle
+import folder_index
+import product_name
+import line_catalog
+import download_plan
+import annotation
+import raster_reader
+import stream_stage
+import raster_subset
+import remote_raster
+import tiled_raster
+import transfer_metrics
+import trace_events
@@ -0,0 +1,328 @@
+"""
+annotation.py  :  Fast, cached reader for UAVSAR annotation (.ann) files
+
+Every line of an annotation file is a keyword, an optional unit in parentheses,
+and a value, with comments after a semicolon::
+
+   mlc_pwr.set_rows          (pixels)        = 3747          ; number of lines
+   Date of Acquisition       (&)             = 28-Sep-2010 18:56:45 UTC
+
+:func:`read_annotation` returns an :class:`Annotation` holding every value
+(numbers already converted) and unit, and the parts the rest of the package
+works with in structured form: the layout of each product (:class:`ProductLayout`),
+the corner coordinates, the numbers of looks, and the acquisition dates.
+
+Parsed annotations can be kept in an :class:`AnnotationCache` on disk, keyed by
+path and checked against the modification time and size of the file, so an
+archive of thousands of annotations is scanned again (:func:`scan_annotations`)
+without re-parsing any that did not change.
+
+Options
+-------
+   $UAVSAR_ANN_CACHE  :  cache file [~/.uavsar_ann_cache]
+
+See Also
+--------
+:ref:`raster_reader`, :ref:`line_catalog`
+"""
+from __future__ import print_function, division
+import os,re,time
+import cPickle as pickle
+
+__title__      = 'annotation.py'
+__author__     = 'UAVSAR_WebPy contributors'
+__email__      = ''
+__created__    = 'October 2026'
+__modified__   = ''
+__version__    = '1.0'
+__status__     = 'Development'
+__conditions__ = 'Use at your own risk.'
+__license__    = """
+Copyright (C) 2026   UAVSAR_WebPy contributors
+--------------------------------------------------------------------
+GNU Licensed
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+--------------------------------------------------------------------
+"""
+
+CACHE_FILE = os.path.join('~','.uavsar_ann_cache')
+CACHE_VERSION = 1
+LAYOUT_KEYS = {'set_rows': 'rows', 'set_cols': 'cols', 'val_frmt': 'format', 'val_endi': 'endian',
+               'val_size': 'size', 'row_addr': 'row_addr', 'col_addr': 'col_addr',
+               'row_mult': 'row_mult', 'col_mult': 'col_mult'}
+CORNER = re.compile(r'^Approximate (.+) (Latitude|Longitude)$')
+DATE = re.compile(r'(\d{1,2}-[A-Za-z]{3}-\d{4})')
+NUMERIC = frozenset('+-.0123456789')
+
+###==============================================================================###
+class ProductLayout(object):  # new-style so that __slots__ applies
+   """
+   Layout of one product section (e.g. mlc_pwr, grd_mag, hgt) of an annotation
+
+   rows, cols, format (e.g. REAL*4), endian, and size (bytes per sample) come from
+   the set_rows, set_cols, val_frmt, val_endi, and val_size keywords; row_addr,
+   col_addr, row_mult, and col_mult give the grid of ground-projected products.
+   Missing keywords are None.
+   """
+   __slots__ = ('rows','cols','format','endian','size','row_addr','col_addr','row_mult','col_mult')
+
+   def __init__(self):
+      for slot in self.__slots__:
+         setattr(self,slot,None)
+
+   def __repr__(self):
+      return '<ProductLayout %sx%s %s>' % (self.rows,self.cols,self.format)
+
+###-------------------------------------------------------------------------------###
+class Annotation(object):  # new-style so that __slots__ applies
+   """
+   Contents of an annotation file
+
+   Attributes
+   ----------
+   filename :  file read (None if parsed from text)
+   values   :  dict of keyword to value (int, float, or string)
+   units    :  dict of keyword to unit (None where not given)
+   products :  dict of section name (e.g. mlc_pwr) to :class:`ProductLayout`
+   corners  :  dict of corner name (e.g. 'Upper Left') to (latitude, longitude)
+   looks    :  dict with the numbers of 'azimuth' and 'range' looks (where given)
+
+   products, corners, and looks are built from values when first used.
+   """
+   __slots__ = ('filename','values','units','_products','_corners','_looks')
+
+   def __init__(self,text=None,filename=None,values=None,units=None):
+      self.filename = filename
+      if text is not None:
+         values, units = _parse(text)
+      self.values, self.units = values or {}, units or {}
+      self._products = self._corners = self._looks = None
+
+   @property
+   def products(self):
+      if self._products is None: self._structure()
+      return self._products
+
+   @property
+   def corners(self):
+      if self._corners is None: self._structure()
+      return self._corners
+
+   @property
+   def looks(self):
+      if self._looks is None: self._structure()
+      return self._looks
+
+   def __contains__(self,key):
+      return key in self.values
+
+   def __getitem__(self,key):
+      return self.values[key]
+
+   def get(self,key,default=None):
+      return self.values.get(key,default)
+
+   def number(self,key,default=None):
+      """
+      Value of key if it is a number (default otherwise)
+      """
+      value = self.values.get(key)
+      return value if isinstance(value,(int,long,float)) else default
+
+   def dates(self):
+      """
+      Acquisition dates (YYYY-MM-DD) given in the annotation, in time order
+      """
+      dates = set()
+      for key, value in self.values.items():
+         if 'Acquisition' not in key or ('Date' not in key and 'Time' not in key): continue
+         if 'Stop' in key or 'End' in key: continue
+         match = DATE.search(str(value))
+         if match is not None:
+            dates.add(time.strftime('%Y-%m-%d',time.strptime(match.group(1),'%d-%b-%Y')))
+      return sorted(dates)
+
+   def _structure(self):
+      products, corners, looks = {}, {}, {}
+      for key, value in self.values.items():
+         section, dot, field = key.rpartition('.')
+         if dot and field in LAYOUT_KEYS:
+            layout = products.get(section)
+            if layout is None:
+               layout = products[section] = ProductLayout()
+            setattr(layout,LAYOUT_KEYS[field],value)
+         elif key[:12] == 'Approximate ':
+            match = CORNER.match(key)
+            if match is not None:
+               corner = corners.setdefault(match.group(1),[None,None])
+               corner[match.group(2) == 'Longitude'] = value
+         elif 'Looks' in key:
+            for direction in ('azimuth','range'):
+               if direction in key.lower() and direction not in looks:
+                  looks[direction] = value
+      self._products, self._looks = products, looks
+      self._corners = dict((name,tuple(corner)) for name,corner in corners.items())
+
+###-------------------------------------------------------------------------------###
+def _parse(text):
+   """
+   Keyword values (numbers converted) and units of the annotation text
+
+   Plain string methods rather than a regular expression per line: this is the
+   inner loop of every archive scan.
+   """
+   values, units = {}, {}
+   for line in text.split('\n'):
+      eq = line.find('=')
+      if eq < 0: continue
+      sc = line.find(';')
+      if sc >= 0:
+         if sc < eq: continue  # comment holding an =
+         value = line[eq+1:sc].strip()
+      else:
+         value = line[eq+1:].strip()
+      key, unit = line[:eq].strip(), None
+      if key[-1:] == ')':
+         i = key.rfind('(')
+         unit, key = intern(key[i+1:-1].strip()), key[:i].rstrip()
+      key = intern(key)  # shared by every annotation, also in the pickled cache
+      if value[:1] in NUMERIC:
+         try:
+            value = float(value) if ('.' in value or 'e' in value or 'E' in value) else int(value)
+         except ValueError:
+            pass
+      values[key] = value
+      units[key] = unit
+   return values, units
+
+def edit_annotation(text,values):
+   """
+   Annotation text with the values of the keywords in the dict values replaced;
+   units and comments are kept, keywords not in text are appended
+   """
+   values, lines = dict(values), text.split('\n')
+   for i, line in enumerate(lines):
+      eq = line.find('=')
+      sc = line.find(';')
+      if eq < 0 or 0 <= sc < eq: continue
+      key = line[:eq].strip()
+      if key[-1:] == ')':
+         key = key[:key.rfind('(')].rstrip()
+      if key in values:
+         old = line[eq+1:sc] if sc >= 0 else line[eq+1:]
+         new = ' ' + _format(values.pop(key))
+         lines[i] = line[:eq+1] + (new.ljust(len(old)) if sc >= 0 else new) + (line[sc:] if sc >= 0 else '')
+   end = len(lines) - 1 if lines[-1] == '' else len(lines)
+   lines[end:end] = ['%-50s = %s' % (key,_format(value)) for key,value in sorted(values.items())]
+   return '\n'.join(lines)
+
+def _format(value):
+   return '%.12g' % value if isinstance(value,float) else str(value)
+
+###-------------------------------------------------------------------------------###
+def read_annotation(filename,cache=None):
+   """
+   Parse the annotation file filename into an :class:`Annotation`, going through
+   the :class:`AnnotationCache` cache if one is given
+   """
+   if cache is not None:
+      ann = cache.get(filename)
+      if ann is not None: return ann
+   fid = open(filename)
+   try:
+      ann = Annotation(fid.read(),filename)
+   finally:
+      fid.close()
+   if cache is not None:
+      cache.put(filename,ann)
+   return ann
+
+def scan_annotations(root,cache=None):
+   """
+   Read every .ann file under the folder root; returns a dict of path to :class:`Annotation`
+
+   Parsed files are kept in cache (an :class:`AnnotationCache`, the default one if
+   None), which is saved before returning.
+   """
+   if cache is None: cache = AnnotationCache()
+   found = {}
+   for folder, dirs, files in os.walk(root):
+      for fname in files:
+         if fname[-4:] == '.ann':
+            path = os.path.join(folder,fname)
+            found[path] = read_annotation(path,cache)
+   cache.save()
+   return found
+
+###==============================================================================###
+class AnnotationCache():
+   """
+   Parsed annotations kept on disk between runs
+
+   Entries are keyed by the absolute path of the file and are used only while its
+   modification time and size are unchanged.  Call :meth:`save` to write new
+   entries back.
+
+   Parameters
+   ----------
+   path :  cache file [$UAVSAR_ANN_CACHE or ~/.uavsar_ann_cache]
+   """
+   def __init__(self,path=None):
+      self.path = os.path.expanduser(path or os.getenv('UAVSAR_ANN_CACHE') or CACHE_FILE)
+      self._entries, self._dirty = {}, False
+      try:
+         fid = open(self.path,'rb')
+         try:
+            version, entries = pickle.load(fid)
+         finally:
+            fid.close()
+         if version == CACHE_VERSION: self._entries = entries
+      except (IOError,OSError,EOFError,ValueError,TypeError,pickle.UnpicklingError):
+         pass
+
+   def get(self,filename):
+      """
+      Cached :class:`Annotation` of filename (None if absent or out of date)
+      """
+      path = os.path.abspath(filename)
+      entry = self._entries.get(path)
+      if entry is None or entry[0] != _stamp(path): return None
+      return Annotation(filename=filename,values=entry[1],units=entry[2])
+
+   def put(self,filename,ann):
+      path = os.path.abspath(filename)
+      self._entries[path] = (_stamp(path),ann.values,ann.units)
+      self._dirty = True
+
+   def save(self):
+      """
+      Write the cache back to disk if anything was added
+      """
+      if not self._dirty: return
+      tmp = '%s.%d.tmp' % (self.path,os.getpid())
+      fid = open(tmp,'wb')
+      try:
+         pickle.dump((CACHE_VERSION,self._entries),fid,pickle.HIGHEST_PROTOCOL)
+      finally:
+         fid.close()
+      os.rename(tmp,self.path)
+      self._dirty = False
+
+def _stamp(path):
+   stat = os.stat(path)
+   return stat.st_mtime, stat.st_size
+
+###-------------------------------------------------------------------------------###
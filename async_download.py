@@ -0,0 +1,811 @@
+#!/usr/bin/env python
+
+"""
+async_download.py  :  Event-driven download engine for many concurrent transfers
+
+Usage:
+
+.. code-block:: bash
+
+   $ async_download.py url [url ...] [--jobs N] [--per-host N]
+
+Parameter
+---------
+url   :  file URL(s), saved under their own names in the current directory
+
+Options
+-------
+   --jobs N      :  number of transfers in flight at once [64]
+   --per-host N  :  maximum number of connections to one host [64]
+
+Notes
+-----
+* One thread drives every transfer through a single :mod:`asyncore` event loop
+   over non-blocking sockets, so hundreds of requests can be in flight without a
+   thread (and a stack) for each.  Response bodies are handed to a writer thread
+   that does the disk writes and checksums off the event loop
+
+* The ASF login is done by a blocking :class:`http_retrieve.Session`; the engine
+   sends that session's cookies and asks it to log in again if a request is refused
+
+* Files are resumed from <file>.part, checksummed, checked against the size
+   reported by the server, and recorded in the line manifest and download cache
+   exactly as by :func:`http_retrieve.http_retrieve`.  Large files are not split into
+   segments; every transfer is a single stream
+
+* The download scripts use this engine with ``--engine async``; :func:`retrieve`
+   has the signature of :func:`http_retrieve.http_retrieve` for use elsewhere
+
+See Also
+--------
+:ref:`http_retrieve`, :ref:`download_queue`, :ref:`standin_server`
+"""
+from __future__ import print_function, division
+import sys,os,time,socket,errno,asyncore,threading,Queue,urlparse,httplib,urllib
+from cStringIO import StringIO
+try:
+   import ssl
+except ImportError:  # Python built without SSL; https URLs will fail
+   ssl = None
+import mechanize
+from urllib2 import HTTPError
+from http_retrieve import (Session, RemoteFile, LoginError, say, get_password, _load_state,
+                           _save_state, _validator, _content_range, _finish, _kept,
+                           _cache_fetch, _cache_hit)
+from retry_policy import RetryPolicy
+from line_manifest import PieceHasher, complete_pieces
+from trace_events import span, add_span, new_track
+
+__title__      = 'async_download.py'
+__author__     = 'UAVSAR_WebPy contributors'
+__email__      = ''
+__created__    = 'October 2026'
+__modified__   = ''
+__version__    = '1.0'
+__status__     = 'Development'
+__conditions__ = 'Use at your own risk.'
+__license__    = """
+Copyright (C) 2026   UAVSAR_WebPy contributors
+--------------------------------------------------------------------
+GNU Licensed
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+--------------------------------------------------------------------
+"""
+
+RECV_SIZE = 256 << 10
+MAX_REDIRECTS = 10
+
+###==============================================================================###
+def retrieve(url,username=None,password=None,session=None,filename=None,retries=3,
+             manifest=None,cache=None,policy=None,throttle=None):
+   """
+   Download url with the event-driven engine and return the local filename (None
+   if nothing was downloaded); arguments are those of :func:`http_retrieve.http_retrieve`
+   """
+   engine = AsyncEngine(session=session,username=username,password=password,retries=retries,
+                        policy=policy,throttle=throttle,jobs=1,per_host=1)
+   engine.add(url,filename=filename,manifest=manifest,cache=cache)
+   return engine.run()[0]
+
+###==============================================================================###
+class AsyncEngine():
+   """
+   Download many URLs at once from a single event loop
+
+   Parameters
+   ----------
+   session  :  :class:`http_retrieve.Session` providing the login and cookies
+               [a new session with username and password]
+   jobs     :  maximum number of transfers in flight [64]
+   per_host :  maximum number of connections open to one host [64]
+   retries  :  retries of a failed transfer [3]
+   policy   :  :class:`retry_policy.RetryPolicy` deciding what is retried and when
+               [RetryPolicy(retries)]; the circuit breaker of the session is honored
+   throttle :  :class:`throttle.Throttle` limiting the download rate [None]
+   timeout  :  seconds without progress before a connection is given up [60]
+   queued   :  blocks waiting for the writer thread before the loop stops reading [64]
+   """
+   def __init__(self,session=None,username=None,password=None,jobs=64,per_host=64,retries=3,
+                timeout=60,queued=64,policy=None,throttle=None):
+      if session is None:
+         session = Session(username=username,password=password)
+      self.session = session
+      self.jobs, self.per_host = max(1,int(jobs)), max(1,int(per_host))
+      self.policy = policy if policy is not None else RetryPolicy(retries)
+      self.timeout, self.throttle = timeout, throttle
+      self._fatal = None
+      self.transfers = []
+      self._map = {}
+      self._idle = {}
+      self._nconn = {}
+      self._pending = []
+      self._active = 0
+      self._finished = Queue.Queue()
+      self._writer = _Writer(self._finished,queued)
+
+   def add(self,url,filename=None,manifest=None,cache=None,stages=None,metrics=None,**kwargs):
+      """
+      Queue url for download to filename [last component of url], converted by
+      stages (see :ref:`stream_stage`) and followed in metrics (a
+      :class:`transfer_metrics.TransferMetrics`); other keyword arguments of
+      :func:`http_retrieve.http_retrieve` are accepted and ignored
+      """
+      if filename is None:
+         filename = url.split('/')[-1]
+      self.transfers.append(_Transfer(len(self.transfers),url,filename,manifest,cache,stages))
+      self.transfers[-1].metrics = metrics
+      self._pending.append(self.transfers[-1])
+
+   def run(self,callback=None):
+      """
+      Download everything queued and return a list with the local filename of each
+      URL (None where the download failed)
+
+      callback(index,filename,elapsed) is called as each transfer finishes.
+      """
+      if not self.transfers: return []
+      if not self.session.logins:  # log in once up front instead of in every connection
+         self.session.probe(self.transfers[0].url)
+      self._writer.start()
+      try:
+         ndone = 0
+         while ndone < len(self.transfers):
+            self._start_pending()
+            if self._map:
+               asyncore.loop(timeout=0.2,use_poll=True,map=self._map,count=1)
+            else:
+               time.sleep(0.01)
+            if self._fatal is not None:
+               raise self._fatal
+            self._check_timeouts()
+            while True:
+               try:
+                  event, transfer = self._finished.get_nowait()
+               except Queue.Empty:
+                  break
+               if event == 'short':       # body ended early: retry it like a broken connection
+                  self._retry(transfer,transfer.error)
+               elif event == 'retry':
+                  self._active -= 1
+                  transfer.not_before = time.time() + transfer.delay
+                  transfer.delay = 0.
+                  self._pending.insert(0,transfer)
+               else:
+                  self._active -= 1
+                  ndone += 1
+                  if transfer.record is not None:
+                     transfer.record.finish('failed' if transfer.result is None else
+                                            'cached' if transfer.record.source == 'cache' else 'done',
+                                            transfer.result)
+                  if callback is not None:
+                     callback(transfer.index,transfer.result,time.time()-transfer.started)
+      finally:
+         self._writer.stop()
+         for conn in list(self._map.values()):
+            conn.close()
+      return [t.result for t in self.transfers]
+
+   ###----------------------------------------------------------------------------###
+   def _start_pending(self):
+      i, now = 0, time.time()
+      while i < len(self._pending) and self._active < self.jobs:
+         transfer = self._pending[i]
+         if transfer.not_before > now or self.session.breaker.allow(_host(transfer.url)) > 0:
+            i += 1
+            continue
+         conn = self._connection(transfer.url)
+         if conn is None:
+            i += 1
+            continue
+         self._pending.pop(i)
+         self._active += 1
+         if transfer.started is None:
+            transfer.started = time.time()
+            say('downloading: '+transfer.url)
+            if transfer.metrics is not None:
+               transfer.record = transfer.metrics.transfer(transfer.url,transfer.filename)
+         self._request(transfer,conn)
+
+   def _connection(self,url):
+      """
+      An idle connection to the host of url, a new one if the host has a free slot,
+      or None
+      """
+      parts = urlparse.urlsplit(url)
+      key = (parts.scheme,parts.hostname,parts.port or (443 if parts.scheme == 'https' else 80))
+      while self._idle.get(key):
+         conn = self._idle[key].pop()
+         if conn.connected: return conn
+      if self._nconn.get(key,0) >= self.per_host:
+         return None
+      self._nconn[key] = self._nconn.get(key,0) + 1
+      return _Connection(self,key)
+
+   def _request(self,transfer,conn):
+      """
+      Send the GET for transfer on conn, resuming from its part file if possible
+      """
+      if conn.error is not None:
+         return self.on_error(conn,transfer,conn.error)
+      transfer.part = transfer.filename + '.part'
+      state = _load_state(transfer.part)
+      transfer.offset = 0
+      if (state is not None and os.path.exists(transfer.part) and state.get('url') == transfer.url
+            and not state.get('segments')):
+         transfer.offset = os.path.getsize(transfer.part)
+      transfer.state = state
+      headers = {}
+      if transfer.offset > 0:
+         headers['Range'] = 'bytes=%d-' % transfer.offset
+         if _validator(state): headers['If-Range'] = _validator(state)
+      request = mechanize.Request(transfer.url,headers=headers)
+      self.session.cookiejar.add_cookie_header(request)
+      parts = urlparse.urlsplit(transfer.url)
+      lines = ['GET %s%s HTTP/1.1' % (parts.path or '/','?'+parts.query if parts.query else ''),
+               'Host: %s' % parts.netloc,
+               'User-Agent: Python-urllib/%s' % sys.version[:3],
+               'Accept-Encoding: identity', 'Connection: keep-alive']
+      lines += ['%s: %s' % (k.capitalize(),v) for k,v in request.header_items()]
+      transfer.request = request
+      conn.send_request(transfer,'\r\n'.join(lines) + '\r\n\r\n')
+
+   def _check_timeouts(self):
+      now = time.time()
+      for conn in list(self._map.values()):
+         if (conn.transfer is not None and now - max(conn.last_activity,conn._paused_until)
+               > self.timeout):
+            conn.fail(socket.timeout('timed out'))
+
+   def _release(self,conn,reuse):
+      """
+      Return conn to the idle pool of its host, or close it
+      """
+      conn.transfer = None
+      if reuse and conn.connected:
+         self._idle.setdefault(conn.key,[]).append(conn)
+      else:
+         self._drop(conn)
+
+   def _drop(self,conn):
+      if conn in self._idle.get(conn.key,[]):
+         self._idle[conn.key].remove(conn)
+      if not conn.dropped:
+         conn.dropped = True
+         self._nconn[conn.key] -= 1
+      conn.close()
+
+   ###----------------------------------------------------------------------------###
+   def on_headers(self,conn,transfer,status,reason,headers):
+      """
+      Decide what to do with a response once its headers are in; returns True if
+      the body should be streamed to disk
+      """
+      response = urllib.addinfourl(StringIO(''),headers,transfer.url)
+      self.session.cookiejar.extract_cookies(response,transfer.request)
+
+      if status in (401,403):
+         transfer.logins += 1
+         if transfer.logins > 2:
+            return self._fail(conn,transfer,'Download failed: %d: %s: %s' % (status,reason,transfer.url))
+         conn.discard()
+         logins = len(self.session.login_seconds)
+         self.session.probe(transfer.url)  # blocking; logs in again if the session expired
+         if transfer.record is not None:
+            for seconds in self.session.login_seconds[logins:]:
+               transfer.record.logged_in(seconds)
+         return self._requeue(transfer)
+      if status in (301,302,303,307,308) and headers.getheader('Location'):
+         transfer.redirects += 1
+         if transfer.redirects > MAX_REDIRECTS:
+            return self._fail(conn,transfer,'Download failed: too many redirects: '+transfer.url)
+         conn.discard()
+         transfer.url = urlparse.urljoin(transfer.url,headers.getheader('Location'))
+         return self._requeue(transfer)
+      if status == 416 and transfer.offset > 0:
+         conn.discard()
+         _remove_part(transfer.part)  # stale partial file; start over
+         return self._requeue(transfer)
+      if status in (404,410):
+         return self._fail(conn,transfer,'Nothing to download at URL: '+transfer.url)
+      error = HTTPError(transfer.url,status,reason,headers,None)
+      if self.policy.retryable(error):
+         conn.discard()
+         return self._retry(transfer,error)
+      if status >= 300:
+         return self._fail(conn,transfer,'Download failed: %d: %s: %s' % (status,reason,transfer.url))
+
+      state, remote = transfer.state, RemoteFile(transfer.url,status,headers)
+      if status == 206:
+         start, total = _content_range(headers)
+         if (start != transfer.offset or total != state.get('size') or
+               (remote.etag and state.get('etag') and remote.etag != state.get('etag')) or
+               (remote.last_modified and state.get('last_modified') and
+                  remote.last_modified != state.get('last_modified'))):
+            conn.abandon()            # the file changed on the server; start over
+            _remove_part(transfer.part)
+            return self._requeue(transfer)
+         remote.size = total
+      else:
+         transfer.offset = 0         # server ignored (or declined) the Range request
+      transfer.remote = remote
+      self.session.breaker.success(_host(transfer.url))
+
+      hit = transfer.cache is not None and _cache_fetch(transfer.cache,remote,transfer.filename,
+                                                        transfer.stages)
+      if hit:
+         conn.abandon()
+         say('from cache: '+hit)
+         if transfer.record is not None: transfer.record.source = 'cache'
+         hit, checksum = _cache_hit(transfer.cache,remote,transfer.filename,hit,transfer.stages)
+         if transfer.manifest is not None:
+            transfer.manifest.record(hit,remote,checksum)
+         transfer.result = hit
+         self._finished.put(('done',transfer))
+         return False
+
+      pieces = state.get('pieces',{}) if transfer.offset > 0 else {}
+      transfer.state = {'url': transfer.url, 'size': remote.size, 'etag': remote.etag,
+                        'last_modified': remote.last_modified, 'pieces': pieces}
+      _save_state(transfer.part,transfer.state)
+      transfer.nread = transfer.offset
+      self._writer.put(('open',transfer,None))
+      return True
+
+   def on_body(self,transfer,data):
+      transfer.nread += len(data)
+      if transfer.record is not None: transfer.record.count(len(data))
+      self._writer.put(('data',transfer,data))
+
+   def on_complete(self,conn,transfer,reuse):
+      self._release(conn,reuse)
+      self._writer.put(('close',transfer,None))
+
+   def on_error(self,conn,transfer,error):
+      """
+      The connection of transfer broke; retry (resuming) as the policy allows
+      """
+      self._drop(conn)
+      if transfer is None: return
+      if conn.reused and not conn.answered:  # the server had closed the idle connection
+         self._writer.put(('abort',transfer,'retry'))
+         return
+      self._retry(transfer,error,'abort')
+
+   def _retry(self,transfer,error,action=None):
+      """
+      Schedule transfer for another attempt after the policy's delay, or give it up
+      """
+      host = _host(transfer.url)
+      if self.session.breaker.failure(host):
+         say('Too many failures, pausing all requests to %s' % host)
+      if transfer.nread > transfer.offset:
+         transfer.attempts = 0       # the transfer moved on before it broke
+      transfer.attempts += 1
+      event = 'retry'
+      if transfer.attempts > self.policy.retries:
+         say('Download failed after %d attempts (%s): %s' % (transfer.attempts,error,transfer.url))
+         event = 'done'
+      else:
+         transfer.delay = self.policy.delay(transfer.attempts,error)
+         say('Transfer failed (%s), retrying in %.1f s: %s' % (error,transfer.delay,transfer.url))
+         if transfer.record is not None: transfer.record.retry(error)
+      if action is not None:         # let the writer close the part file first
+         self._writer.put((action,transfer,event))
+      else:
+         transfer.result = None
+         self._finished.put((event,transfer))
+      return False
+
+   def _requeue(self,transfer):
+      self._finished.put(('retry',transfer))
+      return False
+
+   def _fail(self,conn,transfer,msg):
+      conn.discard()
+      say(msg)
+      transfer.result = None
+      self._finished.put(('done',transfer))
+      return False
+
+###-------------------------------------------------------------------------------###
+class _Transfer():
+   """
+   Bookkeeping of one URL in an :class:`AsyncEngine`
+   """
+   def __init__(self,index,url,filename,manifest,cache,stages=None):
+      self.index, self.url, self.filename = index, url, filename
+      self.manifest, self.cache, self.stages = manifest, cache, stages
+      self.part, self.state, self.remote, self.request = None, None, None, None
+      self.offset, self.nread = 0, 0
+      self.attempts, self.logins, self.redirects = 0, 0, 0
+      self.not_before, self.delay = 0., 0.
+      self.started, self.result, self.failed, self.error = None, None, False, None
+      self.fid, self.hasher, self.nwrites = None, None, 0
+      self.pipeline, self.written = None, 0
+      self.metrics, self.record = None, None
+
+###-------------------------------------------------------------------------------###
+class _Writer():
+   """
+   Thread doing the disk writes and checksums for an :class:`AsyncEngine`
+
+   Messages are (action, transfer, data) with action 'open', 'data', 'close', or
+   'abort'; a finished transfer is reported to the engine on its finished queue,
+   and one whose body ended short as 'short', for the engine to retry it.
+   """
+   def __init__(self,finished,queued=64):
+      self.finished = finished
+      self.queue = Queue.Queue(maxsize=queued)
+      self._thread = None
+
+   def start(self):
+      self._thread = threading.Thread(target=self._run)
+      self._thread.daemon = True
+      self._thread.start()
+
+   def stop(self):
+      if self._thread is not None:
+         self.queue.put(None)
+         self._thread.join()
+         self._thread = None
+
+   def put(self,message):
+      self.queue.put(message)  # blocks the event loop when the disk cannot keep up
+
+   def _run(self):
+      while True:
+         message = self.queue.get()
+         if message is None: return
+         action, transfer, data = message
+         if transfer.failed: continue  # already reported; drop the rest of its data
+         try:
+            getattr(self,'_'+action)(transfer,data)
+         except Exception, e:
+            say('Download failed (%s): %s' % (e,transfer.url))
+            if transfer.fid is not None:
+               transfer.fid.close()
+               transfer.fid = None
+            self._end_pipeline(transfer)
+            transfer.result, transfer.failed = None, True
+            self.finished.put(('done',transfer))
+
+   def _open(self,transfer,data):
+      transfer.hasher = PieceHasher(transfer.state['pieces'],transfer.offset,transfer.part)
+      transfer.fid = open(transfer.part,'ab' if transfer.offset > 0 else 'wb')
+      transfer.nwrites, transfer.written = 0, transfer.offset
+      if transfer.stages:
+         from stream_stage import stream_pipeline
+         transfer.pipeline = stream_pipeline(transfer.filename,transfer.stages,transfer.offset,
+                                             size=transfer.remote.size)
+
+   def _data(self,transfer,data):
+      transfer.fid.write(data)
+      transfer.hasher.update(data)
+      if transfer.pipeline is not None:
+         transfer.pipeline.feed(transfer.written,data)
+      transfer.written += len(data)
+      transfer.nwrites += 1
+      if transfer.nwrites % 128 == 0:
+         transfer.fid.flush()
+         _save_state(transfer.part,transfer.state)
+
+   def _close(self,transfer,data):
+      transfer.fid.close()
+      transfer.fid = None
+      remote, size = transfer.remote, os.path.getsize(transfer.part)
+      if remote.size is not None and size != remote.size:
+         _save_state(transfer.part,transfer.state)
+         self._end_pipeline(transfer)
+         transfer.error = IOError('retrieval incomplete: got %d out of %d bytes' % (size,remote.size))
+         self.finished.put(('short',transfer))
+         return
+      with span('checksum',url=transfer.url):
+         transfer.hasher.finish(size)
+         checksum = complete_pieces(transfer.part,transfer.state['pieces'],size)
+      pipeline, transfer.pipeline = transfer.pipeline, None
+      if pipeline is not None:
+         with span('convert finish',url=transfer.url):
+            pipeline.finish(size)
+      filename, checksum = _kept(_finish(transfer.part,transfer.filename),pipeline,checksum)
+      if transfer.cache is not None:
+         transfer.cache.store(remote,filename,checksum)
+      if transfer.manifest is not None:
+         transfer.manifest.record(filename,remote,checksum)
+      transfer.result = filename
+      self.finished.put(('done',transfer))
+
+   def _abort(self,transfer,event):
+      if transfer.fid is not None:
+         transfer.fid.close()
+         transfer.fid = None
+         _save_state(transfer.part,transfer.state)
+      self._end_pipeline(transfer)
+      transfer.result = None
+      self.finished.put((event,transfer))
+
+   def _end_pipeline(self,transfer):
+      if transfer.pipeline is not None:
+         transfer.pipeline.abort()
+         transfer.pipeline = None
+
+def _host(url):
+   return urlparse.urlsplit(url).netloc
+
+def _remove_part(part):
+   for fname in [part,part+'.json']:
+      if os.path.exists(fname): os.remove(fname)
+
+###-------------------------------------------------------------------------------###
+class _Connection(asyncore.dispatcher):
+   """
+   Non-blocking HTTP/1.1 client connection carrying one transfer at a time
+
+   When tracing is on, its connect, wait response, and body spans are recorded
+   on a row of the timeline of its own (track).
+   """
+   def __init__(self,engine,key):
+      asyncore.dispatcher.__init__(self,map=engine._map)
+      self.engine, self.key = engine, key
+      self.transfer, self.dropped, self.error = None, False, None
+      self.reused, self.answered = False, False
+      self.outbuf, self.inbuf = '', ''
+      self.last_activity = time.time()
+      self.track = new_track('connection to %s:%d' % (key[1],key[2]))
+      self._opened = self._sent = self._answered = self.last_activity
+      self._handshaking = False
+      self._paused_until = 0.
+      self._reset()
+      self.create_socket(socket.AF_INET,socket.SOCK_STREAM)
+      try:
+         self.connect((key[1],key[2]))
+      except socket.error, e:
+         self.error = e
+
+   def _reset(self):
+      self._phase = 'headers'     # headers, body, chunk-size, chunk, chunk-end, trailer
+      self._left = None           # bytes of the body (or chunk) still to come
+      self._discard = False
+      self._close_after = False
+
+   def send_request(self,transfer,request):
+      self.reused = self.transfer is None and self.answered
+      self.answered = False
+      self.transfer = transfer
+      self.outbuf, self.inbuf = request, ''
+      self.last_activity = self._sent = time.time()
+      self._reset()
+
+   def discard(self):
+      """
+      Read and drop the rest of this response (keeping the connection)
+      """
+      self.transfer = None
+      self._discard = True
+
+   def abandon(self):
+      """
+      Give up on this response and the connection carrying it
+      """
+      transfer, self.transfer = self.transfer, None
+      self._discard = True
+      self.engine._drop(self)
+
+   def fail(self,error):
+      transfer, self.transfer = self.transfer, None
+      if self.track is not None and transfer is not None:
+         if self._phase == 'headers':
+            phase, start = 'wait response', self._sent
+         else:
+            phase, start = 'body', self._answered
+         add_span(phase,start,time.time(),self.track,url=transfer.url,
+                  error='%s: %s' % (type(error).__name__,error))
+      self.engine.on_error(self,transfer,error)
+
+   ###----------------------------------------------------------------------------###
+   def handle_connect(self):
+      if self.key[0] == 'https':
+         if ssl is None:
+            return self.fail(socket.error('no SSL support in this Python'))
+         self.socket = ssl.wrap_socket(self.socket,do_handshake_on_connect=False)
+         self._handshaking = True
+         self._handshake()
+      elif self.track is not None:
+         add_span('connect',self._opened,time.time(),self.track,host='%s:%d' % self.key[1:])
+
+   def _handshake(self):
+      """
+      Advance the TLS handshake; True while it is still in progress
+      """
+      if not self._handshaking: return False
+      try:
+         self.socket.do_handshake()
+      except ssl.SSLError, e:
+         if e.args[0] in (ssl.SSL_ERROR_WANT_READ,ssl.SSL_ERROR_WANT_WRITE):
+            return True
+         raise
+      self._handshaking = False
+      if self.track is not None:
+         add_span('connect',self._opened,time.time(),self.track,host='%s:%d' % self.key[1:],
+                  tls=True)
+      return False
+
+   def writable(self):
+      return not self.connected or self._handshaking or len(self.outbuf) > 0
+
+   def readable(self):
+      return time.time() >= self._paused_until  # held back by the throttle
+
+   def handle_write(self):
+      if self._handshake(): return
+      try:
+         n = self.socket.send(self.outbuf)
+      except socket.error, e:
+         if e.args[0] in (errno.EAGAIN,errno.EWOULDBLOCK): return
+         if ssl is not None and isinstance(e,ssl.SSLError) and e.args[0] in (
+               ssl.SSL_ERROR_WANT_READ,ssl.SSL_ERROR_WANT_WRITE): return
+         raise
+      self.outbuf = self.outbuf[n:]
+      self.last_activity = time.time()
+
+   def handle_read(self):
+      if self._handshake(): return
+      throttle = self.engine.throttle
+      while True:
+         try:
+            data = self.socket.recv(throttle.blocksize(RECV_SIZE) if throttle else RECV_SIZE)
+         except socket.error, e:
+            if e.args[0] in (errno.EAGAIN,errno.EWOULDBLOCK): return
+            if ssl is not None and isinstance(e,ssl.SSLError) and e.args[0] in (
+                  ssl.SSL_ERROR_WANT_READ,ssl.SSL_ERROR_WANT_WRITE): return
+            raise
+         if not data:
+            return self._closed()
+         self.last_activity = time.time()
+         if throttle is not None:
+            self._paused_until = self.last_activity + throttle.take(self.key[1],len(data))
+         self._feed(data)
+         if self._paused_until > self.last_activity or self.dropped or not (self.key[0] == 'https' and self.socket.pending()):
+            return
+
+   def handle_close(self):
+      if not self.dropped and self.connected and not self._handshaking:
+         try:                    # pick up whatever arrived before the close
+            while not self.dropped:
+               data = self.socket.recv(RECV_SIZE)
+               if not data: break
+               self._feed(data)
+         except socket.error:
+            pass
+      if not self.dropped:
+         self._closed()
+
+   def handle_error(self):
+      error = sys.exc_info()[1]
+      if isinstance(error,LoginError):
+         self.engine._fatal = error
+         return self.engine._drop(self)
+      if self.transfer is None:
+         self.engine._drop(self)
+      else:
+         self.fail(error)
+
+   def _closed(self):
+      if self.transfer is not None and self._phase == 'body' and self._left is None:
+         return self._complete(False)  # body delimited by the end of the connection
+      if self.transfer is not None:
+         return self.fail(httplib.IncompleteRead(''))
+      self.engine._drop(self)
+
+   ###----------------------------------------------------------------------------###
+   def _feed(self,data):
+      """
+      Parse data received on the connection, passing body bytes to the engine
+      """
+      self.inbuf += data
+      self.answered = True
+      while self.inbuf and not self.dropped:
+         if self.transfer is None and not self._discard:
+            self.engine._drop(self)  # data nobody asked for
+            return
+         if self._phase == 'headers':
+            end = self.inbuf.find('\r\n\r\n')
+            if end < 0: return
+            head, self.inbuf = self.inbuf[:end+2], self.inbuf[end+4:]
+            if not self._headers(head): return
+         elif self._phase == 'body' or self._phase == 'chunk':
+            data = self.inbuf if self._left is None else self.inbuf[:self._left]
+            self.inbuf = self.inbuf[len(data):]
+            if not self._discard and data:
+               self.engine.on_body(self.transfer,data)
+            if self._left is not None:
+               self._left -= len(data)
+               if self._left == 0:
+                  if self._phase == 'chunk':
+                     self._phase = 'chunk-end'
+                  else:
+                     self._complete(not self._close_after)
+         elif self._phase in ('chunk-size','chunk-end','trailer'):
+            end = self.inbuf.find('\r\n')
+            if end < 0: return
+            line, self.inbuf = self.inbuf[:end], self.inbuf[end+2:]
+            if self._phase == 'chunk-end':
+               self._phase = 'chunk-size'
+            elif self._phase == 'trailer':
+               if line == '': self._complete(not self._close_after)
+            else:
+               self._left = int(line.split(';')[0],16)
+               self._phase = 'chunk' if self._left > 0 else 'trailer'
+
+   def _headers(self,head):
+      """
+      Handle the status line and headers of a response; False if parsing should stop
+      """
+      status_line, _, rest = head.partition('\r\n')
+      try:
+         version, status, reason = (status_line.split(None,2) + [''])[:3]
+         status = int(status)
+      except ValueError:
+         self.fail(httplib.BadStatusLine(status_line))
+         return False
+      headers = httplib.HTTPMessage(StringIO(rest))
+      connection = (headers.getheader('Connection') or '').lower()
+      self._close_after = connection == 'close' or (version == 'HTTP/1.0' and connection != 'keep-alive')
+      if status == 100:
+         return True
+      if self.track is not None:
+         self._answered = time.time()
+         add_span('wait response',self._sent,self._answered,self.track,
+                  url=self.transfer.url if self.transfer else None,status=status,reused=self.reused)
+      if (headers.getheader('Transfer-Encoding') or '').lower() == 'chunked':
+         self._phase, self._left = 'chunk-size', None
+      elif headers.getheader('Content-Length') is not None:
+         self._phase, self._left = 'body', int(headers.getheader('Content-Length'))
+      else:
+         self._phase, self._left = 'body', None
+      transfer = self.transfer
+      self._discard = not self.engine.on_headers(self,transfer,status,reason.strip(),headers)
+      if self.dropped:
+         return False
+      if self._phase == 'body' and self._left == 0:
+         self._complete(not self._close_after)
+      return True
+
+   def _complete(self,reuse):
+      transfer, discard = self.transfer, self._discard
+      self.transfer = None
+      if self.track is not None and transfer is not None:
+         add_span('body',self._answered,time.time(),self.track,url=transfer.url,
+                  bytes=transfer.nread-transfer.offset)
+      self._reset()
+      if discard or transfer is None:
+         self.engine._release(self,reuse)
+      else:
+         self.engine.on_complete(self,transfer,reuse)
+
+###-------------------------------------------------------------------------------###
+if __name__=='__main__':
+   from download_queue import get_options
+   args, opts = get_options(sys.argv[1:],{'jobs': int, 'per-host': int})
+   if len(args) < 1:
+      print(__doc__)
+      sys.exit()
+   username, password = get_password()
+   engine = AsyncEngine(username=username,password=password,**opts)
+   for url in args:
+      engine.add(url)
+   results = engine.run()
+   nfail = len([r for r in results if r is None])
+   print('\n%d of %d files downloaded' % (len(results)-nfail,len(results)))
@@ -0,0 +1,414 @@
+#!/usr/bin/env python
+
+"""
+download_benchmark.py  :  Reproducible timings of the download scripts against a local server
+
+Usage:
+
+.. code-block:: bash
+
+   $ download_benchmark.py [options]
+
+Options
+-------
+   --size MB          :  size of each synthetic raster (the .int and COMPLEX*8 .mlc files
+                         are twice as large) [8]
+   --latency LIST     :  comma-separated delays (s) the server adds before every response;
+                         every scenario is run at each of them [0,0.05]
+   --jobs LIST        :  comma-separated --jobs values of the concurrency scenario [1,2,4,8]
+   --repeat N         :  runs of each measurement; the median is reported [3]
+   --scenarios LIST   :  comma-separated scenarios to run, any of
+                         insar, polsar, files, login, concurrency, resume [all of them]
+   --options STR      :  options passed to every run of the download scripts,
+                         e.g. "--engine async --segments 4"
+   --root DIR         :  folder for the synthetic lines, kept between runs [a temporary folder]
+   --output FILE      :  write the results as JSON [benchmark.json]
+   --compare FILE     :  compare the results with those of an earlier run; the exit status is
+                         1 if a measurement is slower by more than the tolerance
+   --tolerance F      :  allowed slowdown before a measurement is reported, as a fraction [0.2]
+
+Scenarios
+---------
+   insar        :  uavsar_insar_download.py for an interferogram line (rdr: amp1, amp2,
+                   cor, int, unw, and the .ann)
+   polsar       :  uavsar_polsar_download.py for the mlc files of a PolSAR line
+   files        :  :func:`http_retrieve.http_retrieve` of each InSAR file alone, with one
+                   logged-in session: time and MB/s per file
+   login        :  the first request of a new session (401, login form, login) less the
+                   same request of a logged-in one
+   concurrency  :  the insar run for each --jobs value
+   resume       :  the insar run stopped (rate-limited) when half of the bytes are on disk,
+                   then run again; the time and the bytes of the second run
+
+Notes
+-----
+* The server is a :class:`standin_server.StandinServer` in this process; the
+   scripts run in subprocesses with a $HOME of their own holding the credentials
+   in .dathack.d, and write into a fresh folder for every run
+
+* The synthetic lines are made from a fixed seed, so the same options always
+   serve the same bytes.  Their names and annotations follow the real ones, so
+   the scripts build the same lists of URLs
+
+* The JSON file holds the settings, the Python version and platform, and for each
+   measurement its name, the median and individual times in seconds, and the
+   bytes, requests, logins, and connections the server counted
+
+See Also
+--------
+:ref:`standin_server`, :ref:`uavsar_insar_download`, :ref:`uavsar_polsar_download`
+"""
+from __future__ import print_function, division
+import sys,os,time,json,shutil,tempfile,platform,subprocess,shlex
+import numpy as np
+from standin_server import StandinServer
+from http_retrieve import http_retrieve, Session
+
+__title__      = 'download_benchmark.py'
+__author__     = 'UAVSAR_WebPy contributors'
+__email__      = ''
+__created__    = 'October 2026'
+__modified__   = ''
+__version__    = '1.0'
+__status__     = 'Development'
+__conditions__ = 'Use at your own risk.'
+__license__    = """
+Copyright (C) 2026   UAVSAR_WebPy contributors
+--------------------------------------------------------------------
+GNU Licensed
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+--------------------------------------------------------------------
+"""
+
+RESULTS_VERSION = 1
+SCENARIOS = ('insar','polsar','files','login','concurrency','resume')
+PACKAGE = os.path.dirname(os.path.abspath(__file__))
+SEED = 2013
+COLS = 1024
+USERNAME, PASSWORD = 'bench', 'bench'
+
+INSAR_LINE = 'UA_SanAnd_08503_09083-008_10027-003_0174d_s01_L090_01'
+INSAR_STEM = 'SanAnd_08503_09083-008_10027-003_0174d_s01_L090HH_01'
+INSAR_PRODUCTS = {'amp1': 4, 'amp2': 4, 'cor': 4, 'int': 8, 'unw': 4}
+POLSAR_LINE = 'UA_SanAnd_08503_10071_003_100928_L090_CX_01'
+POLSAR_STEM = 'SanAnd_08503_10071_003_100928_L090%s_CX_01'
+POLSAR_CHANNELS = ('HHHH','HVHV','VVVV','HHHV','HHVV','HVVV')
+
+###==============================================================================###
+class Benchmark():
+   """
+   Run the benchmark scenarios against a local stand-in server
+
+   Parameters
+   ----------
+   root    :  folder for the synthetic lines [a temporary folder, removed by :meth:`close`]
+   size    :  MB per synthetic raster [8]
+   repeat  :  runs of each measurement [3]
+   options :  list of options passed to every run of the download scripts
+
+   :meth:`run` returns the results as a dict, ready for json.
+   """
+   def __init__(self,root=None,size=8.,repeat=3,options=()):
+      self.size, self.repeat, self.options = size, max(1,int(repeat)), list(options)
+      self._temporary = root is None
+      self.root = os.path.abspath(root or tempfile.mkdtemp(prefix='uavsar_bench_'))
+      self.work = tempfile.mkdtemp(prefix='uavsar_bench_run_')
+      self.home = os.path.join(self.work,'home')
+      os.makedirs(self.home)
+      fid = open(os.path.join(self.home,'.dathack.d'),'w')
+      fid.write('uavsarhttp:%s:%s\n' % (USERNAME,PASSWORD))
+      fid.close()
+      rows = max(1,int(size*(1 << 20))//(4*COLS))
+      self.insar = make_insar_line(os.path.join(self.root,'data'),rows)
+      self.polsar = make_polsar_line(os.path.join(self.root,'data'),rows)
+      self.server = StandinServer(os.path.join(self.root,'data'),username=USERNAME,password=PASSWORD)
+      self.server.start()
+      self.results = []
+
+   def run(self,scenarios=SCENARIOS,latencies=(0.,),jobs=(1,2,4,8)):
+      for latency in latencies:
+         self.server.latency = latency
+         for scenario in scenarios:
+            if scenario == 'concurrency':
+               for n in jobs:
+                  self._record('concurrency',latency,self.script_run,'insar',['--jobs',str(n)],
+                               jobs=n)
+            elif scenario in ('insar','polsar'):
+               self._record(scenario,latency,self.script_run,scenario)
+            elif scenario == 'files':
+               self._record(scenario,latency,self.file_runs)
+            elif scenario == 'login':
+               self._record(scenario,latency,self.login_run)
+            elif scenario == 'resume':
+               self._record(scenario,latency,self.resume_run)
+            else:
+               raise ValueError('unknown scenario '+scenario)
+      return {'version': RESULTS_VERSION, 'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'python': platform.python_version(), 'platform': platform.platform(),
+              'settings': {'size_mb': self.size, 'repeat': self.repeat, 'options': self.options},
+              'results': self.results}
+
+   def close(self):
+      self.server.stop()
+      shutil.rmtree(self.work,True)
+      if self._temporary: shutil.rmtree(self.root,True)
+
+   ###----------------------------------------------------------------------------###
+   def script_run(self,kind,args=()):
+      """
+      Time one run of the download script for kind ('insar' or 'polsar') in a fresh folder
+      """
+      folder = self._fresh_folder()
+      self.server.reset_stats()
+      t0 = time.time()
+      status = self._script(kind,args,folder).wait()
+      measure = self._counters(time.time()-t0)
+      measure['status'] = status
+      return measure
+
+   def file_runs(self):
+      """
+      Time the download of each InSAR file alone with one logged-in session
+      """
+      folder = self._fresh_folder()
+      session = Session(username=USERNAME,password=PASSWORD)
+      session.probe(self._url(self.insar[0]))  # log in first
+      files, total = [], 0.
+      self.server.reset_stats()
+      for path in self.insar:
+         t0 = time.time()
+         http_retrieve(self._url(path),session=session,
+                       filename=os.path.join(folder,os.path.basename(path)))
+         seconds = time.time() - t0
+         nbytes = os.path.getsize(path)
+         files.append({'name': os.path.basename(path), 'bytes': nbytes, 'seconds': seconds,
+                       'mb_per_s': nbytes/1.e6/seconds if seconds > 0 else None})
+         total += seconds
+      session.close()
+      measure = self._counters(total)
+      measure['files'] = files
+      return measure
+
+   def login_run(self):
+      """
+      Seconds of the first request of a new session less those of a logged-in one
+      """
+      url = self._url(self.insar[0])
+      session = Session(username=USERNAME,password=PASSWORD)
+      self.server.reset_stats()
+      t0 = time.time()
+      session.probe(url)
+      first = time.time() - t0
+      t0 = time.time()
+      session.probe(url)
+      again = time.time() - t0
+      session.close()
+      measure = self._counters(first-again)
+      measure.update({'first_request': first, 'logged_in_request': again})
+      return measure
+
+   def resume_run(self):
+      """
+      Stop an insar run halfway through (by bytes served), then time the run that finishes it
+      """
+      folder = self._fresh_folder()
+      total = sum(os.path.getsize(path) for path in self.insar)
+      rate = max(total/2./(1 << 20),0.01)  # slow enough, at about 2 s, to stop in the middle
+      self.server.reset_stats()
+      proc = self._script('insar',['--rate','%g' % rate],folder)
+      while proc.poll() is None and _folder_bytes(folder) < total//2:  # the server count runs
+         time.sleep(0.01)                                               # ahead by the socket buffers
+      if proc.poll() is None: proc.kill()
+      proc.wait()
+      first = _folder_bytes(folder)
+      self.server.reset_stats()
+      t0 = time.time()
+      status = self._script('insar',[],folder).wait()
+      measure = self._counters(time.time()-t0)
+      measure.update({'status': status, 'bytes_on_disk_at_stop': first, 'total_bytes': total})
+      return measure
+
+   ###----------------------------------------------------------------------------###
+   def _record(self,scenario,latency,measure,*args,**extra):
+      name = '%s latency=%g' % (scenario,latency)
+      if 'jobs' in extra: name += ' jobs=%d' % extra['jobs']
+      runs = [measure(*args) for i in range(self.repeat)]
+      seconds = [run['seconds'] for run in runs]
+      result = dict(runs[np.argsort(seconds)[len(seconds)//2]])  # the median run
+      result.update(extra)
+      result.update({'name': name, 'scenario': scenario, 'latency': latency, 'runs': seconds})
+      if result.get('bytes') and result['seconds'] > 0 and scenario != 'login':
+         result['mb_per_s'] = result['bytes']/1.e6/result['seconds']
+      self.results.append(result)
+      print('%-36s %8.3f s%s' % (name,result['seconds'],
+            '  %8.1f MB/s' % result['mb_per_s'] if 'mb_per_s' in result else ''))
+      return result
+
+   def _script(self,kind,args,folder):
+      script = os.path.join(PACKAGE,'uavsar_%s_download.py' % kind)
+      url = self._url(self.insar[-2] if kind == 'insar' else self.polsar[1])  # the .int, an .mlc
+      env = dict(os.environ)
+      env['HOME'] = self.home
+      env['PYTHONPATH'] = os.pathsep.join([PACKAGE]+[p for p in [env.get('PYTHONPATH')] if p])
+      log = open(os.path.join(self.work,'script.log'),'a')
+      try:
+         return subprocess.Popen([sys.executable,script,url]+list(args)+self.options,cwd=folder,
+                                 env=env,stdout=log,stderr=subprocess.STDOUT)
+      finally:
+         log.close()
+
+   def _fresh_folder(self):
+      folder = os.path.join(self.work,'download')
+      shutil.rmtree(folder,True)
+      os.makedirs(folder)
+      return folder
+
+   def _counters(self,seconds):
+      stats = self.server.stats
+      return {'seconds': seconds, 'bytes': stats['bytes'], 'logins': stats['logins'],
+              'requests': stats['GET']+stats['HEAD']+stats['POST'],
+              'connections': stats['connections']}
+
+   def _url(self,path):
+      return self.server.url + '/' + os.path.relpath(path,self.server.root).replace(os.sep,'/')
+
+def _folder_bytes(folder):
+   return sum(os.path.getsize(os.path.join(path,name)) for path,dirs,files in os.walk(folder)
+              for name in files if not name.endswith('.json'))
+
+###-------------------------------------------------------------------------------###
+def make_insar_line(root,rows,cols=COLS):
+   """
+   Write a synthetic InSAR line (rdr products and .ann) of rows by cols samples under
+   root, unless it is already there; returns the paths of the files
+   """
+   folder = os.path.join(root,INSAR_LINE)
+   ann = {'Slant Range Data Azimuth Lines': rows, 'Slant Range Data Range Samples': cols,
+          'Ground Range Data Latitude Lines': rows, 'Ground Range Data Longitude Samples': cols,
+          'Time of Acquisition for Pass 1': '27-Apr-2009 17:12:30 UTC',
+          'Time of Acquisition for Pass 2': '18-Oct-2009 18:01:02 UTC'}
+   paths = [os.path.join(folder,INSAR_STEM+'.ann')]
+   _write_ann(paths[0],ann)
+   for product, size in sorted(INSAR_PRODUCTS.items()):
+      paths.append(os.path.join(folder,INSAR_STEM+'.'+product))
+      _write_raster(paths[-1],rows*cols*size)
+   return paths
+
+def make_polsar_line(root,rows,cols=COLS):
+   """
+   Write a synthetic PolSAR line (mlc products and .ann) of rows by cols samples under
+   root, unless it is already there; returns the paths of the files
+   """
+   folder = os.path.join(root,POLSAR_LINE)
+   ann = {'Date of Acquisition': '28-Sep-2010 18:56:45 UTC'}
+   for section, frmt, size in (('mlc_pwr','REAL*4',4),('mlc_mag','COMPLEX*8',8)):
+      ann.update({section+'.set_rows': rows, section+'.set_cols': cols, section+'.val_size': size,
+                  section+'.val_frmt': frmt, section+'.val_endi': 'LITTLE ENDIAN'})
+   paths = [os.path.join(folder,POLSAR_LINE[3:]+'.ann')]
+   _write_ann(paths[0],ann)
+   for chan in POLSAR_CHANNELS:
+      paths.append(os.path.join(folder,POLSAR_STEM % chan + '.mlc'))
+      _write_raster(paths[-1],rows*cols*(4 if chan[:2] == chan[2:] else 8))
+   return paths
+
+def _write_ann(path,values):
+   text = ';  Synthetic annotation file (download_benchmark.py)\n' + ''.join(
+      '%-58s%-16s= %s\n' % (key,'(&)',value) for key,value in sorted(values.items()))
+   if os.path.exists(path) and open(path).read() == text: return
+   if not os.path.exists(os.path.dirname(path)): os.makedirs(os.path.dirname(path))
+   fid = open(path,'w')
+   fid.write(text)
+   fid.close()
+
+def _write_raster(path,nbytes):
+   if os.path.exists(path) and os.path.getsize(path) == nbytes: return
+   block = np.random.RandomState(SEED).bytes(1 << 20)
+   fid = open(path,'wb')
+   try:
+      for i in range(0,nbytes,len(block)):
+         fid.write(block[:nbytes-i])
+   finally:
+      fid.close()
+
+###-------------------------------------------------------------------------------###
+def compare_results(old,new,tolerance=0.2):
+   """
+   Print the change of every measurement of the results new from those of old;
+   returns the names of those slower by more than tolerance (a fraction)
+   """
+   before = dict((result['name'],result) for result in old['results'])
+   slower = []
+   print('\n%-36s %10s %10s %8s' % ('measurement','before (s)','now (s)','change'))
+   for result in new['results']:
+      if result['name'] not in before: continue
+      then, now = before[result['name']]['seconds'], result['seconds']
+      change = (now-then)/then if then > 0 else 0.
+      flag = ''
+      if change > tolerance:
+         slower.append(result['name'])
+         flag = '  SLOWER'
+      print('%-36s %10.3f %10.3f %+7.0f%%%s' % (result['name'],then,now,100*change,flag))
+   return slower
+
+###-------------------------------------------------------------------------------###
+def _list(cast):
+   return lambda value: [cast(item) for item in value.split(',')]
+
+def _main(args):
+   types = {'size': float, 'latency': _list(float), 'jobs': _list(int), 'repeat': int,
+            'scenarios': _list(str), 'options': shlex.split, 'root': str, 'output': str,
+            'compare': str, 'tolerance': float}
+   opts = {'size': 8., 'latency': [0.,0.05], 'jobs': [1,2,4,8], 'repeat': 3,
+           'scenarios': list(SCENARIOS), 'options': [], 'root': None, 'output': 'benchmark.json',
+           'compare': None, 'tolerance': 0.2}
+   i = 0
+   while i < len(args):
+      name = args[i][2:]
+      if args[i][:2] == '--' and name in types and i+1 < len(args):
+         try:
+            opts[name] = types[name](args[i+1])
+         except ValueError:
+            print('Invalid value for option '+args[i]+': ',args[i+1])
+            sys.exit()
+         i += 2
+      else:
+         print(__doc__)
+         sys.exit()
+   unknown = [scenario for scenario in opts['scenarios'] if scenario not in SCENARIOS]
+   if unknown:
+      print('Unknown scenario(s): '+', '.join(unknown))
+      sys.exit()
+   baseline = None
+   if opts['compare'] is not None:
+      fid = open(opts['compare'])
+      baseline = json.load(fid)
+      fid.close()
+
+   bench = Benchmark(opts['root'],opts['size'],opts['repeat'],opts['options'])
+   try:
+      results = bench.run(opts['scenarios'],opts['latency'],opts['jobs'])
+   finally:
+      bench.close()
+   fid = open(opts['output'],'w')
+   json.dump(results,fid,indent=1,sort_keys=True)
+   fid.close()
+   print('Results written to '+opts['output'])
+   if baseline is not None and compare_results(baseline,results,opts['tolerance']):
+      sys.exit(1)
+
+###-------------------------------------------------------------------------------###
+if __name__=='__main__':
+   _main(sys.argv[1:])
@@ -0,0 +1,255 @@
+"""
+download_cache.py  :  Shared on-disk cache of downloaded UAVSAR files
+
+A cache directory may be shared by any number of jobs (and processes) on a
+machine or cluster file system.  Files are stored under a key made from the URL
+and the validator the server reports for it (ETag, or Last-Modified and size),
+so a file that changes on the server is never served stale.  A cache hit is
+linked into the target folder instead of being downloaded again; the cache is
+kept under a size limit by evicting the least recently used files.
+
+Options
+-------
+   --cache DIR      :  cache directory [$UAVSAR_CACHE if set, otherwise no cache]
+   --cache-size GB  :  evict least recently used files above this size [no limit]
+
+Notes
+-----
+* Downloaded files are copied into the cache, so they are left as they are.
+   Cached files are made read-only; a file placed from the cache with the default
+   hard links shares the cached data, so it is read-only too; copy it before
+   modifying it in place
+
+* Files without an ETag or Last-Modified header are never cached
+
+* A product kept as its .tiles (--convert tile-only, see :ref:`stream_stage`) is
+   cached as such, under a key of its own
+
+See Also
+--------
+:ref:`http_retrieve`, :ref:`download_queue`
+"""
+from __future__ import print_function, division
+import os,shutil,stat,hashlib,threading,json
+from http_retrieve import say
+try:
+   import fcntl
+except ImportError:  # no advisory locking (e.g. Windows); eviction is then best effort
+   fcntl = None
+
+__title__      = 'download_cache.py'
+__author__     = 'UAVSAR_WebPy contributors'
+__email__      = ''
+__created__    = 'October 2026'
+__modified__   = ''
+__version__    = '1.0'
+__status__     = 'Development'
+__conditions__ = 'Use at your own risk.'
+__license__    = """
+Copyright (C) 2026   UAVSAR_WebPy contributors
+--------------------------------------------------------------------
+GNU Licensed
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+--------------------------------------------------------------------
+"""
+
+###==============================================================================###
+class DownloadCache():
+   """
+   Content store of downloaded files keyed by URL and validator
+
+   Parameters
+   ----------
+   root      :  cache directory (created if needed)
+   max_bytes :  evict least recently used files when the cache grows beyond this [None]
+   mode      :  how hits are placed in the target folder: 'link' (hard link, falling
+                back to a copy across file systems), 'symlink', or 'copy' ['link']
+   """
+   def __init__(self,root,max_bytes=None,mode='link'):
+      if mode not in ('link','symlink','copy'):
+         raise ValueError('invalid cache mode: '+str(mode))
+      self.root = os.path.abspath(root)
+      self.max_bytes = max_bytes
+      self.mode = mode
+      self._lock = threading.Lock()
+      for sub in ['objects','tmp']:
+         if not os.path.exists(os.path.join(self.root,sub)):
+            try:
+               os.makedirs(os.path.join(self.root,sub))
+            except OSError:  # created by another process in the meantime
+               pass
+      if max_bytes is not None:
+         self.evict()
+
+   def key(self,remote,filename=None):
+      """
+      Cache key of the :class:`http_retrieve.RemoteFile` remote (None if it has no
+      validator); a filename kept under another name than the remote file (its
+      .tiles) has a key of its own
+      """
+      if remote.etag:
+         validator = 'etag:' + remote.etag
+      elif remote.last_modified:
+         validator = 'modified:%s:%s' % (remote.last_modified,remote.size)
+      else:
+         return None
+      return hashlib.sha1(remote.url + '\n' + validator + _variant(remote,filename)).hexdigest()
+
+   def path(self,key):
+      return os.path.join(self.root,'objects',key[:2],key)
+
+   def fetch(self,remote,filename):
+      """
+      Place the cached copy of remote at filename; returns False on a cache miss
+      """
+      key = self.key(remote,filename)
+      if key is None: return False
+      path = self.path(key)
+      if not os.path.exists(path): return False
+      if (remote.size is not None and not _variant(remote,filename) and
+            os.path.getsize(path) != remote.size):
+         return False
+      try:
+         if os.path.lexists(filename): os.remove(filename)
+         if self.mode == 'symlink':
+            os.symlink(path,filename)
+         elif self.mode == 'copy':
+            shutil.copyfile(path,filename)
+         else:
+            _link_or_copy(path,filename)
+      except (OSError,IOError):  # evicted by another process while we were at it
+         return False
+      self._touch(key,remote.url)
+      return True
+
+   def checksum(self,remote,filename=None):
+      """
+      Checksum record stored with the cached copy of remote (None if there is none)
+      """
+      key = self.key(remote,filename)
+      if key is None: return None
+      try:
+         fid = open(self.path(key)+'.sum')
+         try:
+            return json.load(fid)
+         finally:
+            fid.close()
+      except (IOError,ValueError):
+         return None
+
+   def store(self,remote,filename,checksum=None):
+      """
+      Add the freshly downloaded filename to the cache as the content of remote,
+      together with its checksum record when one is given
+      """
+      key = self.key(remote,filename)
+      if key is None or not os.path.exists(filename): return
+      path = self.path(key)
+      if not os.path.exists(path):
+         if not os.path.exists(os.path.dirname(path)):
+            try:
+               os.makedirs(os.path.dirname(path))
+            except OSError:
+               pass
+         tmp = os.path.join(self.root,'tmp','%s.%d.%d' % (key,os.getpid(),id(threading.current_thread())))
+         try:
+            shutil.copyfile(filename,tmp)  # a link would share (and lock) the user's file
+            os.chmod(tmp,stat.S_IRUSR|stat.S_IRGRP|stat.S_IROTH)
+            os.rename(tmp,path)  # atomic: readers see all of the file or none of it
+         except (OSError,IOError), e:
+            say('Could not add %s to the cache: %s' % (filename,e))
+            if os.path.exists(tmp): os.remove(tmp)
+            return
+         if checksum is not None:
+            try:
+               fid = open(tmp+'.sum','w')
+               try:
+                  json.dump(checksum,fid)
+               finally:
+                  fid.close()
+               os.rename(tmp+'.sum',path+'.sum')
+            except (OSError,IOError):
+               pass
+      self._touch(key,remote.url)
+      if self.max_bytes is not None:
+         self.evict()
+
+   def evict(self,max_bytes=None):
+      """
+      Remove least recently used files until the cache holds at most max_bytes
+      (default: the limit given to the cache); returns the number of bytes freed
+      """
+      if max_bytes is None: max_bytes = self.max_bytes
+      if max_bytes is None: return 0
+      self._lock.acquire()
+      lockfid = open(os.path.join(self.root,'lock'),'a')
+      try:
+         if fcntl is not None: fcntl.flock(lockfid,fcntl.LOCK_EX)
+         entries, total = [], 0
+         objects = os.path.join(self.root,'objects')
+         for sub in os.listdir(objects):
+            for name in os.listdir(os.path.join(objects,sub)):
+               if name.endswith('.used') or name.endswith('.sum'): continue
+               path = os.path.join(objects,sub,name)
+               try:
+                  size = os.path.getsize(path)
+                  used = os.path.getmtime(path+'.used') if os.path.exists(path+'.used') else 0
+               except OSError:
+                  continue
+               entries.append((used,size,path))
+               total += size
+         entries.sort()
+         freed = 0
+         for used, size, path in entries:
+            if total - freed <= max_bytes: break
+            for fname in [path,path+'.used',path+'.sum']:
+               if os.path.exists(fname): os.remove(fname)
+            freed += size
+         return freed
+      finally:
+         if fcntl is not None: fcntl.flock(lockfid,fcntl.LOCK_UN)
+         lockfid.close()
+         self._lock.release()
+
+   def _touch(self,key,url):
+      """
+      Mark key as just used (the object itself is left alone so that linked copies
+      keep their modification times)
+      """
+      stamp = self.path(key) + '.used'
+      try:
+         fid = open(stamp,'w')
+         fid.write(url+'\n')
+         fid.close()
+      except IOError:
+         pass
+
+###-------------------------------------------------------------------------------###
+def _variant(remote,filename):
+   """
+   What filename adds to the name of the remote file ('.tiles'), '' if nothing
+   """
+   if filename is None: return ''
+   name, base = os.path.basename(filename), remote.url.split('/')[-1]
+   return name[len(base):] if name.startswith(base) else ''
+
+def _link_or_copy(src,dst):
+   try:
+      os.link(src,dst)
+   except (OSError,AttributeError):  # other file system (or no hard links)
+      shutil.copyfile(src,dst)
+
+###-------------------------------------------------------------------------------###
@@ -0,0 +1,218 @@
+"""
+download_plan.py  :  Dry run of a download: bytes, disk space, and duration
+
+With ``--plan`` the download scripts stop after building their file list and
+print a :class:`DownloadPlan` instead: the size of every file (files whose size
+the folder index did not give are probed with concurrent HEAD requests), what is
+already on disk (complete files and partial downloads), the space still needed
+on each file system against the space free there, and the time the transfer is
+expected to take at the throughput measured in recent runs.
+
+Every download run that completes appends the bytes it transferred and the time
+it took to ~/.uavsar_throughput.json (see :func:`record_throughput`); the estimate
+is the mean throughput of the last few runs.  Plans, runs cut short, and runs
+that took (almost) everything from disk or the cache are not recorded.
+
+Options
+-------
+   --plan  :  print the plan and exit (status 1 if a file system lacks the space needed)
+
+See Also
+--------
+:ref:`folder_index`, :ref:`download_queue`
+"""
+from __future__ import print_function, division
+import os,time,json
+from http_retrieve import partial_size, say
+from download_queue import probe_all
+
+__title__      = 'download_plan.py'
+__author__     = 'UAVSAR_WebPy contributors'
+__email__      = ''
+__created__    = 'October 2026'
+__modified__   = ''
+__version__    = '1.0'
+__status__     = 'Development'
+__conditions__ = 'Use at your own risk.'
+__license__    = """
+Copyright (C) 2026   UAVSAR_WebPy contributors
+--------------------------------------------------------------------
+GNU Licensed
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+--------------------------------------------------------------------
+"""
+
+THROUGHPUT_FILE = os.path.join('~','.uavsar_throughput.json')
+HISTORY = 20          # runs kept in the throughput file
+RECENT = 5            # runs averaged for the estimate
+MIN_SAMPLE = 8 << 20  # runs moving fewer bytes are not recorded
+
+###==============================================================================###
+class DownloadPlan():
+   """
+   Sizes, disk space, and expected duration of downloading urls to filenames
+
+   Parameters
+   ----------
+   urls      :  URLs to download
+   filenames :  local file name of each URL
+   sizes     :  size of each URL in bytes, None where not known [all unknown]
+   session   :  :class:`http_retrieve.Session` used to probe the files of unknown size
+                (None to leave them unknown) [None]
+   jobs      :  number of concurrent probes [8]
+   """
+   def __init__(self,urls,filenames,sizes=None,session=None,jobs=8):
+      self.urls, self.filenames = list(urls), list(filenames)
+      self.sizes = list(sizes) if sizes is not None else [None]*len(self.urls)
+      unknown = [i for i in range(len(self.urls)) if self.sizes[i] is None]
+      if unknown and session is not None:
+         for i, remote in zip(unknown,probe_all([self.urls[i] for i in unknown],session,jobs)):
+            self.sizes[i] = remote.size if remote.available else None
+      self.present = [_present(fname,size) for fname,size in zip(self.filenames,self.sizes)]
+
+   def needed(self):
+      """
+      Bytes still to be downloaded into each file system, as a dict keyed by a
+      directory on it
+      """
+      need = {}
+      for fname, size, present in zip(self.filenames,self.sizes,self.present):
+         if size is None: continue
+         folder = _existing(os.path.dirname(os.path.abspath(fname)))
+         device = os.stat(folder).st_dev
+         if device not in need: need[device] = [folder,0]
+         need[device][1] += max(0,size-present)
+      return dict(need.values())
+
+   def report(self,throughput=None):
+      """
+      Print the plan; returns False if a file system lacks the space needed
+
+      throughput is the rate (bytes/s) for the estimate [:func:`recent_throughput`]
+      """
+      print('%12s %12s  %s' % ('size MB','on disk MB','file'))
+      for url, size, present in zip(self.urls,self.sizes,self.present):
+         print('%12s %12.1f  %s' % ('?' if size is None else '%.1f' % (size/1.e6),present/1.e6,url))
+      known = [i for i in range(len(self.urls)) if self.sizes[i] is not None]
+      total = sum(self.sizes[i] for i in known)
+      todo = sum(max(0,self.sizes[i]-self.present[i]) for i in known)
+      complete = len([i for i in known if self.present[i] >= self.sizes[i]])
+      partial = len([i for i in known if 0 < self.present[i] < self.sizes[i]])
+      print('\nFiles        :  %d (%d complete, %d partial, %d of unknown size)' % (len(self.urls),
+            complete,partial,len(self.urls)-len(known)))
+      print('Total size   :  %s' % _human(total))
+      print('To download  :  %s' % _human(todo))
+      fits = True
+      for folder, need in sorted(self.needed().items()):
+         stat = os.statvfs(folder)
+         free = stat.f_bavail*stat.f_frsize
+         short = need > free
+         fits = fits and not short
+         print('Disk space   :  %s needed, %s free on %s%s' % (_human(need),_human(free),folder,
+               '  *** NOT ENOUGH SPACE ***' if short else ''))
+      if throughput is None:
+         throughput = recent_throughput()
+      if throughput:
+         print('Throughput   :  %.1f MB/s (recent runs)' % (throughput/1.e6))
+         print('Duration     :  %s' % _duration(todo/throughput))
+      else:
+         print('Duration     :  unknown (no throughput measured yet)')
+      return fits
+
+###-------------------------------------------------------------------------------###
+def record_throughput(nbytes,seconds,path=None):
+   """
+   Append a run that transferred nbytes in seconds to the throughput history
+   (runs of less than MIN_SAMPLE bytes are ignored)
+
+   Runs are appended one JSON object per line, so concurrent runs do not lose each
+   other's records; the file is cut back to the last HISTORY runs once it holds
+   twice as many.
+   """
+   if nbytes < MIN_SAMPLE or seconds <= 0: return
+   path = os.path.expanduser(path or THROUGHPUT_FILE)
+   try:
+      fid = open(path,'a')
+      try:
+         fid.write(json.dumps({'time': time.time(), 'bytes': nbytes, 'seconds': seconds})+'\n')
+      finally:
+         fid.close()
+      runs = _load_history(path)
+      if len(runs) >= 2*HISTORY:
+         tmp = '%s.%d.tmp' % (path,os.getpid())
+         fid = open(tmp,'w')
+         try:
+            fid.writelines(json.dumps(run)+'\n' for run in runs[-HISTORY:])
+         finally:
+            fid.close()
+         os.rename(tmp,path)
+   except (IOError,OSError), e:
+      say('cannot record throughput: %s' % e)
+
+def recent_throughput(path=None,runs=RECENT):
+   """
+   Mean throughput in bytes/s of the last runs recorded (None if there are none)
+   """
+   history = _load_history(os.path.expanduser(path or THROUGHPUT_FILE))[-runs:]
+   seconds = sum(run['seconds'] for run in history)
+   if not history or seconds <= 0: return None
+   return sum(run['bytes'] for run in history)/seconds
+
+def _load_history(path):
+   """
+   Runs recorded in path, oldest first
+   """
+   try:
+      fid = open(path)
+      try:
+         lines = fid.readlines()
+      finally:
+         fid.close()
+   except (IOError,OSError):
+      return []
+   runs = []
+   for line in lines:
+      try:
+         record = json.loads(line)
+      except ValueError:      # a line cut short by a full disk
+         continue
+      runs.append(record)
+   return [run for run in runs if isinstance(run,dict) and 'bytes' in run and 'seconds' in run]
+
+###-------------------------------------------------------------------------------###
+def _present(filename,size):
+   """
+   Bytes of filename already on disk: the whole file if complete, else the part file
+   """
+   if os.path.exists(filename) and (size is None or os.path.getsize(filename) == size):
+      return os.path.getsize(filename)
+   return partial_size(filename)
+
+def _existing(folder):
+   while not os.path.exists(folder):
+      folder = os.path.dirname(folder)
+   return folder
+
+def _human(nbytes):
+   for unit, scale in (('TB',1.e12),('GB',1.e9),('MB',1.e6)):
+      if nbytes >= scale: return '%.1f %s' % (nbytes/scale,unit)
+   return '%.1f kB' % (nbytes/1.e3)
+
+def _duration(seconds):
+   seconds = int(round(seconds))
+   return '%d:%02d:%02d' % (seconds//3600,seconds//60 % 60,seconds % 60)
+
+###-------------------------------------------------------------------------------###
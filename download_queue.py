@@ -0,0 +1,458 @@
+"""
+download_queue.py  :  Concurrent scheduler for the family of files built by URLs
+
+The download scripts hand every URL for a flight line (or pair) to a
+:class:`DownloadQueue`, which fetches them with a pool of worker threads while
+capping the number of connections open to any one host.  Per-file progress is
+reported as transfers start and, in the order the files were queued, as they
+finish.
+
+Options
+-------
+   --jobs N      :  number of files downloaded at once [4]
+   --per-host N  :  maximum number of files downloaded at once from one host [4]
+   --segments N  :  split each large file into N byte ranges downloaded at once [1]
+   --segment-min MB  :  smallest file (in MB) that is split into segments [256]
+   --sync        :  only download files that are missing or changed on the server
+   --no-index    :  skip the folder index of :ref:`folder_index`
+   --plan        :  print sizes, disk space, and expected duration instead of downloading,
+                    see :ref:`download_plan`
+   --cache DIR   :  shared cache of downloaded files [$UAVSAR_CACHE]
+   --cache-size GB  :  size limit of the cache [no limit]
+   --engine NAME :  threads (one thread per file) or async (one event loop for all
+                    files, see :ref:`async_download`) [threads]
+   --retries N   :  retries of a failed file, see :ref:`retry_policy` [3]
+   --backoff SEC :  delay before the first retry, doubled for every further one [1]
+   --rate MB     :  limit on the total download rate in MB/s, see :ref:`throttle` [no limit]
+   --host-rate MB   :  limit on the download rate from one host in MB/s [no limit]
+   --rate-file FILE :  file with the rate limits, re-read when it changes
+   --convert LIST   :  convert the products while they download, e.g. amp-phase,look=4x4
+                       (see :ref:`stream_stage`)
+   --lines A:B      :  download only azimuth lines A to B-1 of the slant-range products
+   --samples A:B    :  download only range samples A to B-1 of the slant-range products
+   --bbox S,N,W,E   :  download only the pixels of the ground-projected products inside
+                       the latitude/longitude box (see :ref:`raster_subset`)
+   --events FILE    :  append a JSON line for every transfer event (see :ref:`transfer_metrics`)
+   --prometheus FILE  :  write a summary of the run for the Prometheus textfile collector
+   --progress       :  show the total bytes, rate, and time left of the run on one line
+   --trace FILE     :  write a timeline of the phases of the run as Chrome trace-event JSON
+                       (see :ref:`trace_events`)
+
+Notes
+-----
+* Small files (.ann, .kmz, ...) are started before the rasters queued ahead of
+   them, so they are never stuck behind multi-GB transfers.  With --convert, --lines,
+   --samples, or --bbox the rasters wait until the small files are done, as the .ann is
+   needed to convert or subset them; subsets are downloaded by the threads engine
+
+See Also
+--------
+:ref:`uavsar_insar_download`, :ref:`uavsar_polsar_download`, :ref:`http_retrieve`
+"""
+from __future__ import print_function, division
+import sys,os,time,threading
+from http_retrieve import http_retrieve, RemoteFile, LoginError, say
+from retry_policy import RetryPolicy
+from throttle import Throttle
+from download_cache import DownloadCache
+from trace_events import traced
+
+__title__      = 'download_queue.py'
+__author__     = 'UAVSAR_WebPy contributors'
+__email__      = ''
+__created__    = 'October 2026'
+__modified__   = ''
+__version__    = '1.0'
+__status__     = 'Development'
+__conditions__ = 'Use at your own risk.'
+__license__    = """
+Copyright (C) 2026   UAVSAR_WebPy contributors
+--------------------------------------------------------------------
+GNU Licensed
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+--------------------------------------------------------------------
+"""
+
+###-------------------------------------------------------------------------------###
+def _megabytes(value):
+   return int(float(value)*(1 << 20))
+
+def _gigabytes(value):
+   return int(float(value)*(1 << 30))
+
+def _path(value):
+   return os.path.abspath(os.path.expanduser(value))  # the scripts chdir into the line folder
+
+def _convert(value):
+   from stream_stage import parse_stages
+   return parse_stages(value)
+
+def _window(value):
+   from raster_subset import window_option
+   return window_option(value)
+
+def _bbox(value):
+   from raster_subset import bbox_option
+   return bbox_option(value)
+
+def _engine(value):
+   if value not in ('threads','async'):
+      raise ValueError(value)
+   return value
+
+DOWNLOAD_FLAGS = {'jobs': int, 'per-host': int, 'segments': int, 'segment-min': _megabytes,
+                  'sync': bool, 'cache': _path, 'cache-size': _gigabytes, 'engine': _engine,
+                  'retries': int, 'backoff': float, 'rate': _megabytes, 'host-rate': _megabytes,
+                  'rate-file': _path, 'no-index': bool,
+                  'plan': bool, 'convert': _convert, 'lines': _window, 'samples': _window,
+                  'bbox': _bbox, 'events': _path, 'prometheus': _path, 'progress': bool,
+                  'trace': _path}
+SMALL_FILES = ('.ann','.kmz','.kml','.txt')
+
+###==============================================================================###
+class DownloadQueue():
+   """
+   Download a list of URLs with a pool of worker threads
+
+   Parameters
+   ----------
+   jobs     :  number of worker threads (or of transfers in flight for the async engine) [4]
+   per_host :  maximum number of transfers in flight to a single host [4]
+   engine   :  'threads' or 'async' (:class:`async_download.AsyncEngine`) ['threads']
+   kwargs   :  passed through to :func:`http_retrieve.http_retrieve`
+               (e.g. a shared :class:`http_retrieve.Session`)
+   """
+   def __init__(self,jobs=4,per_host=4,engine='threads',**kwargs):
+      self.jobs = max(1,int(jobs))
+      self.per_host = max(1,int(per_host))
+      self.engine = engine
+      self.kwargs = kwargs
+      if kwargs.get('window') is not None:
+         self.engine = 'threads'  # the event loop streams whole files only
+      if kwargs.get('throttle') is None:  # unlimited, but counts the bytes transferred
+         kwargs['throttle'] = Throttle()
+      self.urls, self.tasks, self.results, self.sizes = [], [], [], []
+      self._pending, self._active = [], {}
+      self._done, self._elapsed = [], []
+      self._abort = None
+      self._cond = threading.Condition()
+
+   def add(self,url,size=None,**kwargs):
+      """
+      Queue url for download; files are started in the order they are added
+
+      size, the expected bytes (e.g. from the folder index), lets the progress of
+      the run be shown with a time left.  Keyword arguments (e.g. filename or
+      manifest) override those given to the queue for this file only.
+      """
+      self.urls.append(url)
+      self.sizes.append(size)
+      self.tasks.append(kwargs)
+      self.results.append(None)
+      self._done.append(False)
+      self._elapsed.append(0.)
+      self._pending.append(len(self.urls)-1)
+
+   @traced('queue')
+   def run(self):
+      """
+      Download everything in the queue and return a list with the local filename
+      of each URL (None where the download failed)
+
+      The bytes transferred and the time taken by a run that completes are added to
+      the throughput history (see :func:`download_plan.record_throughput`).
+      """
+      start, transferred = time.time(), self.kwargs['throttle'].transferred
+      metrics = self.kwargs.get('metrics')
+      if metrics is not None:
+         metrics.begin(len(self.urls),None if None in self.sizes else sum(self.sizes))
+      try:
+         if self.engine == 'async':
+            results = self._run_async()
+         else:
+            results = self._run_threads()
+      finally:
+         if metrics is not None:
+            metrics.end(self.kwargs.get('session'))
+      from download_plan import record_throughput  # not for runs cut short
+      record_throughput(self.kwargs['throttle'].transferred-transferred,time.time()-start)
+      return results
+
+   def _run_threads(self):
+      workers = []
+      for i in range(min(self.jobs,len(self._pending))):
+         t = threading.Thread(target=self._worker)
+         t.daemon = True
+         t.start()
+         workers.append(t)
+
+      nfiles, reported = len(self.urls), 0
+      self._cond.acquire()
+      try:
+         while reported < nfiles:
+            while reported < nfiles and self._done[reported]:
+               self._report(reported)
+               reported += 1
+            if reported < nfiles:
+               if self._abort is not None and not any(self._active.values()):
+                  break
+               self._cond.wait(0.5)
+      finally:
+         self._cond.release()
+      for t in workers:
+         t.join()
+      if self._abort is not None:
+         raise SystemExit(self._abort)
+      return self.results
+
+   def _run_async(self):
+      """
+      Download the queue with one event loop instead of worker threads
+      """
+      from async_download import AsyncEngine
+      kwargs = dict((k,v) for k,v in self.kwargs.items()
+                    if k in ('session','username','password','retries','policy','throttle'))
+      order = sorted(range(len(self.urls)),key=lambda index: (not _small(self.urls[index]),index))
+      batches = [order]
+      if self.kwargs.get('stages'):
+         batches = [[i for i in order if _small(self.urls[i])],
+                    [i for i in order if not _small(self.urls[i])]]
+      reported = [0]
+      def finished(batch,index,fname,elapsed):
+         index = batch[index]
+         self.results[index] = fname
+         self._done[index], self._elapsed[index] = True, elapsed
+         while reported[0] < len(self.urls) and self._done[reported[0]]:
+            self._report(reported[0])
+            reported[0] += 1
+      for batch in batches:
+         engine = AsyncEngine(jobs=self.jobs,per_host=self.per_host,**kwargs)
+         for index in batch:
+            options = dict(self.kwargs)
+            options.update(self.tasks[index])
+            engine.add(self.urls[index],**options)
+         try:
+            engine.run(lambda index,fname,elapsed: finished(batch,index,fname,elapsed))
+         except LoginError, e:
+            raise SystemExit('login failed: %s' % e)
+      return self.results
+
+   def _worker(self):
+      while True:
+         index = self._next_task()
+         if index is None: return
+         url, host = self.urls[index], _host(self.urls[index])
+         say('downloading: '+url)
+         start = time.time()
+         try:
+            kwargs = dict(self.kwargs)
+            kwargs.update(self.tasks[index])
+            self.results[index] = http_retrieve(url,**kwargs)
+         except SystemExit, e:
+            self._cond.acquire()
+            self._abort = e.code
+            self._cond.release()
+         except LoginError, e:
+            self._cond.acquire()
+            self._abort = 'login failed: %s' % e
+            self._cond.release()
+         except Exception, e:
+            say('download failed: %s: %s' % (url,e))
+         self._cond.acquire()
+         self._active[host] -= 1
+         self._done[index] = True
+         self._elapsed[index] = time.time() - start
+         self._cond.notify_all()
+         self._cond.release()
+
+   def _next_task(self):
+      """
+      Pop the first pending task whose host has a free connection slot (with stages or
+      a window, no raster before every small file is done)
+      """
+      self._cond.acquire()
+      try:
+         while self._pending and self._abort is None:
+            self._pending.sort(key=lambda index: (not _small(self.urls[index]),index))
+            hold = (self.kwargs.get('stages') or self.kwargs.get('window')) and [i for i in range(len(self.urls))
+                                                  if _small(self.urls[i]) and not self._done[i]]
+            for i,index in enumerate(self._pending):
+               if hold and not _small(self.urls[index]): continue
+               host = _host(self.urls[index])
+               if self._active.get(host,0) < self.per_host:
+                  self._active[host] = self._active.get(host,0) + 1
+                  return self._pending.pop(i)
+            self._cond.wait()
+         return None
+      finally:
+         self._cond.release()
+
+   def _report(self,index):
+      fname, elapsed = self.results[index], self._elapsed[index]
+      tag = '[%d/%d]' % (index+1,len(self.urls))
+      if fname is None:
+         say('%s failed: %s' % (tag,self.urls[index]))
+      else:
+         size = os.path.getsize(fname) if os.path.exists(fname) else 0
+         say('%s finished: %s  (%.1f MB in %.1f s)' % (tag,fname,size/1.e6,elapsed))
+
+###-------------------------------------------------------------------------------###
+def retrieve_options(opts):
+   """
+   Turn options from :func:`get_options` into keyword arguments for :class:`DownloadQueue`
+
+   Options handled by the scripts themselves (sync, no_index, plan, and trace, which
+   they enable once the arguments are checked) are dropped, the cache directory (or $UAVSAR_CACHE) is
+   opened as a :class:`download_cache.DownloadCache`,
+   the stages to --convert with are passed on as stages, --lines, --samples, and
+   --bbox as a :class:`raster_subset.Window`, and --events, --prometheus, and
+   --progress as a :class:`transfer_metrics.TransferMetrics`.
+   """
+   kwargs = dict(opts)
+   kwargs.pop('sync',None)
+   kwargs.pop('no_index',None)
+   kwargs.pop('plan',None)
+   kwargs.pop('trace',None)
+   if 'retries' in kwargs or 'backoff' in kwargs:
+      kwargs['policy'] = RetryPolicy(kwargs.pop('retries',3),kwargs.pop('backoff',1.))
+   if 'rate' in kwargs or 'host_rate' in kwargs or 'rate_file' in kwargs:
+      kwargs['throttle'] = Throttle(kwargs.pop('rate',None),kwargs.pop('host_rate',None),
+                                    kwargs.pop('rate_file',None))
+   if 'convert' in kwargs:
+      kwargs['stages'] = kwargs.pop('convert')
+   if 'lines' in kwargs or 'samples' in kwargs or 'bbox' in kwargs:
+      from raster_subset import Window
+      kwargs['window'] = Window(kwargs.pop('lines',None),kwargs.pop('samples',None),
+                                kwargs.pop('bbox',None))
+   if 'events' in kwargs or 'prometheus' in kwargs or 'progress' in kwargs:
+      from transfer_metrics import TransferMetrics
+      kwargs['metrics'] = TransferMetrics(kwargs.pop('events',None),kwargs.pop('prometheus',None),
+                                          kwargs.pop('progress',False))
+   root = kwargs.pop('cache',os.getenv('UAVSAR_CACHE'))
+   size = kwargs.pop('cache_size',None)
+   if root:
+      kwargs['cache'] = DownloadCache(root,max_bytes=size)
+   return kwargs
+
+###-------------------------------------------------------------------------------###
+def probe_all(urls,session,jobs=8):
+   """
+   Probe every URL in urls with up to jobs concurrent HEAD requests
+
+   Returns a list of :class:`http_retrieve.RemoteFile` in the order of urls.
+   """
+   def probe(url):
+      try:
+         return session.probe(url)
+      except Exception, e:
+         say('probe failed: %s: %s' % (url,e))
+         return RemoteFile(url)
+   return map_threads(probe,urls,jobs)
+
+def map_threads(function,items,jobs=8):
+   """
+   [function(item) for item in items], run by up to jobs threads; function must
+   catch its own errors
+   """
+   results, pending = [None]*len(items), list(range(len(items)))
+   lock = threading.Lock()
+   def worker():
+      while True:
+         lock.acquire()
+         try:
+            if not pending: return
+            index = pending.pop(0)
+         finally:
+            lock.release()
+         results[index] = function(items[index])
+   threads = [threading.Thread(target=worker) for i in range(max(1,min(jobs,len(items))))]
+   for t in threads:
+      t.daemon = True
+      t.start()
+   for t in threads:
+      t.join()
+   return results
+
+###-------------------------------------------------------------------------------###
+@traced('sync_filter')
+def sync_filter(urls,session,manifest,jobs=8):
+   """
+   Return the subset of urls whose local copies are missing or out of date
+
+   Each URL is checked with a HEAD request against the local file and its record
+   in manifest, a :class:`line_manifest.LineManifest` for the folder holding the
+   files or a list with one manifest per URL.
+   """
+   if not isinstance(manifest,list):
+      manifest = [manifest]*len(urls)
+   stale = []
+   for url, man, remote in zip(urls,manifest,probe_all(urls,session,jobs)):
+      fname = url.split('/')[-1]
+      if man.is_current(fname,remote):
+         say('up to date: '+fname)
+      else:
+         stale.append(url)
+   return stale
+
+###-------------------------------------------------------------------------------###
+def _host(url):
+   return url.split('://')[-1].split('/')[0]
+
+def _small(url):
+   return os.path.splitext(url)[1].lower() in SMALL_FILES
+
+###-------------------------------------------------------------------------------###
+def get_options(args,flags=DOWNLOAD_FLAGS):
+   """
+   Split ``--name value`` (or ``--name=value``) options out of args
+
+   flags maps each option name to its type; options of type bool take no value.
+   Returns the remaining positional arguments and a dict of options whose keys
+   have dashes replaced by underscores.  File and directory options are made
+   absolute here, before the scripts change into the line folder.
+   """
+   positional, opts = [], {}
+   i = 0
+   while i < len(args):
+      arg = args[i]
+      if arg[:2] != '--':
+         positional.append(arg)
+         i += 1
+         continue
+      name, value = arg[2:], None
+      if '=' in name:
+         name, value = name.split('=',1)
+      if name not in flags:
+         print('Invalid option: ',arg)
+         sys.exit()
+      if flags[name] is bool:
+         opts[name.replace('-','_')] = True
+      else:
+         if value is None:
+            i += 1
+            if i >= len(args):
+               print('Option requires a value: ',arg)
+               sys.exit()
+            value = args[i]
+         try:
+            opts[name.replace('-','_')] = flags[name](value)
+         except ValueError:
+            print('Invalid value for option --'+name+': ',value)
+            sys.exit()
+      i += 1
+   return positional, opts
+
+###-------------------------------------------------------------------------------###
@@ -0,0 +1,224 @@
+"""
+folder_index.py  :  Index of the files that actually exist in a flight-line folder
+
+The download scripts build their file lists by crossing the sample name with
+every requested para, type, and channel, so some of the names they produce do
+not exist on the server (e.g. hgt outside grd, channels that were not
+processed).  :func:`folder_index` reads the folder listing once, or probes the
+candidate names with concurrent HEAD requests where the server does not list
+folders, and returns a :class:`FolderIndex` with the size of every file found.
+Names the index knows to be absent are dropped before anything is queued, and
+the sizes of the rest give the byte count of the run up front.
+
+Options
+-------
+   --no-index  :  queue every candidate name without looking at the folder first
+
+Notes
+-----
+* A listing that names none of the candidate files (e.g. a landing page served
+   in place of the folder) is not trusted and the candidates are probed instead
+
+* Listings that abbreviate sizes (1.2M) are followed by HEAD requests for the
+   candidates found, so the byte count stays exact
+
+* Candidates whose probe failed for a reason other than an HTTP status (e.g. a
+   dropped connection) are kept and left to the download to sort out
+
+See Also
+--------
+:ref:`download_queue`, :ref:`uavsar_insar_download`, :ref:`uavsar_polsar_download`
+"""
+from __future__ import print_function, division
+import re,urllib,urlparse
+from urllib2 import HTTPError, URLError
+from http_retrieve import RemoteFile, say
+from download_queue import probe_all, map_threads
+from trace_events import traced
+
+__title__      = 'folder_index.py'
+__author__     = 'UAVSAR_WebPy contributors'
+__email__      = ''
+__created__    = 'October 2026'
+__modified__   = ''
+__version__    = '1.0'
+__status__     = 'Development'
+__conditions__ = 'Use at your own risk.'
+__license__    = """
+Copyright (C) 2026   UAVSAR_WebPy contributors
+--------------------------------------------------------------------
+GNU Licensed
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+--------------------------------------------------------------------
+"""
+
+LINK = re.compile(r'<a\s[^>]*?href\s*=\s*["\']([^"\']+)["\'][^>]*>.*?</a>(.*?)(?=<a\s|$)',re.I)
+TAG = re.compile(r'<[^>]*>')
+
+###==============================================================================###
+class FolderIndex():
+   """
+   Files known to exist (or to be missing) in one folder
+
+   Parameters
+   ----------
+   url    :  folder URL, ending with /
+   files  :  dict of file name to :class:`http_retrieve.RemoteFile` [{}]
+   source :  how the index was built: 'listing', 'probe', or None (nothing known) [None]
+
+   A name absent from files is missing if the index came from a listing and
+   unknown otherwise.
+   """
+   def __init__(self,url,files=None,source=None):
+      self.url, self.source = url, source
+      self.files = files if files is not None else {}
+
+   def __contains__(self,name):
+      remote = self.files.get(name)
+      return remote is not None and remote.available
+
+   def missing(self,name):
+      """
+      True if name is known not to exist on the server
+      """
+      remote = self.files.get(name)
+      if remote is None:
+         return self.source == 'listing'
+      return remote.status is not None and not remote.available
+
+   def size(self,name):
+      """
+      Size of name in bytes (None if not known)
+      """
+      remote = self.files.get(name)
+      return remote.size if remote is not None and remote.available else None
+
+   def select(self,filenames):
+      """
+      Split filenames into those worth requesting (in the given order) and those
+      known to be missing
+      """
+      found, missing = [], []
+      for name in filenames:
+         (missing if self.missing(name) else found).append(name)
+      return found, missing
+
+   def total(self,filenames):
+      """
+      Total size in bytes of filenames and the number of them whose size is unknown
+      """
+      nbytes, unknown = 0, 0
+      for name in filenames:
+         size = self.size(name)
+         if size is None:
+            unknown += 1
+         else:
+            nbytes += size
+      return nbytes, unknown
+
+###-------------------------------------------------------------------------------###
+@traced('folder_index')
+def folder_index(url,session,filenames,jobs=8):
+   """
+   Build a :class:`FolderIndex` for the folder url holding the candidate filenames
+
+   The folder listing is fetched with session; if the server does not list the
+   folder, or the listing names none of the candidates, each candidate is probed
+   with up to jobs concurrent HEAD requests instead.
+   """
+   if url[-1] != '/': url += '/'
+   files = list_folder(url,session)
+   if files and any(name in files for name in filenames):
+      rough = [name for name in filenames if name in files and files[name].size is None]
+      for name, remote in zip(rough,probe_all([url+name for name in rough],session,jobs)):
+         if remote.available: files[name] = remote
+      return FolderIndex(url,files,'listing')
+   remotes = probe_all([url+name for name in filenames],session,jobs)
+   return FolderIndex(url,dict(zip(filenames,remotes)),'probe')
+
+def folder_indexes(folders,session,jobs=8):
+   """
+   Index several folders at once: folders is a list of (url, filenames), where a
+   folder may appear more than once; each distinct folder is indexed once, for all
+   of its candidates, with up to jobs folders (and jobs requests) in flight.
+   Returns a dict of folder url to :class:`FolderIndex`.
+   """
+   candidates, order = {}, []
+   for url, filenames in folders:
+      if url not in candidates:
+         candidates[url] = []
+         order.append(url)
+      candidates[url] += [name for name in filenames if name not in candidates[url]]
+   share = max(1,jobs//max(1,min(jobs,len(order))))
+   def index(url):
+      try:
+         return folder_index(url,session,candidates[url],share)
+      except Exception, e:
+         say('Cannot index %s (queueing every candidate): %s' % (url,e))
+         return FolderIndex(url)
+   return dict(zip(order,map_threads(index,order,jobs)))
+
+###-------------------------------------------------------------------------------###
+def list_folder(url,session):
+   """
+   Fetch and parse the listing of the folder url (see :func:`parse_listing`);
+   returns None if the server does not list it
+   """
+   try:
+      res = session.open(url)
+   except HTTPError, e:
+      e.close()
+      return None
+   except URLError, e:
+      say('folder listing failed: %s: %s' % (url,e))
+      return None
+   try:
+      if 'html' not in (res.info().getheader('Content-Type') or 'text/html'):
+         return None
+      return parse_listing(res.read(),url)
+   finally:
+      res.close()
+
+###-------------------------------------------------------------------------------###
+def parse_listing(html,url):
+   """
+   Parse an HTML folder listing (Apache or nginx style, plain or tabulated)
+
+   Returns a dict of file name to :class:`http_retrieve.RemoteFile` for the files
+   directly inside url; sub-folders, sort links, and links elsewhere are skipped.
+   Sizes that are abbreviated (1.2M) are left as None.
+   """
+   files = {}
+   for line in html.splitlines():
+      for href, tail in LINK.findall(line):
+         href = urlparse.urljoin(url,href.replace('&amp;','&'))
+         if not href.startswith(url) or '?' in href or '#' in href: continue
+         name = urllib.unquote(href[len(url):])
+         if not name or '/' in name: continue
+         remote = RemoteFile(href,200)
+         fields = TAG.sub(' ',tail).split()
+         if fields:
+            remote.size = _listed_size(fields[-1])
+         files[name] = remote
+   return files
+
+def _listed_size(field):
+   """
+   Size in bytes from the size column of a listing (None if absent or abbreviated)
+   """
+   return int(field) if field.isdigit() else None
+
+###-------------------------------------------------------------------------------###
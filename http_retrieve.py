@@ -7,12 +7,16 @@ Usage:
 
 .. code-block:: bash 
 
-   $ http_retrieve.py url
+   $ http_retrieve.py url [--probe]
 
 Parameter
 ---------
 url   :  file URL 
 
+Options
+-------
+--probe  :  report the size and availability of the file without downloading it
+
 Notes
 -----
 * Python Mechanize (http://wwwsearch.sourceforge.net/mechanize/) must be installed and 
@@ -25,9 +29,27 @@ Notes
 * If $HOME/.dathack.d is not found or if line uavsarhttp:<username>:<password> is not
    present, the routine will prompt the user for the username and password
 
+* To download many files, create one :class:`Session` and pass it to each call of
+   :func:`http_retrieve`; cookies, connections, and the login are then shared
+
+* Files are written to <file>.part until complete.  An interrupted download leaves
+   <file>.part and <file>.part.json behind and is resumed where it stopped the next
+   time the same file is requested
+
+* Checksums of the data are computed as it is written and a download is only
+   accepted if its size matches the size reported by the server
+
 """
 from __future__ import print_function, division
-import sys,os
+import sys,os,time,socket,threading,httplib,urllib,urlparse,json
+from urllib2 import HTTPError, URLError
+try:
+   import mechanize
+except ImportError:
+   raise ImportError(' '.join(__doc__.split('*')[1].split()))
+from line_manifest import PieceHasher, complete_pieces, file_checksum, PIECE_SIZE
+from retry_policy import RetryPolicy, CircuitBreaker
+from trace_events import span, traced, enabled
 
 __title__      = 'http_retrieve.py'
 __author__     = 'Brent Minchew'
@@ -58,39 +80,918 @@ GNU Licensed
 --------------------------------------------------------------------
 """
 
+BLOCKSIZE = 1 << 20
+SEGMENT_MIN = 256 << 20
+
 ###==============================================================================###
-def http_retrieve(url,username=None,password=None):
+def http_retrieve(url,username=None,password=None,session=None,filename=None,retries=3,
+                  segments=1,segment_min=SEGMENT_MIN,manifest=None,cache=None,policy=None,
+                  throttle=None,stages=None,window=None,metrics=None):
+   """
+   Download url and return the local filename (None if nothing was downloaded)
+
+   Data are written to filename + '.part' and renamed when the transfer is
+   complete.  An interrupted transfer is resumed with a Range request, both on
+   a retry and on a later run, provided the server still reports the same
+   ETag/Last-Modified and size.
+
+   Failures are retried according to policy, a :class:`retry_policy.RetryPolicy`
+   [RetryPolicy(retries)]: dropped connections, timeouts, and 408/429/5xx answers
+   are retried with exponential backoff (the count starts over whenever a retry
+   made progress), other errors are not.  Requests wait while the circuit breaker
+   of the session has the host shut off.  A refused login raises :class:`LoginError`.
+
+   throttle, a :class:`throttle.Throttle` shared by the downloads of a run, limits
+   the rate at which data are read.
+
+   stages, a list of :class:`stream_stage.StreamStage` factories (see
+   :func:`stream_stage.parse_stages`), convert the file while it is downloaded.
+
+   With a :class:`raster_subset.Window` as window, only that window of a product
+   is downloaded (see :ref:`raster_subset`) and the name of the subset is returned;
+   files the window does not apply to are downloaded whole.
+
+   With segments > 1, files of at least segment_min bytes on servers that honor
+   Range requests are split into that many byte ranges that are downloaded at
+   once and written in place into a preallocated file.  Other files (or servers)
+   fall back to a single stream.
+
+   Pass a :class:`Session` to share cookies, connections, and the ASF login
+   across many files; otherwise a new session is created for this file alone.
+   filename defaults to the last component of url in the current directory.
+   A completed download is recorded, with the checksums computed while it was
+   written, in manifest, a :class:`line_manifest.LineManifest`, when one is given.
+
+   With a :class:`download_cache.DownloadCache` as cache, the file is first
+   probed and, if the cache holds the same version, linked from the cache
+   instead of downloaded; downloaded files are added to the cache.
+
+   The bytes, time to first byte, logins, retries, and outcome of the download
+   are recorded in metrics, a :class:`transfer_metrics.TransferMetrics`, if given,
+   and its phases in the trace when tracing is on (see :ref:`trace_events`).
+   """
+   args = (url,username,password,session,filename,retries,segments,segment_min,manifest,
+           cache,policy,throttle,stages,window)
+   with span('http_retrieve',url=url) as phase:
+      result = _measured(args,metrics)
+      phase.set(result=result)
+   return result
+
+def _measured(args,metrics):
+   """
+   _retrieve(*args), followed in metrics when given
+   """
+   url, filename = args[0], args[4]
+   if metrics is None:
+      return _retrieve(*args)
+   transfer = metrics.transfer(url,filename or url.split('/')[-1])
+   previous, _current.transfer = getattr(_current,'transfer',None), transfer
    try:
-      import re, mechanize
+      result = _retrieve(*args+(transfer,))
    except:
-      print(__doc__.split('*')[1])
-      sys.exit()
-   from urllib2 import HTTPError
+      transfer.finish('failed')
+      raise
+   finally:
+      _current.transfer = previous
+   if result is None:
+      transfer.finish('failed')
+   else:
+      transfer.finish('cached' if transfer.source == 'cache' else 'done',result)
+   return result
+
+_current = threading.local()  # the transfer followed in this thread, for the logins
+
+def _retrieve(url,username,password,session,filename,retries,segments,segment_min,manifest,
+              cache,policy,throttle,stages,window,transfer=None):
+   if transfer is not None:
+      throttle = transfer.counting(throttle)
+   if session is None:
+      session = Session(username=username,password=password)
+   if filename is None:
+      filename = url.split('/')[-1]
+   if policy is None:
+      policy = RetryPolicy(retries)
+   if window is not None:
+      from raster_subset import plan_subset
+      try:
+         subset = plan_subset(filename,window)
+      except ValueError, e:
+         say('Cannot subset %s: %s' % (url,e))
+         return None
+      if subset is not None:
+         result = subset.retrieve(session,url,policy,throttle)
+         if result is not None and stages:
+            from stream_stage import convert_file, replacement
+            if replacement(result,stages) in convert_file(result,stages):
+               result = replacement(result,stages)
+         return result
+   if cache is not None:
+      with span('cache lookup',url=url) as phase:
+         remote = session.probe(url)
+         hit = remote.available and _cache_fetch(cache,remote,filename,stages)
+         phase.set(hit=bool(hit))
+      if hit:
+         say('from cache: '+hit)
+         if transfer is not None: transfer.source = 'cache'
+         hit, checksum = _cache_hit(cache,remote,filename,hit,stages)
+         if manifest is not None:
+            manifest.record(hit,remote,checksum)
+         return hit
+   host = urlparse.urlsplit(url).netloc
+   attempt = 0
+   while True:
+      session.breaker.wait(host)
+      done = partial_size(filename)
+      try:
+         filename, remote, checksum = _fetch(session,url,filename,segments=segments,
+                                             segment_min=segment_min,throttle=throttle,
+                                             stages=stages)
+         session.breaker.success(host)
+         if cache is not None:
+            cache.store(remote,filename,checksum)
+         if manifest is not None:
+            manifest.record(filename,remote,checksum)
+         return filename
+      except HTTPError, e:
+         e.close()
+         if not policy.retryable(e):
+            session.breaker.success(host)  # the server is up, it just said no
+         if e.code in (404,410):
+            say('Nothing to download at URL: '+url)
+            return None
+         if not policy.retryable(e):
+            say('Download failed: %d: %s: %s' % (e.code,e.msg,url))
+            return None
+         error = e
+      except (URLError,socket.error,httplib.HTTPException), e:
+         error = e
+      if session.breaker.failure(host):
+         say('Too many failures, pausing all requests to %s' % host)
+      if partial_size(filename) > done:
+         attempt = 0                 # the transfer moved on before it broke
+      attempt += 1
+      if attempt > policy.retries:
+         say('Download failed after %d attempts (%s): %s' % (attempt,error,url))
+         return None
+      delay = policy.delay(attempt,error)
+      say('Transfer failed (%s), retrying in %.1f s: %s' % (error,delay,url))
+      if transfer is not None: transfer.retry(error)
+      with span('backoff',url=url,attempt=attempt,error=str(error)):
+         time.sleep(delay)
+
+def partial_size(filename):
+   """
+   Bytes of filename already downloaded (in its part file)
+   """
+   part = filename + '.part'
+   if not os.path.exists(part): return 0
+   state = _load_state(part)
+   if state is not None and state.get('segments'):
+      return sum(seg[2]-seg[0] for seg in state['segments'])
+   return os.path.getsize(part)
+
+###-------------------------------------------------------------------------------###
+def http_probe(url,username=None,password=None,session=None):
+   """
+   Learn the size and availability of url without downloading it
+
+   Returns a :class:`RemoteFile`; its available attribute is False if the file
+   does not exist.
+   """
+   if session is None:
+      session = Session(username=username,password=password)
+   return session.probe(url)
+
+###-------------------------------------------------------------------------------###
+def _fetch(session,url,filename,blocksize=BLOCKSIZE,segments=1,segment_min=SEGMENT_MIN,
+           throttle=None,stages=None):
+   """
+   Download url to filename, resuming from filename.part when it is valid
+
+   Returns filename (or the stage output that replaces it, see
+   :ref:`stream_stage`), the :class:`RemoteFile` describing what was downloaded,
+   and the checksum record of that file (see :func:`line_manifest.complete_pieces`).
+   """
+   part = filename + '.part'
+   state = _load_state(part)
+   if segments > 1 or (state is not None and state.get('segments')):
+      remote = session.probe(url)
+      if (remote.available and remote.accept_ranges and remote.size and
+            remote.size >= segment_min):
+         fetched = _fetch_segmented(session,url,part,remote,max(segments,1),blocksize,throttle,
+                                    stages,filename)
+         if fetched is not None:
+            checksum, pipeline = fetched
+            filename, checksum = _kept(_finish(part,filename),pipeline,checksum)
+            return filename, remote, checksum
+         state = None
+   offset = 0
+   if (state is not None and os.path.exists(part) and state.get('url') == url and
+         not state.get('segments')):
+      offset = os.path.getsize(part)
+   headers = {}
+   if offset > 0:
+      headers['Range'] = 'bytes=%d-' % offset
+      if _validator(state): headers['If-Range'] = _validator(state)
 
-   br = mechanize.Browser()
    try:
-      res = br.open(url)
-   except HTTPError, e:  # is a file is password protected, enter info and move on
-      br.select_form(nr=0)
-      if username==None or password==None:
-         username, password = get_password()
-         br['userid']   = username
-         br['password'] = password
+      res = session.open(url,headers=headers)
+   except HTTPError, e:
+      if e.code != 416 or offset == 0: raise
+      e.close()                      # stale partial file; start over
+      offset, headers = 0, {}
+      res = session.open(url)
+
+   remote = RemoteFile(url,res.code,res.info())
+   if res.code == 206:
+      start, total = _content_range(res.info())
+      if (start != offset or total != state.get('size') or
+            (remote.etag and state.get('etag') and remote.etag != state.get('etag')) or
+            (remote.last_modified and state.get('last_modified') and
+               remote.last_modified != state.get('last_modified'))):
+         res.close()                 # the file changed on the server; start over
+         res = session.open(url)
+         remote = RemoteFile(url,res.code,res.info())
+         offset = 0
       else:
-         br['userid']   = username
-         br['password'] = password
-      try:
-         br.submit()
-      except HTTPError, e: 
-         sys.exit("submit failed: %d: %s" % (e.code, e.msg))
-      br.open(url)
+         remote.size = total
+   else:
+      offset = 0                     # server ignored (or declined) the Range request
+
+   pieces = state.get('pieces',{}) if offset > 0 else {}
+   state = {'url': url, 'size': remote.size, 'etag': remote.etag,
+            'last_modified': remote.last_modified, 'pieces': pieces}
+   _save_state(part,state)
+   hasher = PieceHasher(pieces,offset,part)
+   pipeline = _pipeline(stages,filename,offset,remote.size)
+   nread, nsave = offset, 0
+   fid = open(part,'ab' if offset > 0 else 'wb')
    try:
-      br.retrieve(url, url.split('/')[-1])
+      with span('body',url=url,offset=offset) as phase:
+         while True:
+            block = res.read(throttle.blocksize(blocksize) if throttle else blocksize)
+            if not block: break
+            fid.write(block)
+            hasher.update(block)
+            if pipeline is not None: pipeline.feed(nread,block)
+            if throttle is not None:
+               throttle.wait(urlparse.urlsplit(url).hostname,len(block))
+            nread += len(block)
+            nsave += 1
+            if nsave % 32 == 0:
+               fid.flush()
+               _save_state(part,state)
+         phase.set(bytes=nread-offset)
    except:
-      print('Nothing to download at URL: '+url)
+      if pipeline is not None: pipeline.abort()
+      raise
+   finally:
+      fid.close()
+      res.close()
+      if os.path.exists(part): _save_state(part,state)
+   if remote.size is not None and nread != remote.size:
+      if pipeline is not None: pipeline.abort()
+      if nread > remote.size:      # not the file we asked about; do not resume from it
+         os.remove(part)
+         os.remove(part+'.json')
+      raise mechanize.ContentTooShortError('retrieval incomplete: got %d out of %d bytes'
+                                             % (nread,remote.size),(part,res.info()))
+   with span('checksum',url=url):
+      hasher.finish(nread)
+      checksum = complete_pieces(part,pieces,nread)
+   if pipeline is not None:
+      with span('convert finish',url=url):
+         pipeline.finish(nread)
+   filename, checksum = _kept(_finish(part,filename),pipeline,checksum)
+   return filename, remote, checksum
+
+###-------------------------------------------------------------------------------###
+def _fetch_segmented(session,url,part,remote,segments,blocksize=BLOCKSIZE,throttle=None,
+                     stages=None,filename=None):
+   """
+   Download url into part as concurrent byte ranges
+
+   part is preallocated to the full size and each range is written in place by
+   its own thread.  Progress of every range is kept in the sidecar so an
+   interrupted download resumes range by range.  Ranges start on checksum piece
+   boundaries so each thread hashes its own pieces.  The stages are fed the
+   first range as it arrives and the rest from part at the end.  Returns the checksum record
+   of the file and the finished pipeline, or None (after removing part) if the server
+   does not honor the Range requests.
+   """
+   state = _load_state(part)
+   if (state is None or not state.get('segments') or not os.path.exists(part) or
+         [state.get(k) for k in ('url','size','etag','last_modified')] !=
+         [url,remote.size,remote.etag,remote.last_modified]):
+      step = -(-remote.size // segments)
+      step = -(-step // PIECE_SIZE) * PIECE_SIZE
+      state = {'url': url, 'size': remote.size, 'etag': remote.etag,
+               'last_modified': remote.last_modified,
+               'segments': [[start,min(start+step,remote.size)-1,start]
+                              for start in range(0,remote.size,step)], 'pieces': {}}
+      fid = open(part,'wb')
+      fid.truncate(remote.size)
+      fid.close()
+      _save_state(part,state)
+
+   pipeline = _pipeline(stages,filename,state['segments'][0][2],remote.size)
+   lock, errors, threads = threading.Lock(), [], []
+   for seg in state['segments']:
+      if seg[2] > seg[1]: continue
+      t = threading.Thread(target=_fetch_range,
+                           args=(session,url,part,state,seg,lock,errors,blocksize,throttle,
+                                 pipeline))
+      t.daemon = True
+      t.start()
+      threads.append(t)
+   for t in threads:
+      t.join()
+
+   if errors and pipeline is not None:
+      pipeline.abort()
+   if _RangeIgnored in [type(e) for e in errors]:
+      os.remove(part)
+      os.remove(part+'.json')
+      return None
+   _save_state(part,state)
+   if errors:
+      raise errors[0]
+   with span('checksum',url=url):
+      checksum = complete_pieces(part,state.setdefault('pieces',{}),remote.size)
+   if pipeline is not None:
+      with span('convert finish',url=url):
+         pipeline.finish(remote.size)
+   return checksum, pipeline
+
+class _RangeIgnored(Exception):
+   pass
+
+def _fetch_range(session,url,part,state,seg,lock,errors,blocksize=BLOCKSIZE,throttle=None,
+                 pipeline=None):
+   """
+   Thread target: download bytes seg[2] to seg[1] of url into part at the same offset
+   """
+   headers = {'Range': 'bytes=%d-%d' % (seg[2],seg[1])}
+   if _validator(state): headers['If-Range'] = _validator(state)
+   try:
+      res = session.open(url,headers=headers)
+      try:
+         if res.code != 206 or _content_range(res.info())[0] != seg[2]:
+            raise _RangeIgnored(url)
+         pieces = {}
+         hasher = PieceHasher(pieces,seg[2],part,start=seg[0])
+         fid = open(part,'r+b')
+         try:
+            fid.seek(seg[2])
+            first, nsave = seg[2], 0
+            with span('body',url=url,offset=first) as phase:
+               while seg[2] <= seg[1]:
+                  block = res.read(min(throttle.blocksize(blocksize) if throttle else blocksize,
+                                       seg[1]-seg[2]+1))
+                  if not block:
+                     raise mechanize.ContentTooShortError('range %d-%d incomplete at byte %d'
+                                                            % (seg[0],seg[1],seg[2]),None)
+                  fid.write(block)
+                  hasher.update(block)
+                  if pipeline is not None: pipeline.feed(seg[2],block)
+                  if seg[2] + len(block) > seg[1]: hasher.finish(state['size'])
+                  if throttle is not None:
+                     throttle.wait(urlparse.urlsplit(url).hostname,len(block))
+                  lock.acquire()
+                  try:
+                     seg[2] += len(block)
+                     if pieces:
+                        state.setdefault('pieces',{}).update(pieces)
+                        pieces.clear()
+                     nsave += 1
+                     if nsave % 32 == 0:
+                        fid.flush()
+                        _save_state(part,state)
+                  finally:
+                     lock.release()
+               phase.set(bytes=seg[2]-first)
+         finally:
+            fid.close()
+      finally:
+         res.close()
+   except Exception, e:
+      lock.acquire()
+      errors.append(e)
+      lock.release()
+
+###-------------------------------------------------------------------------------###
+def _pipeline(stages,filename,done,size=None):
+   """
+   A started :class:`stream_stage.StreamPipeline` for filename (None without stages)
+   """
+   if not stages: return None
+   from stream_stage import stream_pipeline
+   return stream_pipeline(filename,stages,done,size=size)
+
+def _finish(part,filename):
+   """
+   Move a completed part file into place and drop its sidecar
+   """
+   if os.path.exists(filename): os.remove(filename)
+   os.rename(part,filename)
+   os.remove(part+'.json')
+   return filename
+
+def _kept(filename,pipeline,checksum):
+   """
+   The finished product as it is kept, and its checksum record: filename, or the
+   output of pipeline that replaces it (tile-only), in which case filename is removed
+   """
+   if pipeline is None or pipeline.replacement is None:
+      return filename, checksum
+   os.remove(filename)
+   return pipeline.replacement, file_checksum(pipeline.replacement)
+
+def _cache_fetch(cache,remote,filename,stages):
+   """
+   Take remote from cache as filename, or as the output that replaces it when the
+   stages replace the product and that output is cached; returns the name taken
+   or False
+   """
+   if stages:
+      from stream_stage import replacement
+      kept = replacement(filename,stages)
+      if kept is not None and cache.fetch(remote,kept): return kept
+   return cache.fetch(remote,filename) and filename
+
+def _cache_hit(cache,remote,filename,hit,stages):
+   """
+   Run the stages over the product filename taken from cache (as hit, see
+   :func:`_cache_fetch`); returns the name it is kept under and its checksum record.
+   A product replaced by its tiles is cached again as those.
+   """
+   checksum = cache.checksum(remote,hit)
+   if hit != filename or not stages:
+      return hit, checksum
+   from stream_stage import convert_file, replacement
+   kept = replacement(filename,stages)
+   if kept in convert_file(filename,stages):
+      checksum = file_checksum(kept)
+      cache.store(remote,kept,checksum)
+      return kept, checksum
+   return filename, checksum
+
+def _validator(state):
+   """
+   Value for an If-Range header from a saved state (weak ETags are not allowed)
+   """
+   validator = state.get('etag')
+   if not validator or validator[:2] == 'W/':
+      validator = state.get('last_modified')
+   return validator
+
+###-------------------------------------------------------------------------------###
+_say_lock = threading.Lock()
+_status = [None]
+def say(msg):
+   """
+   Print msg as a single line, even when called from several threads at once
+   """
+   _say_lock.acquire()
+   try:
+      if _status[0] is not None:  # print above the status line and draw it again
+         sys.stdout.write('\r\033[K'+msg+'\n'+_status[0])
+      else:
+         sys.stdout.write(msg+'\n')
+      sys.stdout.flush()
+   finally:
+      _say_lock.release()
+
+def set_status(line):
+   """
+   Show line at the bottom of the terminal, below what :func:`say` prints (None removes it)
+   """
+   _say_lock.acquire()
+   try:
+      if line is not None or _status[0] is not None:
+         sys.stdout.write('\r\033[K'+(line or ''))
+         sys.stdout.flush()
+      _status[0] = line
+   finally:
+      _say_lock.release()
+
+###-------------------------------------------------------------------------------###
+def _content_range(headers):
+   """
+   Return (first byte, total size) from a Content-Range header
+   """
+   try:
+      crange = headers.getheader('Content-Range').split()[-1]
+      first = int(crange.split('-')[0])
+      total = crange.split('/')[-1]
+      return first, (int(total) if total != '*' else None)
+   except (AttributeError,ValueError):
+      return None, None
+
+def _load_state(part):
+   """
+   Read the JSON sidecar describing a partial download (None if absent)
+   """
+   try:
+      fid = open(part+'.json')
+      try:
+         return json.load(fid)
+      finally:
+         fid.close()
+   except (IOError,ValueError):
+      return None
+
+def _save_state(part,state):
+   fid = open(part+'.json','w')
+   try:
+      json.dump(state,fid)
+   finally:
+      fid.close()
+
+###-------------------------------------------------------------------------------###
+class RemoteFile():
+   """
+   Metadata of a remote file learned from its response headers
+
+   Attributes
+   ----------
+   url           :  file URL
+   status        :  HTTP status code of the probe
+   available     :  True if the file exists and may be downloaded
+   size          :  size in bytes (None if the server did not say)
+   etag          :  ETag header (or None)
+   last_modified :  Last-Modified header (or None)
+   accept_ranges :  True if the server honors byte-range requests
+   """
+   def __init__(self,url,status=None,headers=None):
+      self.url, self.status = url, status
+      self.available = status is not None and 200 <= status < 300
+      self.size, self.etag, self.last_modified, self.accept_ranges = None, None, None, False
+      if headers is None or not self.available: return
+      if headers.getheader('Content-Range'):  # answer to a bytes=0-0 request
+         total = headers.getheader('Content-Range').split('/')[-1].strip()
+         if total.isdigit(): self.size = int(total)
+         self.accept_ranges = True
+      elif headers.getheader('Content-Length'):
+         self.size = int(headers.getheader('Content-Length'))
+      self.etag = headers.getheader('ETag')
+      self.last_modified = headers.getheader('Last-Modified')
+      if 'bytes' in (headers.getheader('Accept-Ranges') or ''):
+         self.accept_ranges = True
+
+   def __repr__(self):
+      return '<RemoteFile %s status=%s size=%s>' % (self.url,self.status,self.size)
+
+###-------------------------------------------------------------------------------###
+class Session():
+   """
+   Authenticated HTTP session shared by every download in a run
+
+   Cookies and idle keep-alive connections are kept for the life of the session,
+   so the ASF login form is submitted once per run instead of once per file.  A
+   request that is refused (401/403) after the session has expired triggers a
+   single re-login that is shared by all threads using the session.
+
+   Parameters
+   ----------
+   username :  ASF username [read with :func:`get_password` on first login]
+   password :  ASF password
+   maxidle  :  maximum number of idle connections kept open per host [8]
+   timeout  :  seconds to wait on a stalled connection before giving up [60]
+   breaker  :  :class:`retry_policy.CircuitBreaker` shared by all downloads of the
+               session [CircuitBreaker()]
+   """
+   def __init__(self,username=None,password=None,maxidle=8,timeout=60,breaker=None):
+      self.username, self.password = username, password
+      self.timeout = timeout
+      self.breaker = breaker if breaker is not None else CircuitBreaker()
+      self.cookiejar = _LockedCookieJar()
+      self.pool = _ConnectionPool(maxidle=maxidle)
+      self.logins = 0
+      self.login_seconds = []
+      self._login_lock = threading.Lock()
+      self._login_error = None
+      self._opener = mechanize.build_opener(mechanize.HTTPCookieProcessor(self.cookiejar),
+                        _KeepAliveHTTPHandler(self.pool),_KeepAliveHTTPSHandler(self.pool),
+                        _RedirectHandler)
+
+   def open(self,url,data=None,headers=None,method=None):
+      """
+      Open url, logging in first if the server asks for credentials
+
+      The response is returned unread so its body can be streamed.  headers is an
+      optional dict of extra request headers and method overrides GET/POST.
+      """
+      logins = self.logins
+      request = lambda: _Request(url,data,headers or {},method=method,timeout=self.timeout)
+      start = time.time()
+      try:
+         return self._opener.open(request())
+      except HTTPError, e:
+         if e.code not in (401,403): raise
+         if method == 'HEAD':  # no body, so fetch the login form with a GET
+            e.close()
+            try:
+               self._opener.open(url,timeout=self.timeout).close()
+               return self._opener.open(request())
+            except HTTPError, e:
+               if e.code not in (401,403): raise
+         with span('login',url=url) as phase:
+            submitted = self.login(e,logins)
+            phase.set(submitted=submitted)
+         if submitted:
+            self._logged_in(time.time()-start)
+      return self._opener.open(request())
+
+   @traced('probe')
+   def probe(self,url):
+      """
+      Return a :class:`RemoteFile` for url using a HEAD request (or a one-byte
+      ranged GET if the server does not allow HEAD)
+      """
+      try:
+         res = self.open(url,method='HEAD')
+      except HTTPError, e:
+         if e.code not in (405,501):
+            e.close()
+            return RemoteFile(url,e.code,e.info())
+         try:
+            res = self.open(url,headers={'Range': 'bytes=0-0'})
+         except HTTPError, e:
+            e.close()
+            return RemoteFile(url,e.code,e.info())
+      res.close()
+      return RemoteFile(url,res.code,res.info())
+
+   def login(self,response,logins=None):
+      """
+      Fill in and submit the login form (form 0) found in response
+
+      logins is the value of self.logins seen before the refused request; if
+      another thread has logged in since then the form is not submitted again.
+      Returns True if the form was submitted.
+      Raises :class:`LoginError` if there is no form or the credentials are refused;
+      other errors of the submit (e.g. 503) are raised as they are, to be retried.
+      """
+      self._login_lock.acquire()
+      try:
+         if self._login_error is not None:  # do not submit refused credentials again
+            response.close()
+            raise self._login_error
+         if logins is not None and logins != self.logins:
+            response.close()
+            return False
+         forms = mechanize.ParseResponse(response,backwards_compat=False)
+         response.close()
+         if len(forms) < 1:
+            raise LoginError('no login form at '+response.geturl())
+         if self.username==None or self.password==None:
+            self.username, self.password = get_password()
+         form = forms[0]
+         form['userid']   = self.username
+         form['password'] = self.password
+         try:
+            self._opener.open(form.click()).close()
+         except HTTPError, e:
+            e.close()
+            if e.code in (401,403):
+               self._login_error = LoginError('submit failed: %d: %s' % (e.code,e.msg))
+               raise self._login_error
+            raise
+         self.logins += 1
+         return True
+      finally:
+         self._login_lock.release()
+
+   def _logged_in(self,seconds):
+      """
+      Record a login of seconds (from the refused request to the accepted form),
+      also in the :class:`transfer_metrics.Transfer` running in this thread
+      """
+      self.login_seconds.append(seconds)
+      transfer = getattr(_current,'transfer',None)
+      if transfer is not None: transfer.logged_in(seconds)
+
+   def close(self):
+      """
+      Close all idle connections
+      """
+      self.pool.close()
+
+class LoginError(Exception):
+   """
+   The ASF login failed (no login form, or the credentials were refused)
+   """
+   pass
+
+###-------------------------------------------------------------------------------###
+class _Request(mechanize.Request):
+   """
+   Request whose HTTP method may be set explicitly (e.g. HEAD)
+   """
+   def __init__(self,url,data=None,headers={},method=None,**kwargs):
+      mechanize.Request.__init__(self,url,data,headers,**kwargs)
+      self.method = method
+
+   def get_method(self):
+      if self.method is not None: return self.method
+      return mechanize.Request.get_method(self)
+
+class _RedirectHandler(mechanize.HTTPRedirectHandler):
+   """
+   Follow redirects without turning HEAD requests into GETs
+   """
+   def redirect_request(self,req,fp,code,msg,headers,newurl):
+      new = mechanize.HTTPRedirectHandler.redirect_request(self,req,fp,code,msg,headers,newurl)
+      if new is not None and req.get_method() == 'HEAD':
+         new = _Request(newurl,headers=req.headers,method='HEAD',
+                        origin_req_host=req.get_origin_req_host(),unverifiable=True,
+                        visit=False,timeout=req.timeout)
+         new._origin_req = getattr(req,'_origin_req',req)
+      return new
+
+###-------------------------------------------------------------------------------###
+class _LockedCookieJar(mechanize.CookieJar):
+   """
+   CookieJar that can be shared by threads
+   """
+   def __init__(self,*args,**kwargs):
+      mechanize.CookieJar.__init__(self,*args,**kwargs)
+      self._lock = threading.RLock()
+
+   def add_cookie_header(self,request):
+      self._lock.acquire()
+      try:
+         return mechanize.CookieJar.add_cookie_header(self,request)
+      finally:
+         self._lock.release()
+
+   def extract_cookies(self,response,request):
+      self._lock.acquire()
+      try:
+         return mechanize.CookieJar.extract_cookies(self,response,request)
+      finally:
+         self._lock.release()
+
+###-------------------------------------------------------------------------------###
+class _ConnectionPool():
+   """
+   Idle keep-alive connections keyed by (scheme, host)
+   """
+   def __init__(self,maxidle=8):
+      self.maxidle = maxidle
+      self._idle = {}
+      self._lock = threading.Lock()
+
+   def get(self,key):
+      self._lock.acquire()
+      try:
+         if self._idle.get(key): return self._idle[key].pop()
+         return None
+      finally:
+         self._lock.release()
+
+   def put(self,key,conn):
+      self._lock.acquire()
+      try:
+         idle = self._idle.setdefault(key,[])
+         if len(idle) < self.maxidle:
+            idle.append(conn)
+            conn = None
+      finally:
+         self._lock.release()
+      if conn is not None: conn.close()
+
+   def close(self):
+      self._lock.acquire()
+      try:
+         idle, self._idle = self._idle, {}
+      finally:
+         self._lock.release()
+      for conns in idle.values():
+         for conn in conns: conn.close()
+
+###-------------------------------------------------------------------------------###
+class _KeepAliveMixin():
+   """
+   Send requests over pooled persistent connections instead of one per request
+   """
+   def _pool_open(self,conn_class,req):
+      host = req.get_host()
+      if not host:
+         raise URLError('no host given')
+      if getattr(req,'_tunnel_host',None):  # proxies go the usual route
+         return self.do_open(conn_class,req)
+      key = (req.get_type(),host)
+      headers = dict(req.headers)
+      headers.update(req.unredirected_hdrs)
+      headers = dict((name.title(),val) for name,val in headers.items())
+      headers['Connection'] = 'keep-alive'
+      while True:
+         conn = self.pool.get(key)
+         reused = conn is not None
+         if conn is None:
+            conn = conn_class(host,timeout=req.timeout)
+         try:
+            if not reused and enabled():  # time the lookup and the connection on their own
+               _traced_connect(conn)
+            with span('wait response',url=req.get_full_url(),method=req.get_method(),
+                      reused=reused) as phase:
+               conn.request(req.get_method(),req.get_selector(),req.data,headers)
+               r = conn.getresponse()
+               phase.set(status=r.status)
+            break
+         except (socket.error,httplib.HTTPException), err:
+            conn.close()
+            if not reused:  # a stale idle connection is simply replaced
+               raise URLError(err)
+      resp = urllib.addinfourl(_PooledResponse(r,conn,key,self.pool),r.msg,req.get_full_url(),r.status)
+      resp.msg = r.reason
+      return resp
+
+def _traced_connect(conn):
+   """
+   Resolve the host and open the connection of conn, each in its own span
+   """
+   with span('dns',host=conn.host):
+      socket.getaddrinfo(conn.host,conn.port,0,socket.SOCK_STREAM)
+   with span('connect',host='%s:%d' % (conn.host,conn.port)):
+      conn.connect()
+
+class _KeepAliveHTTPHandler(_KeepAliveMixin,mechanize.HTTPHandler):
+   def __init__(self,pool):
+      mechanize.HTTPHandler.__init__(self)
+      self.pool = pool
+
+   def http_open(self,req):
+      return self._pool_open(httplib.HTTPConnection,req)
+
+class _KeepAliveHTTPSHandler(_KeepAliveMixin,mechanize.HTTPSHandler):
+   def __init__(self,pool):
+      mechanize.HTTPSHandler.__init__(self)
+      self.pool = pool
+
+   def https_open(self,req):
+      return self._pool_open(httplib.HTTPSConnection,req)
+
+###-------------------------------------------------------------------------------###
+class _PooledResponse():
+   """
+   File-like body of a pooled response; the connection goes back to the pool
+   once the body has been read to the end
+   """
+   def __init__(self,response,conn,key,pool):
+      self.response, self.conn = response, conn
+      self.key, self.pool = key, pool
+      self._buf = ''
+
+   def read(self,amt=None):
+      if amt is None or amt < 0:
+         data, self._buf = self._buf + self.response.read(), ''
+      elif len(self._buf) >= amt:
+         data, self._buf = self._buf[:amt], self._buf[amt:]
+      else:
+         data, self._buf = self._buf + self.response.read(amt-len(self._buf)), ''
+      self._release()
+      return data
+
+   def readline(self,limit=-1):
+      while '\n' not in self._buf and not self.response.isclosed():
+         chunk = self.response.read(8192)
+         if not chunk: break
+         self._buf += chunk
+      i = self._buf.find('\n') + 1 or len(self._buf)
+      if limit >= 0: i = min(i,limit)
+      line, self._buf = self._buf[:i], self._buf[i:]
+      self._release()
+      return line
+
+   def readlines(self,sizehint=0):
+      lines = []
+      while True:
+         line = self.readline()
+         if not line: return lines
+         lines.append(line)
+
+   def close(self):
+      if self.conn is None: return
+      if not self.response.isclosed():  # unread body: the connection can't be reused
+         self.response.close()
+         self.conn.close()
+         self.conn = None
+      self._release()
+
+   def _release(self):
+      if self.conn is not None and self.response.isclosed() and not self._buf:
+         if self.response.will_close:
+            self.conn.close()
+         else:
+            self.pool.put(self.key,self.conn)
+         self.conn = None
 
 ###-------------------------------------------------------------------------------###
 
+@traced('get_password')
 def get_password(pfile='.dathack.d',lineid='uavsarhttp'):
    """
    Attempt to retrieve username and password from $HOME/pfile which has the format::
@@ -120,7 +1021,18 @@ def get_password(pfile='.dathack.d',lineid='uavsarhttp'):
 ###-------------------------------------------------------------------------------###
 if __name__ == '__main__':
    args = sys.argv[1:]
+   probe = '--probe' in args
+   if probe: args.remove('--probe')
    if len(args) != 1:
       print(__doc__)
       sys.exit()
-   http_retrieve(args[0])
+   if probe:
+      info = http_probe(args[0])
+      print('url:           ',info.url)
+      print('status:        ',info.status)
+      print('size:          ',info.size)
+      print('etag:          ',info.etag)
+      print('last-modified: ',info.last_modified)
+      print('accept-ranges: ',info.accept_ranges)
+   else:
+      http_retrieve(args[0])
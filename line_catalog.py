@@ -0,0 +1,330 @@
+#!/usr/bin/env python
+
+"""
+line_catalog.py  :  Local SQLite catalog of UAVSAR flight lines and their products
+
+Usage:
+
+.. code-block:: bash
+
+   $ line_catalog.py add url [url ...] [--db FILE]
+
+   $ line_catalog.py query [selection] [--download [download options]] [--db FILE]
+
+Parameter
+---------
+url  :  sample file URL or flight-line folder URL; the folder is indexed (see
+         :ref:`folder_index`), every product in it is recorded with the fields of
+         its name (see :ref:`product_name`), and the acquisition dates are read
+         from its .ann file
+
+Options
+-------
+   --db FILE      :  catalog file [$UAVSAR_CATALOG or ~/.uavsar_catalog.db]
+
+   --site NAME    :  site name (e.g. SanAnd); case is ignored
+
+   --since DATE   :  first acquisition on or after DATE (YYYY, YYYY-MM, or YYYY-MM-DD)
+
+   --until DATE   :  last acquisition on or before DATE (YYYY, YYYY-MM, or YYYY-MM-DD)
+
+   --band B       :  radar band (e.g. L)
+
+   --pol P        :  polarization (e.g. HH for InSAR, HHHV for PolSAR)
+
+   --product P    :  product type (e.g. int, unw, cor, amp1, hgt, mlc, dat, kmz)
+
+   --kind K       :  insar or polsar
+
+   --grd          :  only ground-projected products
+
+   --slant        :  only slant-range products
+
+   --download     :  download the selected products, with the .ann of each line,
+                     instead of listing them
+
+   --out DIR      :  directory in which the flight-line folders are created [.]
+
+   --jobs, --per-host, --segments, --segment-min, --sync, --plan, --cache, --cache-size,
+   --engine, --retries, --backoff, --rate, --host-rate, --rate-file, --convert,
+   --lines, --samples, --bbox, --events, --prometheus, --progress, --trace
+                  :  as for :ref:`uavsar_insar_download`
+
+Notes
+-----
+* All L-band HH unwrapped interferograms over SanAnd since 2012::
+
+   $ line_catalog.py query --site SanAnd --since 2012 --band L --pol HH --product unw --download
+
+* Adding a line again replaces its records, so re-adding picks up new products
+
+* Where the server does not list folders, every product the download scripts can
+   name from the sample is probed instead (a folder URL cannot be added then)
+
+See Also
+--------
+:ref:`product_name`, :ref:`folder_index`, :ref:`uavsar_batch_download`
+"""
+from __future__ import print_function, division
+import sys,os,re,time,sqlite3
+from http_retrieve import get_password, Session, say
+from download_queue import (DownloadQueue, retrieve_options, DOWNLOAD_FLAGS, get_options, sync_filter,
+                            _path)
+from folder_index import folder_index, list_folder
+from download_plan import DownloadPlan
+from line_manifest import LineManifest
+from product_name import parse_name
+from trace_events import enable
+from annotation import Annotation
+
+__title__      = 'line_catalog.py'
+__author__     = 'UAVSAR_WebPy contributors'
+__email__      = ''
+__created__    = 'October 2026'
+__modified__   = ''
+__version__    = '1.0'
+__status__     = 'Development'
+__conditions__ = 'Use at your own risk.'
+__license__    = """
+Copyright (C) 2026   UAVSAR_WebPy contributors
+--------------------------------------------------------------------
+GNU Licensed
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+--------------------------------------------------------------------
+"""
+
+DEFAULT_CATALOG = os.path.join('~','.uavsar_catalog.db')
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lines (
+   folder TEXT PRIMARY KEY, url TEXT, kind TEXT, site TEXT, line TEXT, heading INTEGER,
+   band TEXT, steering TEXT, flight1 TEXT, flight2 TEXT, date1 TEXT, date2 TEXT,
+   baseline INTEGER, version TEXT, indexed REAL);
+CREATE TABLE IF NOT EXISTS products (
+   url TEXT PRIMARY KEY, folder TEXT, name TEXT, product TEXT, pol TEXT, ground INTEGER,
+   size INTEGER);
+CREATE INDEX IF NOT EXISTS lines_site ON lines (site COLLATE NOCASE, date1);
+CREATE INDEX IF NOT EXISTS lines_date ON lines (date1);
+CREATE INDEX IF NOT EXISTS products_type ON products (product, pol);
+CREATE INDEX IF NOT EXISTS products_folder ON products (folder);
+"""
+
+###==============================================================================###
+class LineCatalog():
+   """
+   SQLite catalog of flight lines (table lines) and their files (table products)
+
+   Parameters
+   ----------
+   path :  catalog file [$UAVSAR_CATALOG or ~/.uavsar_catalog.db]
+   """
+   def __init__(self,path=None):
+      if path is None:
+         path = os.getenv('UAVSAR_CATALOG') or DEFAULT_CATALOG
+      self.path = os.path.expanduser(path)
+      self.db = sqlite3.connect(self.path)
+      self.db.row_factory = sqlite3.Row
+      self.db.executescript(SCHEMA)
+
+   def add(self,url,session,jobs=8):
+      """
+      Index the flight-line folder of url (a sample file or the folder itself) and
+      record every product in it; returns the number of products recorded
+      """
+      folder_url = url if url[-1] == '/' else url.rsplit('/',1)[0] + '/'
+      files = list_folder(folder_url,session)
+      if not files:
+         candidates = _candidates(url)
+         if not candidates:
+            say('cannot index %s: no folder listing and no sample name' % folder_url)
+            return 0
+         index = folder_index(folder_url,session,candidates,jobs)
+         files = dict((name,remote) for name,remote in index.files.items() if remote.available)
+      names = [parse_name(name) for name in sorted(files)]
+      names = [name for name in names if name is not None]
+      if not names:
+         say('no UAVSAR products in '+folder_url)
+         return 0
+      dates = [names[0].date]*2
+      for name in names:
+         if name.product == 'ann':
+            dates = _ann_dates(folder_url+name.name,session) or dates
+            break
+      self.add_line(folder_url,names,dict((name,files[name].size) for name in files),dates)
+      return len(names)
+
+   def add_line(self,url,names,sizes=None,dates=(None,None)):
+      """
+      Record the folder url holding the files names (a list of :class:`product_name.ProductName`)
+
+      sizes maps file names to sizes in bytes and dates holds the dates (YYYY-MM-DD)
+      of the first and last acquisitions.  Earlier records of the folder are replaced.
+      """
+      if sizes is None: sizes = {}
+      folder = url.rstrip('/').split('/')[-1]
+      first = names[0]
+      flight2 = first.flights[-1][0] if len(first.flights) > 1 else None
+      db = self.db
+      db.execute('INSERT OR REPLACE INTO lines VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)',
+                 (folder,url,first.kind,first.site,first.line,first.heading,first.band,
+                  first.steering,first.flights[0][0],flight2,dates[0],dates[1],first.baseline,
+                  first.version,time.time()))
+      db.execute('DELETE FROM products WHERE folder = ?',(folder,))
+      db.executemany('INSERT OR REPLACE INTO products VALUES (?,?,?,?,?,?,?)',
+                     [(url+name.name,folder,name.name,name.product,name.pol,int(name.ground),
+                       sizes.get(name.name)) for name in names])
+      db.commit()
+
+   def query(self,site=None,since=None,until=None,band=None,pol=None,product=None,kind=None,
+             ground=None,ann=False):
+      """
+      Return the products matching every selection given, as rows (sqlite3.Row) with
+      the columns url, folder, name, product, pol, ground, size, date1, and date2
+
+      Dates are YYYY, YYYY-MM, or YYYY-MM-DD: since bounds the first acquisition of
+      a line and until its last.  With ann=True the .ann files of the matching lines
+      are included.
+      """
+      where, args = [], []
+      for column, value in (('l.site',site),('l.band',band),('p.pol',pol),('p.product',product),
+                            ('l.kind',kind)):
+         if value is not None:
+            where.append('%s = ? COLLATE NOCASE' % column)
+            args.append(value)
+      if since is not None:
+         where.append('l.date1 >= ?')
+         args.append(since)
+      if until is not None:
+         where.append('substr(l.date2,1,?) <= ?')
+         args.extend([len(until),until])
+      if ground is not None:
+         where.append('p.ground = ?')
+         args.append(int(ground))
+      select = ('SELECT p.url, p.folder, p.name, p.product, p.pol, p.ground, p.size, l.date1, '
+                'l.date2 FROM products p JOIN lines l ON p.folder = l.folder')
+      sql = select + (' WHERE ' + ' AND '.join(where) if where else '')
+      rows = self.db.execute(sql + ' ORDER BY l.date1, p.folder, p.name',args).fetchall()
+      if ann and rows:
+         folders = sorted(set(row['folder'] for row in rows))
+         marks = ','.join('?'*len(folders))
+         extra = self.db.execute(select + " WHERE p.product = 'ann' AND p.folder IN (%s) "
+                                 'ORDER BY p.folder, p.name' % marks,folders)
+         known = set(row['url'] for row in rows)
+         rows += [row for row in extra.fetchall() if row['url'] not in known]
+      return rows
+
+   def close(self):
+      self.db.close()
+
+###-------------------------------------------------------------------------------###
+def _candidates(url):
+   """
+   Every file name the download scripts can build from the sample file url
+   """
+   from uavsar_batch_download import expand_entry, INSAR_PATTERN
+   name = url.split('/')[-1]
+   if parse_name(name) is None: return []
+   opts = ['all','igm','ach'] if INSAR_PATTERN.search(name) else ['all','ach']
+   urls = expand_entry({'url': url, 'opts': opts})
+   return urls.filenames if urls is not None else []
+
+def _ann_dates(url,session):
+   """
+   Dates (YYYY-MM-DD) of the first and last acquisitions given in the .ann at url
+   (None if it cannot be read)
+   """
+   try:
+      res = session.open(url)
+      text = res.read()
+      res.close()
+   except Exception, e:
+      say('cannot read %s: %s' % (url,e))
+      return None
+   dates = Annotation(text,url).dates()
+   if not dates: return None
+   return dates[0], dates[-1]
+
+###-------------------------------------------------------------------------------###
+def _date(value):
+   if not re.match(r'^\d{4}(-\d{2}(-\d{2})?)?$',value):
+      raise ValueError(value)
+   return value
+
+CATALOG_FLAGS = dict(DOWNLOAD_FLAGS,db=_path,site=str,since=_date,until=_date,band=str,pol=str,
+                     product=str,kind=str,grd=bool,slant=bool,download=bool,out=_path)
+
+def _main(args):
+   args, opts = get_options(args,CATALOG_FLAGS)
+   if len(args) < 1 or args[0] not in ('add','query') or (args[0] == 'add') != (len(args) > 1):
+      print(__doc__)
+      sys.exit()
+   if opts.get('trace'): enable(opts.pop('trace'))
+   catalog = LineCatalog(opts.pop('db',None))
+   username, password = get_password()
+   session = Session(username=username,password=password)
+   if args[0] == 'add':
+      for url in args[1:]:
+         print('%s: %d products' % (url,catalog.add(url,session,jobs=opts.get('jobs',4))))
+      session.close()
+      return
+
+   ground = None
+   if opts.pop('grd',False): ground = True
+   if opts.pop('slant',False): ground = False
+   download = opts.pop('download',False)
+   select = dict((key,opts.pop(key,None)) for key in
+                 ('site','since','until','band','pol','product','kind'))
+   rows = catalog.query(ground=ground,ann=download,**select)
+   nbytes = sum(row['size'] or 0 for row in rows)
+   for row in rows:
+      print('%s  %s  %s' % (row['date1'] or '?',row['url'],
+                            '?' if row['size'] is None else '%.1f MB' % (row['size']/1.e6)))
+   print('%d files, %.1f MB' % (len(rows),nbytes/1.e6))
+   if not download or not rows:
+      session.close()
+      return
+
+   outdir = opts.pop('out','.')
+   opts.pop('no_index',None)
+   todo, filenames, manifests, opened = [], [], [], {}
+   for row in rows:
+      folder = os.path.join(outdir,row['folder'][3:] if row['folder'][:3] == 'UA_' else row['folder'])
+      if folder not in opened:
+         if not os.path.exists(folder):
+            os.makedirs(folder)
+         opened[folder] = LineManifest(folder)
+      todo.append(row['url'])
+      filenames.append(os.path.join(folder,row['name']))
+      manifests.append(opened[folder])
+   if opts.pop('sync',False):
+      stale = set(sync_filter(todo,session,manifests,jobs=opts.get('jobs',4)))
+      keep = [i for i in range(len(todo)) if todo[i] in stale]
+      todo, filenames = [todo[i] for i in keep], [filenames[i] for i in keep]
+      manifests = [manifests[i] for i in keep]
+   sizes = dict((row['url'],row['size']) for row in rows)
+   if opts.pop('plan',False):
+      plan = DownloadPlan(todo,filenames,[sizes[url] for url in todo],session,jobs=opts.get('jobs',4))
+      session.close()
+      sys.exit(0 if plan.report() else 1)
+   queue = DownloadQueue(session=session,**retrieve_options(opts))
+   for url, filename, manifest in zip(todo,filenames,manifests):
+      queue.add(url,size=sizes[url],filename=filename,manifest=manifest)
+   results = queue.run()
+   session.close()
+   print('\n%d of %d files downloaded' % (len([r for r in results if r is not None]),len(results)))
+
+###-------------------------------------------------------------------------------###
+if __name__=='__main__':
+   _main(sys.argv[1:])
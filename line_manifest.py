@@ -0,0 +1,284 @@
+"""
+line_manifest.py  :  Record of the files downloaded into a flight-line folder
+
+Every completed download is recorded in ``.uavsar_manifest.json`` in the folder
+it was saved to, together with the local size and modification time and the
+ETag/Last-Modified the server reported.  In sync mode (``--sync``) the download
+scripts compare these records with a HEAD request for each file and only fetch
+files that are missing or have changed on the server.
+
+Notes
+-----
+* Each record holds SHA-256 checksums of consecutive 64 MB pieces of the file.
+   They are computed on the data as it is downloaded (no second pass over the
+   file), so a file can later be checked with :meth:`LineManifest.verify`
+
+* A file whose modification time changed since it was recorded is re-hashed in
+   sync mode and kept if its content is unchanged
+
+* A product kept as its .tiles (--convert tile-only) is recorded under that name;
+   in sync mode the record of the .tiles stands for the missing product
+
+See Also
+--------
+:ref:`download_queue`, :ref:`http_retrieve`
+"""
+from __future__ import print_function, division
+import os,threading,json,hashlib
+from email.utils import parsedate_tz, mktime_tz
+
+__title__      = 'line_manifest.py'
+__author__     = 'UAVSAR_WebPy contributors'
+__email__      = ''
+__created__    = 'October 2026'
+__modified__   = ''
+__version__    = '1.0'
+__status__     = 'Development'
+__conditions__ = 'Use at your own risk.'
+__license__    = """
+Copyright (C) 2026   UAVSAR_WebPy contributors
+--------------------------------------------------------------------
+GNU Licensed
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+--------------------------------------------------------------------
+"""
+
+MANIFEST_NAME = '.uavsar_manifest.json'
+PIECE_SIZE = 64 << 20
+
+###==============================================================================###
+class LineManifest():
+   """
+   Per-folder record of downloaded files, keyed by file name
+
+   Parameters
+   ----------
+   folder   :  flight-line folder holding the downloaded files [current directory]
+   """
+   def __init__(self,folder='.'):
+      self.folder = folder
+      self.path = os.path.join(folder,MANIFEST_NAME)
+      self.entries = {}
+      self._lock = threading.Lock()
+      try:
+         fid = open(self.path)
+         try:
+            self.entries = json.load(fid)
+         finally:
+            fid.close()
+      except (IOError,ValueError):
+         pass
+
+   def get(self,fname):
+      """
+      Return the record for fname, or None if the file is not recorded
+      """
+      return self.entries.get(os.path.basename(fname))
+
+   def record(self,fname,remote,checksum=None):
+      """
+      Record the file fname, just downloaded from the :class:`http_retrieve.RemoteFile` remote
+
+      checksum is the dict from :meth:`PieceHasher.checksum` (computed here if None)
+      """
+      local = os.path.join(self.folder,os.path.basename(fname))
+      if checksum is None:
+         checksum = file_checksum(local)
+      self._lock.acquire()
+      try:
+         entry = self.entries.setdefault(os.path.basename(fname),{})
+         entry.update({'url': remote.url, 'size': os.path.getsize(local),
+                       'mtime': os.path.getmtime(local), 'etag': remote.etag,
+                       'last_modified': remote.last_modified, 'remote_size': remote.size,
+                       'checksum': checksum})
+         self._save()
+      finally:
+         self._lock.release()
+
+   def verify(self,fname):
+      """
+      Re-hash fname and compare it with its record
+
+      Returns True if the content matches, False if it does not (or the file is
+      missing), and None if there is no checksum on record.
+      """
+      entry = self.get(fname)
+      if entry is None or not entry.get('checksum'): return None
+      local = os.path.join(self.folder,os.path.basename(fname))
+      if not os.path.exists(local) or os.path.getsize(local) != entry.get('size'):
+         return False
+      expected = entry['checksum']
+      return file_checksum(local,expected.get('piece_size',PIECE_SIZE))['digest'] == expected.get('digest')
+
+   def is_current(self,fname,remote):
+      """
+      True if the local copy of fname matches the remote file described by remote
+
+      The local size must equal the remote size.  If the file was recorded (and has
+      not been touched since) the recorded ETag or Last-Modified must also match;
+      otherwise the local file must be at least as new as the remote one.  A file
+      kept as its .tiles is checked through the record of those.
+      """
+      local = os.path.join(self.folder,os.path.basename(fname))
+      kept = not os.path.exists(local) and self._kept_as(remote)
+      if kept:
+         fname, local = kept, os.path.join(self.folder,kept)
+      if not remote.available or not os.path.exists(local):
+         return False
+      size = os.path.getsize(local)
+      entry = self.get(fname)
+      if remote.size is not None and (entry.get('remote_size') if kept else size) != remote.size:
+         return False
+      if (entry is not None and entry.get('size') == size and entry.get('mtime') != os.path.getmtime(local)
+            and self.verify(fname)):  # touched but not modified
+         self._lock.acquire()
+         try:
+            entry['mtime'] = os.path.getmtime(local)
+            self._save()
+         finally:
+            self._lock.release()
+      if entry is not None and entry.get('size') == size and entry.get('mtime') == os.path.getmtime(local):
+         if remote.etag and entry.get('etag'):
+            return remote.etag == entry['etag']
+         if remote.last_modified and entry.get('last_modified'):
+            return remote.last_modified == entry['last_modified']
+         return remote.size is not None
+      stamp = _http_time(remote.last_modified)
+      return stamp is not None and os.path.getmtime(local) >= stamp
+
+   def _kept_as(self,remote):
+      """
+      Name of the file recorded for remote under a name of its own (its .tiles), or None
+      """
+      base = remote.url.split('/')[-1]
+      for name, entry in self.entries.items():
+         if name != base and name.startswith(base) and entry.get('url') == remote.url:
+            return name
+      return None
+
+   def _save(self):
+      tmp = self.path + '.tmp'
+      fid = open(tmp,'w')
+      try:
+         json.dump(self.entries,fid,indent=1,sort_keys=True)
+      finally:
+         fid.close()
+      os.rename(tmp,self.path)
+
+###==============================================================================###
+class PieceHasher():
+   """
+   SHA-256 checksums of consecutive fixed-size pieces of a file, fed with its data
+   as it arrives
+
+   Parameters
+   ----------
+   pieces   :  dict of piece index (as a string) to hex digest, filled in as pieces are
+               completed; shared by the hashers of one file
+   offset   :  file offset of the first byte that will be passed to :meth:`update` [0]
+   filename :  file already holding the bytes before offset; the start of the piece
+               holding offset is read back from it (never more than one piece)
+   start    :  lowest offset this hasher may read back from filename [0]
+   piece    :  piece size in bytes [PIECE_SIZE]
+
+   A piece is only recorded if this hasher saw all of it; pieces split between
+   hashers are left for :func:`complete_pieces`.
+   """
+   def __init__(self,pieces,offset=0,filename=None,start=0,piece=PIECE_SIZE):
+      self.pieces, self.offset, self.piece = pieces, offset, piece
+      self._hash = hashlib.sha256()
+      self._whole = True
+      first = offset - offset % piece
+      if first < offset:
+         if filename is None or first < start or not os.path.exists(filename):
+            self._whole = False
+         else:
+            fid = open(filename,'rb')
+            try:
+               fid.seek(first)
+               _hash_stream(self._hash,fid,offset-first)
+            finally:
+               fid.close()
+
+   def update(self,block):
+      while block:
+         n = self.piece - self.offset % self.piece
+         if n < len(block):
+            self._hash.update(block[:n])
+            block = block[n:]
+         else:
+            self._hash.update(block)
+            n, block = len(block), ''
+         self.offset += n
+         if self.offset % self.piece == 0:
+            self._close()
+
+   def finish(self,size):
+      """
+      Record the last, short piece if this hasher reached the end of the file (size bytes)
+      """
+      if self.offset == size and self.offset % self.piece:
+         self._close()
+
+   def _close(self):
+      if self._whole:
+         self.pieces[str((self.offset-1)//self.piece)] = self._hash.hexdigest()
+      self._hash, self._whole = hashlib.sha256(), True
+
+def complete_pieces(filename,pieces,size,piece=PIECE_SIZE):
+   """
+   Hash any piece of filename missing from pieces and return the checksum record:
+   a dict with the algorithm, piece size, piece digests, and a digest of the digests
+   """
+   fid = None
+   try:
+      for i in range(-(-size // piece)):
+         if str(i) in pieces: continue
+         if fid is None: fid = open(filename,'rb')
+         fid.seek(i*piece)
+         pieces[str(i)] = _hash_stream(hashlib.sha256(),fid,min(piece,size-i*piece)).hexdigest()
+   finally:
+      if fid is not None: fid.close()
+   digests = [pieces[str(i)] for i in range(-(-size // piece))]
+   return {'algorithm': 'sha256', 'piece_size': piece, 'pieces': digests,
+           'digest': hashlib.sha256(''.join(digests)).hexdigest()}
+
+def file_checksum(filename,piece=PIECE_SIZE):
+   """
+   Checksum record (see :func:`complete_pieces`) of a file on disk
+   """
+   return complete_pieces(filename,{},os.path.getsize(filename),piece)
+
+def _hash_stream(h,fid,nbytes,blocksize=1 << 20):
+   while nbytes > 0:
+      block = fid.read(min(blocksize,nbytes))
+      if not block:
+         raise IOError('unexpected end of file')
+      h.update(block)
+      nbytes -= len(block)
+   return h
+
+###-------------------------------------------------------------------------------###
+def _http_time(stamp):
+   """
+   Convert an HTTP date (e.g. a Last-Modified header) to seconds since the epoch
+   """
+   if not stamp: return None
+   parsed = parsedate_tz(stamp)
+   if parsed is None: return None
+   return mktime_tz(parsed)
+
+###-------------------------------------------------------------------------------###
@@ -0,0 +1,146 @@
+"""
+product_name.py  :  Structured view of UAVSAR product file names
+
+UAVSAR file names encode the flight line, the acquisition(s), the radar band and
+polarization, and the product.  :func:`parse_name` splits a name into a
+:class:`ProductName` so that the rest of the package can select files by their
+fields instead of by string slices.
+
+InSAR pair::
+
+   SanAnd_08503_09083-008_10027-003_0174d_s01_L090HH_01.unw.grd
+   site   line  flight-take  flight-take  days seg band/steering/pol version product
+
+PolSAR acquisition::
+
+   SanAnd_08503_10071_003_100928_L090HHHH_CX_01.mlc
+   site   line  flight take yymmdd band/steering/pol tag version product
+
+Notes
+-----
+* The first three digits of the line ID are the heading in degrees
+
+* The first two digits of a flight ID are the year of the flight; PolSAR names
+   also carry the acquisition date, InSAR dates come from the .ann file
+   (see :ref:`line_catalog`)
+
+* Ground-projected products end in .grd (the PolSAR .hgt is ground-projected too);
+   the PolSAR .grd is the ground-projected mlc
+
+See Also
+--------
+:ref:`line_catalog`, :ref:`uavsar_insar_download`, :ref:`uavsar_polsar_download`
+"""
+from __future__ import print_function, division
+import re
+
+__title__      = 'product_name.py'
+__author__     = 'UAVSAR_WebPy contributors'
+__email__      = ''
+__created__    = 'October 2026'
+__modified__   = ''
+__version__    = '1.0'
+__status__     = 'Development'
+__conditions__ = 'Use at your own risk.'
+__license__    = """
+Copyright (C) 2026   UAVSAR_WebPy contributors
+--------------------------------------------------------------------
+GNU Licensed
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+--------------------------------------------------------------------
+"""
+
+INSAR_NAME = re.compile(r'^(?P<site>[A-Za-z0-9]+)_(?P<line>\d{5})_(?P<flight1>\d{5})-(?P<take1>\d{3})_'
+                        r'(?P<flight2>\d{5})-(?P<take2>\d{3})_(?P<baseline>\d+)d_s(?P<segment>\d+)_'
+                        r'(?P<band>[A-Za-z])(?P<steering>\d{3})(?P<pol>(?:[HV]{2})?)_(?P<version>\d+)'
+                        r'(?P<ext>\..*)?$')
+POLSAR_NAME = re.compile(r'^(?P<site>[A-Za-z0-9]+)_(?P<line>\d{5})_(?P<flight1>\d{5})_(?P<take1>\d{3})_'
+                         r'(?P<date>\d{6})_(?P<band>[A-Za-z])(?P<steering>\d{3})(?P<pol>(?:[HV]{4})?)_'
+                         r'(?P<tag>[A-Za-z]+)_(?P<version>\d+)(?P<ext>\..*)?$')
+
+###==============================================================================###
+class ProductName():
+   """
+   Fields of a UAVSAR file name
+
+   Attributes
+   ----------
+   name     :  the file name
+   kind     :  'insar' or 'polsar'
+   site     :  site name (e.g. SanAnd)
+   line     :  line ID (e.g. 08503)
+   heading  :  heading of the line in degrees
+   flights  :  list of (flight ID, data take) of each acquisition
+   date     :  acquisition date (YYYY-MM-DD) of a PolSAR name, None for InSAR
+   baseline :  temporal baseline of an InSAR pair in days (None for PolSAR)
+   segment  :  segment number of an InSAR pair (None for PolSAR)
+   band     :  radar band (e.g. L)
+   steering :  steering angle (e.g. 090)
+   pol      :  polarization (e.g. HH or HHHV; None for files common to all of them)
+   tag      :  processing tag of a PolSAR name (e.g. CX; None for InSAR)
+   version  :  processing version
+   ext      :  extension (e.g. .unw.grd; '' if none)
+   product  :  product type (int, unw, cor, amp1, amp2, hgt, mlc, dat, ann, kmz, ...)
+   ground   :  True for ground-projected (geocoded) products
+   folder   :  name of the flight-line folder holding the file
+   """
+   def __init__(self,name,kind,fields):
+      self.name, self.kind = name, kind
+      self.site, self.line = fields['site'], fields['line']
+      self.heading = int(self.line[:3])
+      self.flights = [(fields['flight1'],fields['take1'])]
+      self.date, self.baseline, self.segment, self.tag = None, None, None, None
+      if kind == 'insar':
+         self.flights.append((fields['flight2'],fields['take2']))
+         self.baseline, self.segment = int(fields['baseline']), fields['segment']
+      else:
+         date = fields['date']
+         self.date = '20%s-%s-%s' % (date[:2],date[2:4],date[4:])
+         self.tag = fields['tag']
+      self.band, self.steering = fields['band'].upper(), fields['steering']
+      self.pol = fields['pol'] or None
+      self.version = fields['version']
+      self.ext = fields['ext'] or ''
+      parts = self.ext.lower().lstrip('.').split('.')
+      self.product = parts[0]
+      self.ground = len(parts) > 1 and parts[-1] == 'grd'
+      if kind == 'polsar' and self.product in ('grd','hgt'):
+         self.ground = True
+         if self.product == 'grd': self.product = 'mlc'
+      stem = name[:len(name)-len(self.ext)]
+      if self.pol is not None:
+         start = stem.index(self.band+self.steering+self.pol) + len(self.band+self.steering)
+         stem = stem[:start] + stem[start+len(self.pol):]
+      self.folder = 'UA_' + stem
+
+   def __repr__(self):
+      return '<ProductName %s %s %s %s%s %s>' % (self.kind,self.site,self.line,self.band,
+                                                 self.pol or '',self.product)
+
+###-------------------------------------------------------------------------------###
+def parse_name(name):
+   """
+   Return the :class:`ProductName` of a file name or URL (None if it is not a
+   UAVSAR product name)
+   """
+   name = name.split('/')[-1]
+   for kind, pattern in (('insar',INSAR_NAME),('polsar',POLSAR_NAME)):
+      match = pattern.match(name)
+      if match is not None:
+         return ProductName(name,kind,match.groupdict())
+   return None
+
+###-------------------------------------------------------------------------------###
@@ -0,0 +1,266 @@
+"""
+raster_reader.py  :  Memory-mapped access to downloaded UAVSAR products
+
+:func:`open_raster` finds the .ann file next to a product, reads its dimensions,
+sample format, and byte order there, and maps the binary file with
+``numpy.memmap``.  Nothing is read until it is indexed, so a 10 GB raster opens
+at once and only the pages touched are ever loaded::
+
+   >>> from raster_reader import open_raster
+   >>> unw = open_raster('SanAnd_08503_09083-008_10027-003_0174d_s01_L090HH_01.unw.grd')
+   >>> unw.shape, unw.dtype
+   ((5928, 6336), dtype('<f4'))
+   >>> block = unw.read(rows=(1000,1512),cols=(2000,2512))
+
+Notes
+-----
+* Slant-range products (.int, .unw, .cor, .amp1, .amp2, .mlc) and ground-projected
+   ones (.grd, .hgt, and the .grd versions of the InSAR products) are supported;
+   ground-projected rasters also carry their latitude/longitude grid (attribute geo)
+
+* The layout is taken from the ``<product>.set_rows``, ``set_cols``, ``val_frmt``, and
+   ``val_endi`` keywords, or from the Slant Range Data / Ground Range Data keywords
+   of older InSAR annotations
+
+* Products stored as compressed tiles (.tiles files, see :ref:`tiled_raster`) are
+   opened with the same interface
+
+See Also
+--------
+:ref:`annotation`, :ref:`product_name`, :ref:`tiled_raster`
+"""
+from __future__ import print_function, division
+import os,glob
+import numpy as np
+from annotation import read_annotation
+from product_name import parse_name
+
+__title__      = 'raster_reader.py'
+__author__     = 'UAVSAR_WebPy contributors'
+__email__      = ''
+__created__    = 'October 2026'
+__modified__   = ''
+__version__    = '1.0'
+__status__     = 'Development'
+__conditions__ = 'Use at your own risk.'
+__license__    = """
+Copyright (C) 2026   UAVSAR_WebPy contributors
+--------------------------------------------------------------------
+GNU Licensed
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+--------------------------------------------------------------------
+"""
+
+FORMATS = {'REAL*4': 'f4', 'REAL*8': 'f8', 'COMPLEX*8': 'c8', 'COMPLEX*16': 'c16',
+           'INTEGER*1': 'i1', 'INTEGER*2': 'i2', 'INTEGER*4': 'i4', 'BYTE': 'u1'}
+SIZES = {1: 'u1', 2: 'i2', 4: 'f4', 8: 'c8'}
+INSAR_FORMATS = {'int': 'c8', 'unw': 'f4', 'cor': 'f4', 'amp1': 'f4', 'amp2': 'f4', 'hgt': 'f4'}
+
+###==============================================================================###
+class Raster(object):
+   """
+   A product file mapped into memory
+
+   Parameters
+   ----------
+   filename :  product file
+   ann      :  :class:`annotation.Annotation` of the product [read from the .ann next to it]
+   mode     :  numpy.memmap mode ('r' read-only, 'r+' to modify the file in place) ['r']
+
+   Attributes
+   ----------
+   shape, dtype :  dimensions (rows, cols) and sample type (with byte order)
+   geo          :  (first latitude, first longitude, latitude step, longitude step)
+                   of a ground-projected product, None for slant range
+   data         :  the numpy.memmap
+   """
+   def __init__(self,filename,ann=None,mode='r'):
+      self.filename = filename
+      if ann is None:
+         annfile = find_annotation(filename)
+         if annfile is None:
+            raise IOError('no annotation file found for '+filename)
+         ann = read_annotation(annfile)
+      self.ann = ann
+      rows, cols, dtype, self.geo = layout(ann,filename)
+      self.shape, self.dtype = (rows,cols), dtype
+      size = os.path.getsize(filename)
+      if size < rows*cols*dtype.itemsize:
+         raise ValueError('%s holds %d bytes, its annotation describes %d x %d samples of %d bytes'
+                          % (filename,size,rows,cols,dtype.itemsize))
+      self.data = np.memmap(filename,dtype=dtype,mode=mode,shape=self.shape)
+
+   def __getitem__(self,key):
+      return self.data[key]
+
+   def __len__(self):
+      return self.shape[0]
+
+   def read(self,rows=None,cols=None):
+      """
+      Copy of the block rows=(first,stop), cols=(first,stop) (all of them if None)
+      """
+      rows = clip_window(rows,self.shape[0])
+      cols = clip_window(cols,self.shape[1])
+      return np.array(self.data[rows[0]:rows[1],cols[0]:cols[1]])
+
+   def latlon(self,row,col):
+      """
+      Latitude and longitude of the center of pixel (row, col) of a ground-projected product
+      """
+      if self.geo is None:
+         raise ValueError(self.filename+' is not ground-projected')
+      return self.geo[0] + row*self.geo[2], self.geo[1] + col*self.geo[3]
+
+   def close(self):
+      del self.data
+
+###-------------------------------------------------------------------------------###
+def open_raster(filename,ann=None,mode='r'):
+   """
+   Map the product filename into memory; returns a :class:`Raster` (a
+   :class:`tiled_raster.TiledRaster` for a .tiles file)
+   """
+   if filename.endswith('.tiles'):
+      from tiled_raster import TiledRaster  # imports this module
+      return TiledRaster(filename)
+   return Raster(filename,ann,mode)
+
+###-------------------------------------------------------------------------------###
+def index_window(key,shape):
+   """
+   Window ((first,stop), (first,stop)) holding the numpy index key (ints and slices)
+   of an array of shape, and the indices picking key from that window
+   """
+   if not isinstance(key,tuple): key = (key,)
+   if len(key) > 2: raise IndexError('too many indices')
+   key = key + (slice(None),)*(2-len(key))
+   bounds, picks = [], []
+   for k, size in zip(key,shape):
+      if isinstance(k,slice):
+         index = np.arange(*k.indices(size))
+         lo = int(index.min()) if index.size else 0
+         bounds.append((lo,int(index.max())+1 if index.size else 0))
+         picks.append(index-lo)
+      else:
+         k = int(k) + (size if k < 0 else 0)
+         if not 0 <= k < size: raise IndexError('index %d is out of bounds' % k)
+         bounds.append((k,k+1))
+         picks.append(0)
+   return bounds, picks
+
+def clip_window(window,size):
+   """
+   window (first,stop) cut to the size samples of an axis (all of them if window is
+   None); a window outside the axis becomes an empty one at its edge
+   """
+   if window is None: return (0,size)
+   first = max(0,min(size,window[0]))
+   return (first,max(first,min(size,window[1])))
+
+def find_annotation(filename):
+   """
+   Path of the .ann file describing the product filename (None if there is none)
+
+   InSAR annotations share the name of their products; PolSAR ones drop the
+   polarization (see :ref:`product_name`).  A folder with a single .ann is also
+   accepted.
+   """
+   folder, base = os.path.split(filename)
+   candidates = [base.split('.')[0] + '.ann']
+   name = parse_name(base)
+   if name is not None:
+      candidates.append(name.folder[3:] + '.ann')
+   for candidate in candidates:
+      if os.path.exists(os.path.join(folder,candidate)):
+         return os.path.join(folder,candidate)
+   anns = glob.glob(os.path.join(folder or '.','*.ann'))
+   return anns[0] if len(anns) == 1 else None
+
+###-------------------------------------------------------------------------------###
+def layout(ann,filename):
+   """
+   Rows, columns, numpy dtype, and geo grid (or None) of the product filename
+   described by the :class:`annotation.Annotation` ann
+   """
+   name = parse_name(os.path.basename(filename))
+   ext = os.path.basename(filename).split('.',1)[-1].lower()
+   ground = name.ground if name is not None else ext.endswith('grd')
+   section = product_section(ann,filename)
+   if section is not None:
+      product = ann.products[section]
+      frmt = str(product.format or '').upper()
+      code = FORMATS.get(frmt) or SIZES.get(product.size)
+      if code is None and name is not None:
+         code = INSAR_FORMATS.get(name.product)
+      if code is None:
+         raise ValueError('unknown sample format %r of %s in %s' % (frmt,section,ann.filename))
+      order = '>' if 'BIG' in str(product.endian or '').upper() else '<'
+      geo = None
+      if ground:
+         geo = (product.row_addr,product.col_addr,product.row_mult,product.col_mult)
+         if None in geo: geo = None
+      return product.rows, product.cols, np.dtype(order+code), geo
+
+   # InSAR annotations without per-product sections
+   product = name.product if name is not None else ext.split('.')[0]
+   if product in INSAR_FORMATS:
+      if ground:
+         rows = ann.number('Ground Range Data Latitude Lines')
+         cols = ann.number('Ground Range Data Longitude Samples')
+         geo = tuple(ann.number('Ground Range Data '+key) for key in ('Starting Latitude',
+                     'Starting Longitude','Latitude Spacing','Longitude Spacing'))
+         if None in geo: geo = None
+      else:
+         rows = ann.number('Slant Range Data Azimuth Lines')
+         cols = ann.number('Slant Range Data Range Samples')
+         geo = None
+      if rows is not None and cols is not None:
+         return rows, cols, np.dtype('<'+INSAR_FORMATS[product]), geo
+   raise ValueError('%s does not describe the layout of %s' % (ann.filename,filename))
+
+def product_section(ann,filename):
+   """
+   Name of the annotation section (e.g. mlc_pwr) giving the layout of filename, None
+   if the annotation has none (older InSAR annotations)
+   """
+   name = parse_name(os.path.basename(filename))
+   ext = os.path.basename(filename).split('.',1)[-1].lower()
+   for section in _sections(name,ext):
+      product = ann.products.get(section)
+      if product is not None and product.rows is not None and product.cols is not None:
+         return section
+   return None
+
+def _sections(name,ext):
+   """
+   Annotation sections that may describe a product, most specific first
+   """
+   if name is None:
+      return [ext.replace('.','_'),ext.split('.')[0]]
+   if name.kind == 'polsar' and name.product == 'mlc':
+      power = name.pol is not None and name.pol[:2] == name.pol[2:]
+      return [('grd_' if name.ground else 'mlc_') + ('pwr' if power else 'mag')]
+   if name.kind == 'polsar':
+      return [name.product]
+   sections = [ext.replace('.','_')]
+   if name.ground:
+      sections += ['grd_'+name.product,name.product+'_grd']
+   else:
+      sections.append(name.product)
+   return sections
+
+###-------------------------------------------------------------------------------###
@@ -0,0 +1,400 @@
+"""
+raster_subset.py  :  Download a window of a product with HTTP Range requests
+
+A :class:`RasterSubset` turns a window of azimuth lines and range samples of a
+slant-range product (.int, .unw, .cor, .amp1, .amp2, .mlc), or a latitude/longitude
+box of a ground-projected one (.grd, .hgt), into the byte ranges that hold it,
+using the dimensions, sample size, and grid given in the .ann file.
+Ranges of neighbouring rows are merged (when the gap between them is small, the
+gap is downloaded and dropped) so a window of whole rows is a single request.
+Rows are cropped to the window as they arrive and written as a smaller raster,
+next to a copy of the .ann whose dimensions describe it::
+
+   SanAnd_08503_09083-008_10027-003_0174d_s01_L090_01/
+      SanAnd_08503_09083-008_10027-003_0174d_s01_L090HH_01.ann
+      lines1000-2000/
+         SanAnd_08503_09083-008_10027-003_0174d_s01_L090HH_01.ann
+         SanAnd_08503_09083-008_10027-003_0174d_s01_L090HH_01.unw
+
+so the subset opens with :func:`raster_reader.open_raster` like the full product.
+The .ann of a ground-projected subset also gives the latitude and longitude of
+its first pixel, so it stays georeferenced.
+
+Options
+-------
+   --lines A:B    :  download azimuth lines A to B-1 of the slant-range products
+   --samples A:B  :  download range samples A to B-1 of the slant-range products
+   --bbox S,N,W,E :  download the pixels of the ground-projected products inside the
+                     box from latitude S to N and longitude W to E (decimal degrees)
+
+Notes
+-----
+* The .ann of the line is downloaded first; products without one are downloaded whole
+
+* Windows reaching past the end of a product are cut at its edge; a box covers every
+   pixel whose center is inside it, and is written to the folder bboxS_N_W_E
+
+* Subsets are not recorded in the line manifest or the download cache
+
+* A server that ignores Range requests sends the whole product once; every range is
+   cut from that one stream
+
+See Also
+--------
+:ref:`raster_reader`, :ref:`download_queue`
+"""
+from __future__ import print_function, division
+import os,math,time,socket,threading,httplib,urlparse
+from urllib2 import HTTPError, URLError
+from annotation import read_annotation, edit_annotation
+from http_retrieve import say, _content_range, BLOCKSIZE
+from product_name import parse_name
+from raster_reader import find_annotation, layout, product_section, clip_window
+from retry_policy import RetryPolicy
+
+__title__      = 'raster_subset.py'
+__author__     = 'UAVSAR_WebPy contributors'
+__email__      = ''
+__created__    = 'October 2026'
+__modified__   = ''
+__version__    = '1.0'
+__status__     = 'Development'
+__conditions__ = 'Use at your own risk.'
+__license__    = """
+Copyright (C) 2026   UAVSAR_WebPy contributors
+--------------------------------------------------------------------
+GNU Licensed
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+--------------------------------------------------------------------
+"""
+
+SLANT = ('int','unw','cor','amp1','amp2','mlc')
+GROUND = SLANT + ('hgt',)
+MERGE_GAP = 1 << 18  # byte gaps up to this size between rows are downloaded and dropped
+_ann_lock = threading.Lock()
+
+###==============================================================================###
+class Window():
+   """
+   What to download of each product: lines and samples, each (first, stop) or None
+   for all, of the slant-range products, and bbox, (south, north, west, east) in
+   degrees or None, of the ground-projected ones
+   """
+   def __init__(self,lines=None,samples=None,bbox=None):
+      self.lines, self.samples, self.bbox = lines, samples, bbox
+
+   def applies(self,name):
+      """
+      True if the :class:`product_name.ProductName` name is a product this window subsets
+      """
+      if name is None: return False
+      if name.ground:
+         return self.bbox is not None and name.product in GROUND
+      return (self.lines is not None or self.samples is not None) and name.product in SLANT
+
+###-------------------------------------------------------------------------------###
+class RasterSubset():
+   """
+   A window of the product filename and the byte ranges holding it
+
+   Parameters
+   ----------
+   filename :  local name of the product (its .ann must be on disk)
+   lines    :  (first, stop) azimuth lines [all]
+   samples  :  (first, stop) range samples [all]
+   bbox     :  (south, north, west, east) of a ground-projected product, in degrees;
+               replaces lines and samples [None]
+   ann      :  :class:`annotation.Annotation` of the product [read from the .ann next to it]
+   annfile  :  the .ann file [found with :func:`raster_reader.find_annotation`]
+
+   Attributes
+   ----------
+   rows, cols, dtype :  layout of the full product
+   geo               :  grid of the full product (see :class:`raster_reader.Raster`)
+   lines, samples    :  the window, cut at the edges of the product
+   ranges            :  list of [first byte, last byte] to download
+   output            :  file the subset is written to
+   """
+   def __init__(self,filename,lines=None,samples=None,bbox=None,ann=None,annfile=None):
+      self.filename = filename
+      self.annfile = annfile or find_annotation(filename)
+      if ann is None:
+         if self.annfile is None:
+            raise IOError('no annotation file found for '+filename)
+         ann = read_annotation(self.annfile)
+      self.ann = ann
+      self.rows, self.cols, self.dtype, self.geo = layout(ann,filename)
+      self.bbox = bbox
+      if bbox is not None:
+         if self.geo is None:
+            raise ValueError(filename+' is not ground-projected, it has no latitude/longitude grid')
+         lines, samples = bbox_window(self.geo,bbox)
+      self.lines = clip_window(lines,self.rows)
+      self.samples = clip_window(samples,self.cols)
+      if bbox is not None and (self.lines[0] >= self.lines[1] or self.samples[0] >= self.samples[1]):
+         raise ValueError('box %g,%g,%g,%g is outside %s' % (tuple(bbox)+(filename,)))
+      if self.lines[0] >= self.lines[1] or self.samples[0] >= self.samples[1]:
+         raise ValueError('window lines %d:%d, samples %d:%d is outside the %d x %d samples of %s'
+                          % (tuple(lines or (0,0)) + tuple(samples or (0,0)) +
+                             (self.rows,self.cols,filename)))
+      self.ranges = byte_ranges(self.cols,self.dtype.itemsize,self.lines,self.samples)
+      self.output = os.path.join(os.path.dirname(filename),self.tag(),os.path.basename(filename))
+
+   def tag(self):
+      """
+      Name of the folder holding subsets of this window (e.g. lines1000-2000)
+      """
+      if self.bbox is not None:
+         return 'bbox%g_%g_%g_%g' % tuple(self.bbox)
+      tag = 'lines%d-%d' % self.lines
+      if self.samples != (0,self.cols):
+         tag += '_samples%d-%d' % self.samples
+      return tag
+
+   def nbytes(self):
+      """
+      Bytes to download (including the gaps merged into the ranges)
+      """
+      return sum(last-first+1 for first,last in self.ranges)
+
+   def retrieve(self,session,url,policy=None,throttle=None):
+      """
+      Download the window of url and write the subset and its .ann; returns the
+      name of the subset (None if the download failed)
+      """
+      if policy is None: policy = RetryPolicy()
+      folder = os.path.dirname(self.output)
+      if not os.path.exists(folder): os.makedirs(folder)
+      say('subset %s: %d x %d of %d x %d samples, %.1f of %.1f MB' % (self.tag(),
+          self.lines[1]-self.lines[0],self.samples[1]-self.samples[0],self.rows,self.cols,
+          self.nbytes()/1.e6,self.rows*self.cols*self.dtype.itemsize/1.e6))
+      part = self.output + '.part'
+      fid = open(part,'wb')
+      try:
+         i = 0
+         while i < len(self.ranges):
+            written = self._retrieve_range(session,url,fid,i,policy,throttle)
+            if not written: break
+            i += written
+         done = i == len(self.ranges)
+      finally:
+         fid.close()
+      if not done:
+         os.remove(part)
+         return None
+      if os.path.exists(self.output): os.remove(self.output)
+      os.rename(part,self.output)
+      self.write_annotation()
+      return self.output
+
+   def write_annotation(self):
+      """
+      Write the .ann of the subset folder, describing the window of this product
+      """
+      values = {}
+      section = product_section(self.ann,self.filename)
+      nlines, nsamples = self.lines[1]-self.lines[0], self.samples[1]-self.samples[0]
+      if self.geo is not None:
+         lat, lon = (self.geo[0] + self.lines[0]*self.geo[2],self.geo[1] + self.samples[0]*self.geo[3])
+      if section is not None:
+         values[section+'.set_rows'], values[section+'.set_cols'] = nlines, nsamples
+         if self.geo is not None:
+            values[section+'.row_addr'], values[section+'.col_addr'] = lat, lon
+      elif self.geo is not None:
+         values['Ground Range Data Latitude Lines'] = nlines
+         values['Ground Range Data Longitude Samples'] = nsamples
+         values['Ground Range Data Starting Latitude'] = lat
+         values['Ground Range Data Starting Longitude'] = lon
+      else:
+         values['Slant Range Data Azimuth Lines'] = nlines
+         values['Slant Range Data Range Samples'] = nsamples
+      if self.geo is None:
+         values['Subset First Azimuth Line'] = self.lines[0]
+         values['Subset First Range Sample'] = self.samples[0]
+      else:
+         values['Subset First Latitude Line'] = self.lines[0]
+         values['Subset First Longitude Sample'] = self.samples[0]
+      edit_folder_annotation(self.annfile,os.path.dirname(self.output),values)
+
+   ###----------------------------------------------------------------------------###
+   def _retrieve_range(self,session,url,fid,i,policy,throttle):
+      """
+      Download range i of url, retrying as policy allows, and write the part inside
+      the window to fid; returns the number of ranges written (0 if the download
+      failed).  A server that ignores the Range request sends the whole file, and
+      every range left is then taken from that one response.
+      """
+      host, start, attempt = urlparse.urlsplit(url).netloc, fid.tell(), 0
+      hostname = urlparse.urlsplit(url).hostname
+      first, last = self.ranges[i]
+      while True:
+         session.breaker.wait(host)
+         try:
+            res = session.open(url,headers={'Range': 'bytes=%d-%d' % (first,last)})
+            try:
+               if res.code == 206:
+                  if _content_range(res.info())[0] != first:
+                     raise httplib.HTTPException('server answered a different range than bytes %d-%d' % (first,last))
+                  self._copy_rows(res,fid,0,last-first+1,throttle,hostname)
+                  written = 1
+               else:
+                  position = 0
+                  for first_byte, last_byte in self.ranges[i:]:
+                     self._copy_rows(res,fid,first_byte-position,last_byte-first_byte+1,
+                                     throttle,hostname)
+                     position = last_byte + 1
+                  written = len(self.ranges) - i
+            finally:
+               res.close()
+            session.breaker.success(host)
+            return written
+         except HTTPError, e:
+            e.close()
+            if not policy.retryable(e):
+               session.breaker.success(host)
+               say('Download failed: %d: %s: %s' % (e.code,e.msg,url))
+               return 0
+            error = e
+         except (URLError,socket.error,httplib.HTTPException), e:
+            error = e
+         if session.breaker.failure(host):
+            say('Too many failures, pausing all requests to %s' % host)
+         attempt += 1
+         if attempt > policy.retries:
+            say('Download failed after %d attempts (%s): %s' % (attempt,error,url))
+            return 0
+         delay = policy.delay(attempt,error)
+         say('Transfer failed (%s), retrying in %.1f s: %s' % (error,delay,url))
+         time.sleep(delay)
+         fid.seek(start)
+         fid.truncate()
+
+   def _copy_rows(self,res,fid,lead,nbytes,throttle,hostname):
+      """
+      Write the part inside the window of each row in the range read from res to
+      fid; the range (nbytes long, after lead bytes to drop) starts at the first
+      sample of the window in a row
+      """
+      stride = self.cols*self.dtype.itemsize
+      want = (self.samples[1]-self.samples[0])*self.dtype.itemsize
+      pos, left = 0, lead + nbytes
+      while left > 0:
+         block = res.read(min(throttle.blocksize(BLOCKSIZE) if throttle else BLOCKSIZE,left))
+         if not block:
+            raise httplib.HTTPException('range incomplete, %d bytes missing' % left)
+         left -= len(block)
+         if throttle is not None:
+            throttle.wait(hostname,len(block))
+         i = 0
+         if lead:
+            i = min(lead,len(block))
+            lead -= i
+         while i < len(block):
+            offset = pos % stride
+            if offset < want:
+               n = min(want-offset,len(block)-i)
+               fid.write(buffer(block,i,n))
+            else:
+               n = min(stride-offset,len(block)-i)
+            i += n
+            pos += n
+
+###-------------------------------------------------------------------------------###
+def byte_ranges(cols,itemsize,lines,samples,gap=MERGE_GAP):
+   """
+   Byte ranges [first, last] of a raster cols samples wide holding the window
+   lines=(first, stop), samples=(first, stop); ranges less than gap bytes apart
+   are merged
+   """
+   stride = cols*itemsize
+   start, stop = samples[0]*itemsize, samples[1]*itemsize
+   ranges = []
+   for row in range(lines[0],lines[1]):
+      first, last = row*stride + start, row*stride + stop - 1
+      if ranges and first - ranges[-1][1] - 1 <= gap:
+         ranges[-1][1] = last
+      else:
+         ranges.append([first,last])
+   return ranges
+
+def bbox_window(geo,bbox):
+   """
+   Lines and samples, each (first, stop), of the pixels of the grid geo (first
+   latitude, first longitude, latitude step, longitude step) whose centers are
+   inside bbox=(south, north, west, east)
+   """
+   window = []
+   for first, step, low, high in ((geo[0],geo[2],bbox[0],bbox[1]),(geo[1],geo[3],bbox[2],bbox[3])):
+      a, b = sorted(((low-first)/step,(high-first)/step))
+      window.append((int(math.ceil(a-1.e-9)),int(math.floor(b+1.e-9))+1))
+   return tuple(window)
+
+def plan_subset(filename,window):
+   """
+   The :class:`RasterSubset` of filename for the :class:`Window` window, or None if
+   the product is not subset (window does not apply to it, or no .ann on disk)
+   """
+   name = parse_name(os.path.basename(filename))
+   if not window.applies(name):
+      return None
+   annfile = find_annotation(filename)
+   if annfile is None:
+      say('no annotation for %s; downloading all of it' % filename)
+      return None
+   if name.ground:
+      return RasterSubset(filename,bbox=window.bbox,annfile=annfile)
+   return RasterSubset(filename,window.lines,window.samples,annfile=annfile)
+
+def edit_folder_annotation(annfile,folder,values):
+   """
+   Set values in the copy of annfile in folder (made from annfile if there is none yet)
+   """
+   target = os.path.join(folder,os.path.basename(annfile))
+   _ann_lock.acquire()
+   try:
+      fid = open(target if os.path.exists(target) else annfile)
+      try:
+         text = fid.read()
+      finally:
+         fid.close()
+      fid = open(target+'.tmp','w')
+      try:
+         fid.write(edit_annotation(text,values))
+      finally:
+         fid.close()
+      os.rename(target+'.tmp',target)
+   finally:
+      _ann_lock.release()
+
+def window_option(value):
+   """
+   (first, stop) from a --lines or --samples value A:B
+   """
+   first, stop = [int(v) for v in value.split(':')]
+   if first < 0 or stop <= first:
+      raise ValueError(value)
+   return first, stop
+
+def bbox_option(value):
+   """
+   (south, north, west, east) from a --bbox value S,N,W,E
+   """
+   south, north, west, east = [float(v) for v in value.split(',')]
+   if south >= north or west >= east or max(abs(south),abs(north)) > 90:
+      raise ValueError(value)
+   return south, north, west, east
+
+###-------------------------------------------------------------------------------###
@@ -0,0 +1,505 @@
+"""
+remote_raster.py  :  Read windows of a product on the server without downloading it
+
+:func:`open_remote` reads the .ann of a product over the authenticated
+:class:`http_retrieve.Session` and returns a :class:`RemoteRaster`, which has the
+reading interface of :class:`raster_reader.Raster` (shape, dtype, geo, read,
+indexing, latlon) but fetches only the rows it is asked for, with HTTP Range
+requests::
+
+   >>> from remote_raster import open_remote
+   >>> unw = open_remote('http://uavsar.asfdaac.alaska.edu/UA_SanAnd_08503_09083-008_10027-003_0174d_s01_L090_01/'
+   ...                   'SanAnd_08503_09083-008_10027-003_0174d_s01_L090HH_01.unw',session)
+   >>> block = unw.read(rows=(1000,1512),cols=(2000,2512))
+   >>> profile = unw[:,3000]
+
+The file is read in blocks of whole rows (about 1 MB each).  Missing blocks that
+are next to each other are fetched with one request; blocks are kept in memory
+(least recently used ones are dropped beyond a limit) and in a :class:`BlockCache`
+on disk, keyed by URL and ETag (or Last-Modified and size) so a file that changed
+on the server is never served stale.  When the blocks are read in order, the
+next few are fetched in the background before they are asked for.
+
+:class:`RemoteBlockFile` gives the same block cache as a read-only file object
+(read, seek, tell, pread) for any file on the server.
+
+Options
+-------
+   $UAVSAR_BLOCK_CACHE  :  directory of the disk cache [~/.uavsar_blocks]
+
+See Also
+--------
+:ref:`raster_reader`, :ref:`raster_subset`, :ref:`http_retrieve`
+"""
+from __future__ import print_function, division
+import os,time,socket,threading,httplib,hashlib,urlparse
+from urllib2 import HTTPError, URLError
+import numpy as np
+from annotation import Annotation
+from http_retrieve import Session, get_password, say, _content_range
+from product_name import parse_name
+from raster_reader import layout, index_window, clip_window
+from retry_policy import RetryPolicy
+
+__title__      = 'remote_raster.py'
+__author__     = 'UAVSAR_WebPy contributors'
+__email__      = ''
+__created__    = 'October 2026'
+__modified__   = ''
+__version__    = '1.0'
+__status__     = 'Development'
+__conditions__ = 'Use at your own risk.'
+__license__    = """
+Copyright (C) 2026   UAVSAR_WebPy contributors
+--------------------------------------------------------------------
+GNU Licensed
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+--------------------------------------------------------------------
+"""
+
+BLOCK_CACHE = os.path.join('~','.uavsar_blocks')
+BLOCK_SIZE = 1 << 20     # bytes per block (whole rows for a RemoteRaster)
+MEMORY = 64 << 20        # bytes of blocks kept in memory
+DISK = 1 << 30           # bytes of blocks kept on disk
+READAHEAD = 4            # blocks fetched ahead of sequential reads
+
+###==============================================================================###
+class BlockCache():
+   """
+   Blocks of remote files kept on disk between runs
+
+   Parameters
+   ----------
+   path      :  cache directory [$UAVSAR_BLOCK_CACHE or ~/.uavsar_blocks]
+   max_bytes :  least recently used blocks are removed beyond this size [1 GB]
+   """
+   def __init__(self,path=None,max_bytes=DISK):
+      self.path = os.path.expanduser(path or os.getenv('UAVSAR_BLOCK_CACHE') or BLOCK_CACHE)
+      self.max_bytes = max_bytes
+      self._lock = threading.Lock()
+      self._total = None
+
+   def key(self,remote,block_size):
+      """
+      Key of the blocks of the :class:`http_retrieve.RemoteFile` remote (None if the
+      server gives no validator, so changes could not be told)
+      """
+      if remote.etag:
+         validator = 'etag:' + remote.etag
+      elif remote.last_modified:
+         validator = 'modified:%s:%s' % (remote.last_modified,remote.size)
+      else:
+         return None
+      return hashlib.sha1('%s\n%s\n%d' % (remote.url,validator,block_size)).hexdigest()
+
+   def get(self,key,block):
+      path = os.path.join(self.path,key,str(block))
+      try:
+         fid = open(path,'rb')
+         try:
+            data = fid.read()
+         finally:
+            fid.close()
+         os.utime(path,None)  # the modification time orders the eviction
+         return data
+      except (IOError,OSError):
+         return None
+
+   def put(self,key,block,data):
+      folder = os.path.join(self.path,key)
+      path = os.path.join(folder,str(block))
+      try:
+         if not os.path.exists(folder): os.makedirs(folder)
+         tmp = '%s.%d.%d.tmp' % (path,os.getpid(),threading.current_thread().ident)
+         fid = open(tmp,'wb')
+         try:
+            fid.write(data)
+         finally:
+            fid.close()
+         os.rename(tmp,path)
+      except (IOError,OSError), e:
+         say('cannot cache block: %s' % e)
+         return
+      self._lock.acquire()
+      try:
+         if self._total is None:
+            self._total = sum(size for used,size,path in self._entries())
+         else:
+            self._total += len(data)
+         if self._total > self.max_bytes:
+            self._evict()
+      finally:
+         self._lock.release()
+
+   def _entries(self):
+      entries = []
+      for folder, dirs, files in os.walk(self.path):
+         for name in files:
+            if name.endswith('.tmp'): continue
+            path = os.path.join(folder,name)
+            try:
+               stat = os.stat(path)
+            except OSError:
+               continue
+            entries.append((stat.st_mtime,stat.st_size,path))
+      return entries
+
+   def _evict(self):
+      entries = sorted(self._entries())
+      total = sum(entry[1] for entry in entries)
+      for used, size, path in entries:
+         if total <= self.max_bytes*0.9: break
+         try:
+            os.remove(path)
+            total -= size
+            os.rmdir(os.path.dirname(path))  # fails while the file has other blocks
+         except OSError:
+            pass
+      self._total = total
+
+###==============================================================================###
+class RemoteBlockFile():
+   """
+   Read-only file object for a file on the server, read in cached blocks
+
+   Parameters
+   ----------
+   url        :  file URL
+   session    :  :class:`http_retrieve.Session` [a new one with the credentials of get_password]
+   block_size :  bytes per block [1 MB]
+   memory     :  bytes of blocks kept in memory [64 MB]
+   cache      :  :class:`BlockCache` on disk [the default one]; False for none
+   readahead  :  blocks fetched in the background ahead of sequential reads [4]
+   policy     :  :class:`retry_policy.RetryPolicy` for failed requests [RetryPolicy()]
+
+   Attributes
+   ----------
+   size      :  file size in bytes
+   requests  :  number of Range requests sent
+   fetched   :  bytes downloaded
+   """
+   def __init__(self,url,session=None,block_size=BLOCK_SIZE,memory=MEMORY,cache=None,
+                readahead=READAHEAD,policy=None):
+      if session is None:
+         username, password = get_password()
+         session = Session(username=username,password=password)
+      self.url, self.session = url, session
+      self.remote = session.probe(url)
+      if not self.remote.available or self.remote.size is None:
+         raise IOError('cannot read %s (status %s)' % (url,self.remote.status))
+      if not self.remote.accept_ranges:
+         raise IOError('the server does not take Range requests for '+url)
+      self.size, self.block_size = self.remote.size, int(block_size)
+      self.nblocks = -(-self.size // self.block_size)
+      self.memory, self.readahead = memory, readahead
+      self.policy = policy if policy is not None else RetryPolicy()
+      self.cache = BlockCache() if cache is None else (cache or None)
+      self._key = self.cache.key(self.remote,self.block_size) if self.cache else None
+      self.requests, self.fetched = 0, 0
+      self._blocks, self._used, self._tick, self._held = {}, {}, 0, 0
+      self._loading = set()
+      self._cond = threading.Condition()
+      self._last = None
+      self._position = 0
+
+   def pread(self,offset,size):
+      """
+      size bytes from offset (fewer at the end of the file)
+      """
+      size = max(0,min(size,self.size-offset))
+      if size == 0: return ''
+      first, last = offset//self.block_size, (offset+size-1)//self.block_size
+      blocks = self.blocks(range(first,last+1))
+      data = ''.join(blocks[b] for b in range(first,last+1))
+      start = offset - first*self.block_size
+      return data[start:start+size]
+
+   def read(self,size=-1):
+      if size < 0: size = self.size - self._position
+      data = self.pread(self._position,size)
+      self._position += len(data)
+      return data
+
+   def seek(self,offset,whence=0):
+      self._position = max(0,(0,self._position,self.size)[whence] + offset)
+
+   def tell(self):
+      return self._position
+
+   def close(self):
+      self._cond.acquire()
+      self._blocks, self._used, self._held = {}, {}, 0
+      self._cond.release()
+
+   ###----------------------------------------------------------------------------###
+   def blocks(self,ids):
+      """
+      Dict of block number to the bytes of each block in ids, fetching the missing
+      ones (runs of neighbours in one request) and reading ahead of sequential reads
+      """
+      ids = list(ids)
+      found, fetch = {}, []
+      self._cond.acquire()
+      try:
+         for b in ids:
+            data = self._memory_get(b)
+            if data is not None:
+               found[b] = data
+            elif b not in self._loading:
+               self._loading.add(b)
+               fetch.append(b)
+         sequential = self._last is not None and ids and ids[0] in (self._last,self._last+1)
+         self._last = ids[-1] if ids else self._last
+      finally:
+         self._cond.release()
+      try:
+         self._load(fetch)
+      finally:
+         self._cond.acquire()
+         self._loading.difference_update(fetch)
+         self._cond.notify_all()
+         self._cond.release()
+      ahead = min(self.readahead,self.memory//self.block_size - len(ids))  # what memory can hold
+      if sequential and ahead > 0:
+         self._prefetch(range(ids[-1]+1,min(ids[-1]+1+ahead,self.nblocks)))
+      self._cond.acquire()
+      try:
+         for b in ids:
+            while b not in found:
+               data = self._memory_get(b)
+               if data is not None:
+                  found[b] = data
+               elif b in self._loading:
+                  self._cond.wait(1.)  # being fetched by another read or the read-ahead
+               else:
+                  self._cond.release()
+                  try:
+                     self._loading.add(b)
+                     self._load([b])
+                  finally:
+                     self._cond.acquire()
+                     self._loading.discard(b)
+      finally:
+         self._cond.release()
+      return found
+
+   def _prefetch(self,ids):
+      self._cond.acquire()
+      try:
+         ids = [b for b in ids if b not in self._blocks and b not in self._loading]
+         self._loading.update(ids)
+      finally:
+         self._cond.release()
+      if not ids: return
+      def run():
+         try:
+            self._load(ids)
+         except Exception, e:
+            say('read-ahead failed (%s): %s' % (e,self.url))
+         self._cond.acquire()
+         self._loading.difference_update(ids)
+         self._cond.notify_all()
+         self._cond.release()
+      t = threading.Thread(target=run)
+      t.daemon = True
+      t.start()
+
+   def _load(self,ids):
+      """
+      Bring the blocks ids into memory, from the disk cache or the server
+      """
+      missing = []
+      for b in ids:
+         data = self.cache.get(self._key,b) if self._key else None
+         if data is None:
+            missing.append(b)
+         else:
+            self._memory_put(b,data)
+      for first, last in _runs(missing):
+         data = self._get_range(first*self.block_size,min((last+1)*self.block_size,self.size)-1)
+         for b in range(first,last+1):
+            block = data[(b-first)*self.block_size:(b-first+1)*self.block_size]
+            if self._key: self.cache.put(self._key,b,block)
+            self._memory_put(b,block)
+
+   def _get_range(self,first,last):
+      """
+      Bytes first to last of the file, retrying as the policy allows
+      """
+      host, attempt = urlparse.urlsplit(self.url).netloc, 0
+      while True:
+         self.session.breaker.wait(host)
+         try:
+            res = self.session.open(self.url,headers={'Range': 'bytes=%d-%d' % (first,last)})
+            try:
+               if res.code != 206 or _content_range(res.info())[0] != first:
+                  raise IOError('the server did not answer the Range request for '+self.url)
+               data = res.read(last-first+1)
+            finally:
+               res.close()
+            if len(data) != last-first+1:
+               raise httplib.HTTPException('got %d of %d bytes' % (len(data),last-first+1))
+            self.session.breaker.success(host)
+            self._cond.acquire()
+            self.requests += 1
+            self.fetched += len(data)
+            self._cond.release()
+            return data
+         except HTTPError, e:
+            e.close()
+            if not self.policy.retryable(e): raise
+            error = e
+         except (URLError,socket.error,httplib.HTTPException), e:
+            error = e
+         self.session.breaker.failure(host)
+         attempt += 1
+         if attempt > self.policy.retries: raise error
+         time.sleep(self.policy.delay(attempt,error))
+
+   def _memory_get(self,b):
+      data = self._blocks.get(b)
+      if data is not None:
+         self._tick += 1
+         self._used[b] = self._tick
+      return data
+
+   def _memory_put(self,b,data):
+      self._cond.acquire()
+      try:
+         if b in self._blocks:
+            self._held -= len(self._blocks[b])
+         self._tick += 1
+         self._blocks[b], self._used[b] = data, self._tick
+         self._held += len(data)
+         while self._held > self.memory and len(self._blocks) > 1:
+            oldest = min(self._used,key=self._used.get)
+            self._held -= len(self._blocks.pop(oldest))
+            del self._used[oldest]
+      finally:
+         self._cond.release()
+
+###==============================================================================###
+class RemoteRaster(object):
+   """
+   A product on the server, read like a :class:`raster_reader.Raster`
+
+   Parameters
+   ----------
+   url     :  product URL
+   session :  :class:`http_retrieve.Session` [a new one with the credentials of get_password]
+   ann     :  :class:`annotation.Annotation` of the product [read from the server]
+   kwargs  :  passed to :class:`RemoteBlockFile` (memory, cache, readahead, block_size)
+
+   Attributes
+   ----------
+   shape, dtype, geo :  as for :class:`raster_reader.Raster`
+   file              :  the :class:`RemoteBlockFile` (requests and bytes fetched)
+   """
+   def __init__(self,url,session=None,ann=None,**kwargs):
+      if session is None:
+         username, password = get_password()
+         session = Session(username=username,password=password)
+      self.url, self.filename = url, url.split('/')[-1]
+      if ann is None:
+         ann = remote_annotation(url,session)
+      self.ann = ann
+      rows, cols, self.dtype, self.geo = layout(ann,self.filename)
+      self.shape = (rows,cols)
+      stride = cols*self.dtype.itemsize
+      kwargs['block_size'] = max(1,kwargs.get('block_size',BLOCK_SIZE)//stride)*stride
+      self.file = RemoteBlockFile(url,session,**kwargs)
+      if self.file.size < rows*stride:
+         raise ValueError('%s holds %d bytes, its annotation describes %d x %d samples of %d bytes'
+                          % (url,self.file.size,rows,cols,self.dtype.itemsize))
+      self._block_rows = self.file.block_size//stride
+
+   def read(self,rows=None,cols=None):
+      """
+      The block rows=(first,stop), cols=(first,stop) (all of them if None)
+      """
+      rows = clip_window(rows,self.shape[0])
+      cols = clip_window(cols,self.shape[1])
+      out = np.empty((rows[1]-rows[0],cols[1]-cols[0]),dtype=self.dtype)
+      if out.size == 0: return out
+      first, last = rows[0]//self._block_rows, (rows[1]-1)//self._block_rows
+      blocks = self.file.blocks(range(first,last+1))
+      for b in range(first,last+1):
+         data = np.frombuffer(blocks[b],dtype=self.dtype).reshape(-1,self.shape[1])
+         top = b*self._block_rows
+         lo, hi = max(rows[0],top), min(rows[1],top+data.shape[0])
+         out[lo-rows[0]:hi-rows[0]] = data[lo-top:hi-top,cols[0]:cols[1]]
+      return out
+
+   def __getitem__(self,key):
+      bounds, picks = index_window(key,self.shape)
+      return self.read(*bounds)[picks[0]][...,picks[1]]
+
+   def __len__(self):
+      return self.shape[0]
+
+   def latlon(self,row,col):
+      """
+      Latitude and longitude of the center of pixel (row, col) of a ground-projected product
+      """
+      if self.geo is None:
+         raise ValueError(self.filename+' is not ground-projected')
+      return self.geo[0] + row*self.geo[2], self.geo[1] + col*self.geo[3]
+
+   def close(self):
+      self.file.close()
+
+###-------------------------------------------------------------------------------###
+def open_remote(url,session=None,ann=None,**kwargs):
+   """
+   Open the product at url for reading without downloading it; returns a :class:`RemoteRaster`
+   """
+   return RemoteRaster(url,session,ann,**kwargs)
+
+def remote_annotation(url,session):
+   """
+   :class:`annotation.Annotation` of the product at url, read from the server
+   """
+   folder, base = url.rsplit('/',1)
+   candidates = [base.split('.')[0] + '.ann']
+   name = parse_name(base)
+   if name is not None and name.folder[3:] + '.ann' not in candidates:
+      candidates.append(name.folder[3:] + '.ann')
+   for candidate in candidates:
+      try:
+         res = session.open(folder+'/'+candidate)
+      except HTTPError, e:
+         e.close()
+         if e.code in (404,410): continue
+         raise
+      try:
+         return Annotation(res.read(),folder+'/'+candidate)
+      finally:
+         res.close()
+   raise IOError('no annotation file found for '+url)
+
+def _runs(ids):
+   """
+   (first, last) of each run of consecutive numbers in ids
+   """
+   runs = []
+   for b in sorted(ids):
+      if runs and b == runs[-1][1] + 1:
+         runs[-1][1] = b
+      else:
+         runs.append([b,b])
+   return runs
+
+###-------------------------------------------------------------------------------###
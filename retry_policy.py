@@ -0,0 +1,190 @@
+"""
+retry_policy.py  :  When and how soon to retry a failed request, per host
+
+A :class:`RetryPolicy` sorts errors into retryable ones (dropped connections,
+timeouts, 408/429/5xx answers) and fatal ones (404, refused credentials, other
+4xx answers) and spaces the retries out with exponential backoff and random
+jitter, honoring a Retry-After header when the server sends one.
+
+A :class:`CircuitBreaker` is shared by every worker talking to a host.  After
+a run of consecutive failures it stops all requests to that host for a cool-down
+period, then lets a single trial request through; the host is reopened to
+everybody once a request succeeds again.
+
+Options
+-------
+   --retries N     :  retries of a failed file before giving up [3]
+   --backoff SEC   :  delay before the first retry, doubled for every further one [1]
+
+See Also
+--------
+:ref:`http_retrieve`, :ref:`download_queue`
+"""
+from __future__ import print_function, division
+import time,random,socket,threading,httplib
+from urllib2 import HTTPError, URLError
+from email.utils import parsedate_tz, mktime_tz
+
+__title__      = 'retry_policy.py'
+__author__     = 'UAVSAR_WebPy contributors'
+__email__      = ''
+__created__    = 'October 2026'
+__modified__   = ''
+__version__    = '1.0'
+__status__     = 'Development'
+__conditions__ = 'Use at your own risk.'
+__license__    = """
+Copyright (C) 2026   UAVSAR_WebPy contributors
+--------------------------------------------------------------------
+GNU Licensed
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+--------------------------------------------------------------------
+"""
+
+RETRY_STATUS = (408,429,500,502,503,504)
+
+###==============================================================================###
+class RetryPolicy():
+   """
+   Retry rules for one download
+
+   Parameters
+   ----------
+   retries   :  retries after the first attempt [3]
+   backoff   :  seconds before the first retry [1]
+   factor    :  growth of the delay with every further retry [2]
+   max_delay :  longest delay between two attempts, including Retry-After [300]
+   jitter    :  fraction of each delay that is randomized, so that workers that
+                failed together do not retry together [0.5]
+   status    :  HTTP status codes that are retried [408, 429, 500, 502, 503, 504]
+   """
+   def __init__(self,retries=3,backoff=1.,factor=2.,max_delay=300.,jitter=0.5,status=RETRY_STATUS):
+      self.retries, self.backoff, self.factor = retries, backoff, factor
+      self.max_delay, self.jitter, self.status = max_delay, jitter, status
+
+   def retryable(self,error):
+      """
+      True if the request that raised error is worth repeating; only network
+      errors are, an error of the local disk (a plain IOError or OSError) is not
+      """
+      if isinstance(error,HTTPError):
+         return error.code in self.status
+      return isinstance(error,(URLError,socket.error,httplib.HTTPException))
+
+   def delay(self,attempt,error=None):
+      """
+      Seconds to wait before retry number attempt (1 for the first retry)
+      """
+      wait = retry_after(error)
+      if wait is None:
+         wait = self.backoff * self.factor**(attempt-1)
+         wait *= 1. - self.jitter*random.random()
+      return max(0.,min(wait,self.max_delay))
+
+###-------------------------------------------------------------------------------###
+def retry_after(error):
+   """
+   Seconds asked for by the Retry-After header of an HTTPError (None if absent)
+   """
+   try:
+      value = error.info().getheader('Retry-After')
+   except AttributeError:
+      return None
+   if not value: return None
+   value = value.strip()
+   if value.isdigit():
+      return float(value)
+   parsed = parsedate_tz(value)
+   if parsed is None: return None
+   return max(0.,mktime_tz(parsed) - time.time())
+
+###==============================================================================###
+class CircuitBreaker():
+   """
+   Per-host circuit breaker shared by the workers of a run
+
+   Parameters
+   ----------
+   threshold :  consecutive failures that open the circuit of a host [5]
+   cooldown  :  seconds a host is left alone once its circuit opens; doubled each
+                time a trial request fails, up to ten times this value [30]
+   """
+   def __init__(self,threshold=5,cooldown=30.):
+      self.threshold, self.cooldown = threshold, cooldown
+      self._hosts = {}
+      self._lock = threading.Lock()
+
+   def allow(self,host):
+      """
+      Return 0 if a request to host may be sent now, otherwise the seconds to wait
+      before asking again
+
+      While the circuit is open nothing is allowed; when the cool-down is over a
+      single caller is let through as the trial.  A trial that is never reported
+      (with :meth:`success` or :meth:`failure`) is handed to another caller after
+      another cool-down.
+      """
+      self._lock.acquire()
+      try:
+         state = self._hosts.get(host)
+         if state is None or state['failures'] < self.threshold:
+            return 0.
+         now = time.time()
+         if now < state['until']:
+            return state['until'] - now
+         if state['trial'] and now - state['trial'] < state['cooldown']:
+            return 1.
+         state['trial'] = now
+         return 0.
+      finally:
+         self._lock.release()
+
+   def wait(self,host):
+      """
+      Block until a request to host is allowed
+      """
+      while True:
+         delay = self.allow(host)
+         if delay <= 0: return
+         time.sleep(min(delay,1.))
+
+   def success(self,host):
+      self._lock.acquire()
+      try:
+         if host in self._hosts: del self._hosts[host]
+      finally:
+         self._lock.release()
+
+   def failure(self,host):
+      """
+      Count a failed request to host; returns True if this opened its circuit
+      """
+      self._lock.acquire()
+      try:
+         state = self._hosts.setdefault(host,{'failures': 0, 'until': 0., 'trial': 0.,
+                                              'cooldown': self.cooldown})
+         state['failures'] += 1
+         if state['trial']:
+            state['cooldown'] = min(2*state['cooldown'],10*self.cooldown)
+         elif state['failures'] != self.threshold:
+            return False
+         state['trial'] = 0.
+         state['until'] = time.time() + state['cooldown']
+         return True
+      finally:
+         self._lock.release()
+
+###-------------------------------------------------------------------------------###
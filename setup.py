@@ -48,7 +48,28 @@ def configuration(parent_package='',top_path=None):
                        quiet=True)
    config.add_scripts('uavsar_insar_download.py',
                         'uavsar_polsar_download.py',
-                        'http_retrieve.py')
+                        'http_retrieve.py',
+                        'download_queue.py',
+                        'line_manifest.py',
+                        'uavsar_batch_download.py',
+                        'download_cache.py',
+                        'async_download.py',
+                        'standin_server.py',
+                        'retry_policy.py',
+                        'throttle.py',
+                        'folder_index.py',
+                        'product_name.py',
+                        'line_catalog.py',
+                        'download_plan.py',
+                        'annotation.py',
+                        'raster_reader.py',
+                        'stream_stage.py',
+                        'raster_subset.py',
+                        'remote_raster.py',
+                        'tiled_raster.py',
+                        'download_benchmark.py',
+                        'transfer_metrics.py',
+                        'trace_events.py')
    config.get_version('version.py')
    return config
 
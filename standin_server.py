@@ -0,0 +1,331 @@
+#!/usr/bin/env python
+
+"""
+standin_server.py  :  Local HTTP server that stands in for the ASF data server
+
+Usage:
+
+.. code-block:: bash
+
+   $ standin_server.py root [options]
+
+Parameter
+---------
+root  :  directory served; its sub-directories play the flight-line folders
+
+Options
+-------
+   --port N          :  port to listen on [8765]
+   --username NAME   :  user name accepted by the login form [user]
+   --password PASS   :  password accepted by the login form [pass]
+   --latency SEC     :  delay added before every response [0]
+   --fail P          :  probability that a transfer is cut off after each 64 kB [0]
+   --errors P        :  probability that a file request is answered 503 (Retry-After: 1) [0]
+   --no-ranges       :  ignore Range requests (and do not advertise them)
+
+Notes
+-----
+* The server behaves like the ASF server as far as the download scripts are
+   concerned: a request without a valid session cookie is answered with 401 and
+   an HTML page whose first form posts the fields userid and password; a good
+   login sets the session cookie
+
+* Files are served with ETag, Last-Modified, Accept-Ranges, and (for Range
+   requests) 206 Partial Content; directories are listed as HTML
+
+* GET /_stats returns the request and byte counters as JSON
+
+* Point the download scripts at http://127.0.0.1:<port>/<folder>/<file> and put
+   uavsarhttp:<username>:<password> in $HOME/.dathack.d to use them against it
+
+"""
+from __future__ import print_function, division
+import sys,os,re,time,random,socket,threading,json,uuid,cgi,urllib,urlparse
+import BaseHTTPServer, SocketServer
+
+__title__      = 'standin_server.py'
+__author__     = 'UAVSAR_WebPy contributors'
+__email__      = ''
+__created__    = 'October 2026'
+__modified__   = ''
+__version__    = '1.0'
+__status__     = 'Development'
+__conditions__ = 'Use at your own risk.'
+__license__    = """
+Copyright (C) 2026   UAVSAR_WebPy contributors
+--------------------------------------------------------------------
+GNU Licensed
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+--------------------------------------------------------------------
+"""
+
+LOGIN_FORM = """<html><head><title>ASF Data Login</title></head><body>
+<form method="post" action="/login">
+User ID: <input type="text" name="userid"/>
+Password: <input type="password" name="password"/>
+<input type="submit" value="Login"/>
+</form></body></html>"""
+
+COOKIE_NAME = 'asf_standin_session'
+
+###==============================================================================###
+class StandinServer():
+   """
+   ASF stand-in serving root from a background thread
+
+   Parameters
+   ----------
+   root     :  directory served
+   port     :  port to listen on (0 picks a free port) [0]
+   username :  user name accepted by the login form ['user']
+   password :  password accepted by the login form ['pass']
+   latency  :  seconds added before every response [0]
+   fail     :  probability that a transfer is cut off after each 64 kB [0]
+   errors   :  probability that a file request is answered 503 with Retry-After: 1 [0]
+   ranges   :  honor Range requests [True]
+   host     :  interface to listen on ['127.0.0.1']
+
+   The base URL of the running server is in attribute url and its counters in
+   attribute stats.
+   """
+   def __init__(self,root,port=0,username='user',password='pass',latency=0.,fail=0.,errors=0.,
+                ranges=True,host='127.0.0.1'):
+      self.root = os.path.abspath(root)
+      self.username, self.password = username, password
+      self.latency, self.fail, self.errors, self.ranges = latency, fail, errors, ranges
+      self.sessions = set()
+      self.stats = {'GET': 0, 'HEAD': 0, 'POST': 0, 'logins': 0, 'connections': 0,
+                    'bytes': 0, 'cut': 0, 'errors': 0}
+      self._lock = threading.Lock()
+      self._httpd = _ThreadingHTTPServer((host,port),_StandinHandler)
+      self._httpd.standin = self
+      self.url = 'http://%s:%d' % self._httpd.server_address[:2]
+      self._thread = None
+
+   def start(self):
+      """
+      Serve in a daemon thread; returns the base URL
+      """
+      self._thread = threading.Thread(target=self._httpd.serve_forever)
+      self._thread.daemon = True
+      self._thread.start()
+      return self.url
+
+   def serve_forever(self):
+      self._httpd.serve_forever()
+
+   def stop(self):
+      self._httpd.shutdown()
+      self._httpd.server_close()
+      if self._thread is not None:
+         self._thread.join()
+
+   def count(self,key,n=1):
+      self._lock.acquire()
+      self.stats[key] += n
+      self._lock.release()
+
+   def reset_stats(self):
+      self._lock.acquire()
+      for key in self.stats: self.stats[key] = 0
+      self._lock.release()
+
+###-------------------------------------------------------------------------------###
+class _ThreadingHTTPServer(SocketServer.ThreadingMixIn,BaseHTTPServer.HTTPServer):
+   daemon_threads = True
+   allow_reuse_address = True
+
+   def handle_error(self,request,client_address):
+      if not isinstance(sys.exc_info()[1],socket.error):  # clients that went away are normal
+         SocketServer.TCPServer.handle_error(self,request,client_address)
+
+class _StandinHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+   protocol_version = 'HTTP/1.1'
+   server_version = 'StandinASF/1.0'
+
+   def setup(self):
+      BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+      self.standin = self.server.standin
+      self.standin.count('connections')
+
+   def log_message(self,*args):
+      pass
+
+   def do_HEAD(self):
+      self.standin.count('HEAD')
+      self._serve(head=True)
+
+   def do_GET(self):
+      self.standin.count('GET')
+      if self.path == '/_stats':
+         return self._reply(200,json.dumps(self.standin.stats),'application/json')
+      self._serve()
+
+   def do_POST(self):
+      self.standin.count('POST')
+      body = self.rfile.read(int(self.headers.getheader('Content-Length') or 0))
+      if self.path.split('?')[0] != '/login':
+         return self._reply(405,'')
+      self._delay()
+      fields = urlparse.parse_qs(body)
+      if (fields.get('userid',[''])[0] == self.standin.username and
+            fields.get('password',[''])[0] == self.standin.password):
+         token = uuid.uuid4().hex
+         self.standin.sessions.add(token)
+         self.standin.count('logins')
+         self._reply(200,'<html><body>Logged in</body></html>','text/html',
+                     [('Set-Cookie','%s=%s; Path=/' % (COOKIE_NAME,token))])
+      else:
+         self._reply(401,LOGIN_FORM,'text/html')
+
+   def _serve(self,head=False):
+      path = os.path.join(self.standin.root,urllib.unquote(self.path.split('?')[0]).lstrip('/'))
+      path = os.path.abspath(path)
+      if self.path == '/robots.txt' or not path.startswith(self.standin.root):
+         return self._reply(404,'',head=head)
+      if not self._logged_in():
+         self._delay()
+         return self._reply(401,LOGIN_FORM,'text/html',head=head)
+      self._delay()
+      if os.path.isdir(path):
+         return self._reply(200,_listing(path),'text/html',head=head)
+      if not os.path.isfile(path):
+         return self._reply(404,'',head=head)
+      if self.standin.errors and random.random() < self.standin.errors:
+         self.standin.count('errors')
+         return self._reply(503,'busy',headers=[('Retry-After','1')],head=head)
+
+      size = os.path.getsize(path)
+      mtime = os.path.getmtime(path)
+      etag = '"%x-%x"' % (size,int(mtime))
+      first, last, status = 0, size-1, 200
+      rng = self.headers.getheader('Range')
+      if rng and self.standin.ranges and self.headers.getheader('If-Range') in (None,etag,
+            self.date_time_string(mtime)):
+         match = re.match(r'bytes=(\d*)-(\d*)$',rng.strip())
+         if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+               first = int(match.group(1))
+               if match.group(2): last = min(int(match.group(2)),size-1)
+            else:
+               first = max(0,size-int(match.group(2)))
+            if first >= size:
+               return self._reply(416,'',headers=[('Content-Range','bytes */%d' % size)],head=head)
+            status = 206
+      headers = [('ETag',etag),('Last-Modified',self.date_time_string(mtime))]
+      if self.standin.ranges:
+         headers.append(('Accept-Ranges','bytes'))
+      if status == 206:
+         headers.append(('Content-Range','bytes %d-%d/%d' % (first,last,size)))
+      self.send_response(status)
+      self.send_header('Content-Type','application/octet-stream')
+      self.send_header('Content-Length',str(last-first+1))
+      for key, value in headers:
+         self.send_header(key,value)
+      self.end_headers()
+      if head: return
+
+      fid = open(path,'rb')
+      try:
+         fid.seek(first)
+         left, sent = last-first+1, 0
+         while left > 0:
+            block = fid.read(min(65536,left))
+            if sent > 0 and self.standin.fail and random.random() < self.standin.fail:
+               self.standin.count('cut')
+               self.close_connection = 1
+               self.wfile.flush()
+               self.connection.shutdown(2)
+               return
+            self.wfile.write(block)
+            left -= len(block)
+            sent += len(block)
+            self.standin.count('bytes',len(block))
+      finally:
+         fid.close()
+
+   def _logged_in(self):
+      for cookie in (self.headers.getheader('Cookie') or '').split(';'):
+         name, _, value = cookie.strip().partition('=')
+         if name == COOKIE_NAME and value in self.standin.sessions:
+            return True
+      return False
+
+   def _delay(self):
+      if self.standin.latency > 0:
+         time.sleep(self.standin.latency)
+
+   def _reply(self,status,body,ctype='text/plain',headers=[],head=False):
+      self.send_response(status)
+      self.send_header('Content-Type',ctype)
+      self.send_header('Content-Length',str(len(body)))
+      for key, value in headers:
+         self.send_header(key,value)
+      self.end_headers()
+      if not head:
+         self.wfile.write(body)
+
+###-------------------------------------------------------------------------------###
+def _listing(path):
+   """
+   HTML index of a directory in the style of an Apache folder listing
+   """
+   rows = []
+   for name in sorted(os.listdir(path)):
+      full = os.path.join(path,name)
+      if os.path.isdir(full): name += '/'
+      stamp = time.strftime('%d-%b-%Y %H:%M',time.gmtime(os.path.getmtime(full)))
+      size = '-' if name[-1] == '/' else str(os.path.getsize(full))
+      rows.append('<a href="%s">%s</a>  %s  %s' % (urllib.quote(name),cgi.escape(name),stamp,size))
+   return '<html><body><pre>\n' + '\n'.join(rows) + '\n</pre></body></html>'
+
+###-------------------------------------------------------------------------------###
+def _main(args):
+   opts = {'port': 8765, 'username': 'user', 'password': 'pass', 'latency': 0., 'fail': 0.,
+           'errors': 0., 'ranges': True}
+   types = {'port': int, 'username': str, 'password': str, 'latency': float, 'fail': float,
+            'errors': float}
+   root, i = None, 0
+   while i < len(args):
+      name = args[i][2:]
+      if args[i] == '--no-ranges':
+         opts['ranges'] = False
+      elif args[i][:2] == '--' and name in types and i+1 < len(args):
+         try:
+            opts[name] = types[name](args[i+1])
+         except ValueError:
+            print('Invalid value for option '+args[i]+': ',args[i+1])
+            sys.exit()
+         i += 1
+      elif args[i][:2] != '--' and root is None:
+         root = args[i]
+      else:
+         print(__doc__)
+         sys.exit()
+      i += 1
+   if root is None:
+      print(__doc__)
+      sys.exit()
+   server = StandinServer(root,**opts)
+   print('Serving %s at %s' % (server.root,server.url))
+   try:
+      server.serve_forever()
+   except KeyboardInterrupt:
+      pass
+
+###-------------------------------------------------------------------------------###
+if __name__=='__main__':
+   _main(sys.argv[1:])
@@ -0,0 +1,483 @@
+#!/usr/bin/env python
+
+"""
+stream_stage.py  :  Convert products while they are being downloaded
+
+Usage:
+
+.. code-block:: bash
+
+   $ stream_stage.py file [file ...] --convert LIST
+
+Parameter
+---------
+file  :  downloaded product(s) to convert (the .ann must be next to them)
+
+Options
+-------
+   --convert LIST  :  comma-separated stages to run, any of
+
+                      swap       :  byte-swapped copy  (file.swap)
+                      float16    :  half-precision copy of real or complex samples  (file.f16)
+                      amp-phase  :  amplitude and phase of complex samples, e.g. of an .int,
+                                    as little-endian REAL*4  (file.amp, file.phs)
+                      look=RxC   :  mean of every R rows by C columns, in the sample format of
+                                    the product  (file.look4x4); look=N is look=NxN
+                      tile       :  zlib-compressed tiles of 256 x 256 samples with an index,
+                                    read with raster_reader.open_raster  (file.tiles)
+                      tile-only  :  as tile, and the .tiles file replaces the product: the
+                                    flat file is removed once the tiles are complete
+
+Notes
+-----
+* Given to the download scripts (``--convert``, see :ref:`download_queue`), the
+   stages are fed each block of a product as it arrives, from a thread of their
+   own, so the conversion overlaps the transfer and the file is not read again
+   once it is on disk.  A resumed download first feeds the stages the bytes
+   already in the part file; the byte ranges after the first one of a segmented
+   download are fed from the part file when they are complete
+
+* A stage needs the layout of the product from its .ann file (see
+   :ref:`raster_reader`), which the download queue fetches ahead of the rasters;
+   files without one are downloaded unconverted
+
+* The derived files have no annotation of their own: look=RxC leaves
+   rows//R by cols//C samples, the other stages keep the dimensions of the product.
+   A .tiles file holds its dimensions, sample format, and grid (see :ref:`tiled_raster`)
+
+* Outputs are written to name.part and renamed when the product is complete; a
+   failed transfer removes them.  A failing stage is reported and dropped without
+   stopping the download
+
+* With tile-only the line manifest and the download cache record the .tiles file in
+   place of the product, so --sync finds it current and a later run with tile-only
+   takes it from the cache.  A product taken from the cache as .tiles is not run
+   through the other stages.  A product shorter than the rows x cols of its .ann is
+   not tiled (and with tile-only is kept as it is)
+
+* New stages subclass :class:`StreamStage` and are added to STAGES
+
+See Also
+--------
+:ref:`download_queue`, :ref:`http_retrieve`, :ref:`raster_reader`, :ref:`tiled_raster`
+"""
+from __future__ import print_function, division
+import sys,os,threading,Queue
+import numpy as np
+from annotation import read_annotation
+from http_retrieve import say
+from product_name import parse_name
+from raster_reader import find_annotation, layout
+from tiled_raster import TileWriter
+
+__title__      = 'stream_stage.py'
+__author__     = 'UAVSAR_WebPy contributors'
+__email__      = ''
+__created__    = 'October 2026'
+__modified__   = ''
+__version__    = '1.0'
+__status__     = 'Development'
+__conditions__ = 'Use at your own risk.'
+__license__    = """
+Copyright (C) 2026   UAVSAR_WebPy contributors
+--------------------------------------------------------------------
+GNU Licensed
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+--------------------------------------------------------------------
+"""
+
+RASTERS = ('int','unw','cor','amp1','amp2','hgt','mlc')
+READ_SIZE = 1 << 20  # bytes read at a time when feeding from the part file
+
+###==============================================================================###
+class StreamStage():
+   """
+   Consumer of the bytes of a product, in file order, as they are downloaded
+
+   :meth:`open` reads the layout of the product (attributes rows, cols, dtype)
+   and says whether the stage applies to it; the bytes are then passed to
+   :meth:`feed` in blocks of any size, and :meth:`finish` (or :meth:`abort`)
+   ends the file.  Subclasses implement :meth:`convert`, which receives whole
+   samples (whole groups of rows_per_call rows if that is set) as a numpy array,
+   and write their results with :meth:`write`.  A stage whose output replaces the
+   product sets replaces (and the suffix of that output).
+   """
+   rows_per_call = 0
+   replaces, suffix = False, None
+
+   def open(self,filename,ann=None,size=None):
+      """
+      Prepare to convert filename, of size bytes when known (e.g. from the
+      Content-Length); returns False if the stage does not apply to it
+      """
+      self.filename = filename
+      if ann is None:
+         annfile = find_annotation(filename)
+         if annfile is None:
+            name = parse_name(os.path.basename(filename))
+            if name is not None and name.product in RASTERS:
+               say('no annotation for %s; not converted' % filename)
+            return False
+         ann = read_annotation(annfile)
+      try:
+         self.rows, self.cols, self.dtype, self.geo = layout(ann,filename)
+      except ValueError:
+         return False
+      if not self.accepts(self.dtype): return False
+      self.unit = self.dtype.itemsize*(self.cols*self.rows_per_call or 1)
+      self._carry, self._ncarry, self._outputs = [], 0, {}
+      return True
+
+   def accepts(self,dtype):
+      """
+      True if the stage converts samples of numpy dtype dtype
+      """
+      return True
+
+   def feed(self,block):
+      """
+      Take the next block of bytes of the file
+      """
+      self._carry.append(block)
+      self._ncarry += len(block)
+      if self._ncarry < self.unit: return
+      data = ''.join(self._carry) if len(self._carry) > 1 else self._carry[0]
+      n = len(data) - len(data) % self.unit
+      self._carry = [data[n:]] if n < len(data) else []
+      self._ncarry = len(data) - n
+      samples = np.frombuffer(data,dtype=self.dtype,count=n//self.dtype.itemsize)
+      if self.rows_per_call:
+         samples = samples.reshape(-1,self.cols)
+      self.convert(samples)
+
+   def convert(self,samples):
+      raise NotImplementedError
+
+   def write(self,suffix,array):
+      """
+      Append array to the output filename + suffix
+      """
+      fid = self._outputs.get(suffix)
+      if fid is None:
+         fid = self._outputs[suffix] = open(self.filename+suffix+'.part','wb')
+      array.tofile(fid)
+
+   def finish(self):
+      """
+      The whole file was fed; complete the outputs and return their names
+      """
+      names = []
+      for suffix, fid in sorted(self._outputs.items()):
+         fid.close()
+         name = self.filename + suffix
+         if os.path.exists(name): os.remove(name)
+         os.rename(name+'.part',name)
+         names.append(name)
+      self._outputs = {}
+      return names
+
+   def abort(self):
+      """
+      The transfer failed; drop the partial outputs
+      """
+      for suffix, fid in self._outputs.items():
+         fid.close()
+         if os.path.exists(self.filename+suffix+'.part'):
+            os.remove(self.filename+suffix+'.part')
+      self._outputs = {}
+
+###-------------------------------------------------------------------------------###
+class ByteSwap(StreamStage):
+   """
+   Copy of the product in the opposite byte order
+   """
+   def convert(self,samples):
+      self.write('.swap',samples.byteswap())
+
+class Float16(StreamStage):
+   """
+   Copy of a real or complex product in half precision (complex samples become
+   pairs of real and imaginary parts)
+   """
+   def accepts(self,dtype):
+      return dtype.kind in 'fc'
+
+   def convert(self,samples):
+      if samples.dtype.kind == 'c':
+         samples = samples.view(samples.dtype.byteorder+'f%d' % (samples.dtype.itemsize//2))
+      self.write('.f16',samples.astype('<f2'))
+
+class AmpPhase(StreamStage):
+   """
+   Amplitude and phase (radians) of a complex product
+   """
+   def accepts(self,dtype):
+      return dtype.kind == 'c'
+
+   def convert(self,samples):
+      self.write('.amp',np.abs(samples).astype('<f4'))
+      self.write('.phs',np.angle(samples).astype('<f4'))
+
+class Multilook(StreamStage):
+   """
+   Mean of every rlooks rows by clooks columns; trailing rows and columns that do
+   not fill a look are dropped
+   """
+   def __init__(self,rlooks,clooks):
+      self.rlooks, self.clooks = rlooks, clooks
+      self.rows_per_call = rlooks
+
+   def accepts(self,dtype):
+      return dtype.kind in 'iufc' and self.cols >= self.clooks
+
+   def convert(self,samples):
+      ncols = self.cols//self.clooks
+      looks = samples[:,:ncols*self.clooks].reshape(-1,self.rlooks,ncols,self.clooks)
+      self.write('.look%dx%d' % (self.rlooks,self.clooks),looks.mean(axis=3).mean(axis=1).astype(self.dtype))
+
+class Tile(StreamStage):
+   """
+   Copy of the product as compressed tiles (see :ref:`tiled_raster`)
+   """
+   rows_per_call = 1
+   suffix = '.tiles'
+
+   def convert(self,samples):
+      if self.suffix not in self._outputs:
+         fid = self._outputs[self.suffix] = open(self.filename+self.suffix+'.part','wb')
+         self._writer = TileWriter(fid,self.rows,self.cols,self.dtype,self.geo)
+      self._writer.write(samples[:self.rows-self._writer.written])
+
+   def open(self,filename,ann=None,size=None):
+      if not StreamStage.open(self,filename,ann,size): return False
+      expected = self.rows*self.cols*self.dtype.itemsize
+      if size is not None and size < expected:
+         say('%s has %d bytes, short of the %d x %d samples in its annotation; not tiled'
+             % (filename,size,self.rows,self.cols))
+         return False
+      return True
+
+   def finish(self):
+      if self.suffix in self._outputs:
+         self._writer.close()
+      return StreamStage.finish(self)
+
+class TileOnly(Tile):
+   """
+   The product as compressed tiles only: the .tiles file replaces the flat one
+   """
+   replaces = True
+
+def _looks(value):
+   looks = [int(n) for n in value.lower().split('x')]
+   if len(looks) == 1: looks *= 2
+   if len(looks) != 2 or min(looks) < 1:
+      raise ValueError(value)
+   return looks
+
+STAGES = {'swap': (ByteSwap,None), 'float16': (Float16,None), 'amp-phase': (AmpPhase,None),
+          'look': (Multilook,_looks), 'tile': (Tile,None), 'tile-only': (TileOnly,None)}
+
+###==============================================================================###
+class StreamPipeline():
+   """
+   Feed the blocks of one download to its stages from a thread of their own
+
+   Parameters
+   ----------
+   filename  :  local name of the product (outputs are named after it)
+   factories :  callables returning a new :class:`StreamStage` each (see :func:`parse_stages`)
+   source    :  file holding the bytes not fed by the transfer itself [filename.part]
+   queued    :  blocks waiting for the stages before :meth:`feed` blocks [64]
+   size      :  bytes in the product, None if not known [None]
+
+   Blocks are passed to :meth:`feed` with their offset in the file; those that do
+   not continue the bytes fed so far (the later ranges of a segmented download)
+   are skipped and read back from source when the file is finished.  Once it is,
+   replacement is the output that replaces the product (None if there is none).
+   """
+   def __init__(self,filename,factories,source=None,queued=64,size=None):
+      self.filename, self.source = filename, source or filename+'.part'
+      self.stages = []
+      for factory in factories:
+         stage = factory()
+         if stage.open(filename,size=size): self.stages.append(stage)
+      self.position, self.outputs, self.replacement = 0, [], None
+      self._lock = threading.Lock()
+      self._queue = Queue.Queue(maxsize=queued)
+      self._thread = None
+
+   def start(self,done=0):
+      """
+      Start the thread; the first done bytes are taken from source
+      """
+      self.position = done
+      self._thread = threading.Thread(target=self._run)
+      self._thread.daemon = True
+      self._thread.start()
+      if done > 0: self._queue.put(('read',(0,done)))
+
+   def feed(self,offset,block):
+      """
+      Pass the block downloaded at byte offset to the stages if it comes next
+      """
+      if offset != self.position: return  # cheap test before taking the lock
+      self._lock.acquire()
+      try:
+         if offset != self.position: return
+         self.position += len(block)
+         self._queue.put(('data',block))
+      finally:
+         self._lock.release()
+
+   def finish(self,size):
+      """
+      The file is complete in source (size bytes); feed what was skipped, complete
+      the outputs, and return their names
+      """
+      self._lock.acquire()
+      try:
+         if self.position < size:
+            self._queue.put(('read',(self.position,size)))
+         self.position = size
+      finally:
+         self._lock.release()
+      self._stop('finish')
+      return self.outputs
+
+   def abort(self):
+      self._lock.acquire()
+      self.position = -1  # take no more blocks
+      self._lock.release()
+      self._stop('abort')
+
+   def _stop(self,action):
+      if self._thread is not None:
+         self._queue.put((action,None))
+         self._thread.join()
+         self._thread = None
+      elif action == 'abort':
+         for stage in self.stages: stage.abort()
+
+   def _run(self):
+      while True:
+         action, data = self._queue.get()
+         if action == 'finish':
+            for stage in self.stages:
+               try:
+                  names = stage.finish()
+               except Exception, e:  # this stage only; the others and the download go on
+                  self._failed(e,[stage])
+                  continue
+               if stage.replaces and names: self.replacement = names[0]
+               self.outputs += names
+            return
+         if action == 'abort':
+            self._failed(None,self.stages)
+            return
+         try:
+            if action == 'data':
+               for stage in self.stages: stage.feed(data)
+            else:
+               self._read(*data)
+         except Exception, e:
+            self._failed(e,self.stages)
+            self.stages = []
+
+   def _failed(self,error,stages):
+      """
+      Report error (None when the transfer failed) and drop the outputs of stages
+      """
+      if error is not None:
+         say('conversion failed (%s): %s' % (error,self.filename))
+      for stage in stages:
+         try:
+            stage.abort()
+         except Exception, e:
+            say('cannot remove the outputs of a conversion (%s): %s' % (e,self.filename))
+
+   def _read(self,start,stop):
+      fid = open(self.source,'rb')
+      try:
+         fid.seek(start)
+         while start < stop:
+            block = fid.read(min(READ_SIZE,stop-start))
+            if not block:
+               raise IOError('%s ends at byte %d' % (self.source,start))
+            for stage in self.stages: stage.feed(block)
+            start += len(block)
+      finally:
+         fid.close()
+
+###-------------------------------------------------------------------------------###
+def parse_stages(value):
+   """
+   Stage factories for a ``--convert`` value such as 'amp-phase,look=4x4'
+   """
+   factories = []
+   for item in value.split(','):
+      name, eq, arg = item.strip().partition('=')
+      if name not in STAGES or bool(eq) != (STAGES[name][1] is not None):
+         raise ValueError(item)
+      cls, parse = STAGES[name]
+      factories.append(_factory(cls,parse(arg) if parse else []))
+   return factories
+
+def _factory(cls,args):
+   return lambda: cls(*args)
+
+def stream_pipeline(filename,factories,done=0,source=None,size=None):
+   """
+   A started :class:`StreamPipeline` for filename (of size bytes when known), or
+   None if no stage applies to it
+   """
+   if not factories: return None
+   pipeline = StreamPipeline(filename,factories,source,size=size)
+   if not pipeline.stages: return None
+   pipeline.start(done)
+   return pipeline
+
+def convert_file(filename,factories):
+   """
+   Run the stages over a file already on disk; returns the names of the outputs.
+   A product replaced by its output (tile-only) is removed.
+   """
+   pipeline = stream_pipeline(filename,factories,source=filename,size=os.path.getsize(filename))
+   if pipeline is None: return []
+   outputs = pipeline.finish(os.path.getsize(filename))
+   if pipeline.replacement is not None: os.remove(filename)
+   return outputs
+
+def replacement(filename,factories):
+   """
+   Name of the output that replaces filename if factories hold a stage replacing the
+   product (tile-only), None otherwise
+   """
+   for factory in factories or []:
+      stage = factory()
+      if stage.replaces: return filename + stage.suffix
+   return None
+
+###-------------------------------------------------------------------------------###
+if __name__=='__main__':
+   from download_queue import get_options
+   args, opts = get_options(sys.argv[1:],{'convert': parse_stages})
+   if len(args) < 1 or 'convert' not in opts:
+      print(__doc__)
+      sys.exit()
+   for fname in args:
+      for output in convert_file(fname,opts['convert']):
+         print(output)
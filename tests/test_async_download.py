@@ -0,0 +1,69 @@
+from __future__ import print_function, division
+import os,shutil,tempfile,threading,unittest,BaseHTTPServer
+from http_retrieve import Session
+from retry_policy import RetryPolicy
+from async_download import AsyncEngine
+
+DATA = ''.join(chr(i % 251) for i in range(200000))
+
+class _ShortHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+   """
+   Answers the first GET with a chunked body that ends halfway through its
+   Content-Length, and later ones (resuming with Range) in full
+   """
+   protocol_version = 'HTTP/1.1'
+
+   def do_HEAD(self):
+      self.send_response(200)
+      self.send_header('Content-Length',str(len(DATA)))
+      self.send_header('ETag','"data"')
+      self.send_header('Accept-Ranges','bytes')
+      self.end_headers()
+
+   def do_GET(self):
+      self.server.gets += 1
+      first = int(self.headers.getheader('Range','bytes=0-')[6:].split('-')[0])
+      if self.server.gets == 1:
+         self.send_response(200)
+         self.send_header('Content-Length',str(len(DATA)))
+         self.send_header('Transfer-Encoding','chunked')
+         self.send_header('ETag','"data"')
+         self.end_headers()
+         half = DATA[:len(DATA)//2]
+         self.wfile.write('%x\r\n%s\r\n0\r\n\r\n' % (len(half),half))
+         return
+      self.send_response(206 if first else 200)
+      self.send_header('Content-Length',str(len(DATA)-first))
+      if first:
+         self.send_header('Content-Range','bytes %d-%d/%d' % (first,len(DATA)-1,len(DATA)))
+      self.send_header('ETag','"data"')
+      self.end_headers()
+      self.wfile.write(DATA[first:])
+
+   def log_message(self,*args):
+      pass
+
+class ShortBodyTest(unittest.TestCase):
+   def setUp(self):
+      self.tmp = tempfile.mkdtemp()
+      self.httpd = BaseHTTPServer.HTTPServer(('127.0.0.1',0),_ShortHandler)
+      self.httpd.gets = 0
+      threading.Thread(target=self.httpd.serve_forever).start()
+      self.session = Session('user','pass')
+
+   def tearDown(self):
+      self.session.close()
+      self.httpd.shutdown()
+      self.httpd.server_close()
+      shutil.rmtree(self.tmp)
+
+   def test_short_body_is_retried(self):
+      engine = AsyncEngine(session=self.session,policy=RetryPolicy(2,backoff=0.01))
+      filename = os.path.join(self.tmp,'data.bin')
+      engine.add('http://127.0.0.1:%d/data.bin' % self.httpd.server_address[1],filename)
+      self.assertEqual(engine.run(),[filename])
+      self.assertEqual(open(filename,'rb').read(),DATA)
+      self.assertEqual(self.httpd.gets,2)     # the second request resumed the part file
+
+if __name__ == '__main__':
+   unittest.main()
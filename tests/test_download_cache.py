@@ -0,0 +1,61 @@
+from __future__ import print_function, division
+import os,stat,shutil,tempfile,unittest
+from http_retrieve import RemoteFile
+from download_cache import DownloadCache
+
+def _remote(name,size):
+   remote = RemoteFile('http://example.org/line/'+name)
+   remote.size, remote.etag = size, '"%s"' % name
+   return remote
+
+class DownloadCacheTest(unittest.TestCase):
+   def setUp(self):
+      self.tmp = tempfile.mkdtemp()
+      self.cache = DownloadCache(os.path.join(self.tmp,'cache'))
+
+   def tearDown(self):
+      for root, dirs, files in os.walk(self.tmp):
+         for name in files: os.chmod(os.path.join(root,name),stat.S_IRUSR|stat.S_IWUSR)
+      shutil.rmtree(self.tmp)
+
+   def _download(self,name,size):
+      filename = os.path.join(self.tmp,name)
+      fid = open(filename,'wb')
+      fid.write(name[0]*size)
+      fid.close()
+      remote = _remote(name,size)
+      self.cache.store(remote,filename)
+      return remote, filename
+
+   def test_store_leaves_download_writable(self):
+      remote, filename = self._download('a.mlc',1000)
+      self.assertTrue(os.access(filename,os.W_OK))
+      cached = self.cache.path(self.cache.key(remote))
+      self.assertNotEqual(os.stat(cached).st_ino,os.stat(filename).st_ino)
+      self.assertFalse(os.stat(cached).st_mode & stat.S_IWUSR)
+
+   def test_fetch(self):
+      remote, filename = self._download('a.mlc',1000)
+      target = os.path.join(self.tmp,'copy.mlc')
+      self.assertTrue(self.cache.fetch(remote,target))
+      self.assertEqual(open(target,'rb').read(),open(filename,'rb').read())
+      self.assertFalse(self.cache.fetch(_remote('b.mlc',1000),target))
+      changed = _remote('a.mlc',1000)
+      changed.etag = '"new"'
+      self.assertFalse(self.cache.fetch(changed,target))
+
+   def test_evict_least_recently_used(self):
+      remotes = [self._download(name,1000)[0] for name in ('a.mlc','b.mlc','c.mlc')]
+      for used, remote in zip([30,10,20],remotes):  # b is the oldest, then c
+         stamp = self.cache.path(self.cache.key(remote)) + '.used'
+         os.utime(stamp,(1.e9+used,1.e9+used))
+      self.assertEqual(self.cache.evict(2000),1000)
+      present = [os.path.exists(self.cache.path(self.cache.key(r))) for r in remotes]
+      self.assertEqual(present,[True,False,True])
+      self.assertEqual(self.cache.evict(1000),1000)
+      present = [os.path.exists(self.cache.path(self.cache.key(r))) for r in remotes]
+      self.assertEqual(present,[True,False,False])
+      self.assertEqual(self.cache.evict(),0)  # no limit given to the cache
+
+if __name__ == '__main__':
+   unittest.main()
@@ -0,0 +1,37 @@
+from __future__ import print_function, division
+import os,json,shutil,tempfile,unittest
+from download_plan import record_throughput, recent_throughput, HISTORY, MIN_SAMPLE
+
+class ThroughputHistoryTest(unittest.TestCase):
+   def setUp(self):
+      self.tmp = tempfile.mkdtemp()
+      self.path = os.path.join(self.tmp,'throughput.json')
+
+   def tearDown(self):
+      shutil.rmtree(self.tmp)
+
+   def lines(self):
+      return open(self.path).read().splitlines()
+
+   def test_appends_runs(self):
+      record_throughput(MIN_SAMPLE,1.,self.path)
+      first = self.lines()
+      record_throughput(3*MIN_SAMPLE,1.,self.path)
+      self.assertEqual(self.lines()[:1],first)          # earlier runs left as written
+      self.assertEqual(len(self.lines()),2)
+      self.assertEqual(recent_throughput(self.path),2*MIN_SAMPLE)
+
+   def test_small_runs_ignored(self):
+      record_throughput(MIN_SAMPLE-1,1.,self.path)
+      record_throughput(MIN_SAMPLE,0.,self.path)
+      self.assertFalse(os.path.exists(self.path))
+      self.assertEqual(recent_throughput(self.path),None)
+
+   def test_cut_back(self):
+      for i in range(2*HISTORY):
+         record_throughput(MIN_SAMPLE+i,1.,self.path)
+      runs = [json.loads(line) for line in self.lines()]
+      self.assertEqual([run['bytes'] for run in runs],[MIN_SAMPLE+i for i in range(HISTORY,2*HISTORY)])
+
+if __name__ == '__main__':
+   unittest.main()
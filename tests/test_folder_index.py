@@ -0,0 +1,39 @@
+from __future__ import print_function, division
+import os,shutil,tempfile,unittest
+from http_retrieve import Session
+from standin_server import StandinServer
+from folder_index import folder_indexes
+from tests.test_raster_reader import LINE
+
+class FolderIndexesTest(unittest.TestCase):
+   def setUp(self):
+      self.tmp = tempfile.mkdtemp()
+      self.folders = ['UA_%s_CX_01' % LINE,'UA_%s_CX_02' % LINE]
+      for folder in self.folders:
+         os.makedirs(os.path.join(self.tmp,folder))
+         for name in ['a.mlc','b.mlc']:
+            fid = open(os.path.join(self.tmp,folder,name),'wb')
+            fid.write('x'*100)
+            fid.close()
+      self.server = StandinServer(self.tmp)
+      self.base = self.server.start() + '/'
+      self.session = Session('user','pass')
+      self.session.probe(self.base+self.folders[0]+'/a.mlc')   # log in
+
+   def tearDown(self):
+      self.session.close()
+      self.server.stop()
+      shutil.rmtree(self.tmp)
+
+   def test_each_folder_once(self):
+      first, second = [self.base+folder+'/' for folder in self.folders]
+      gets = self.server.stats['GET']
+      indexes = folder_indexes([(first,['a.mlc']),(second,['a.mlc']),(first,['b.mlc','c.mlc'])],
+                               self.session,jobs=4)
+      self.assertEqual(sorted(indexes),[first,second])
+      self.assertEqual(self.server.stats['GET']-gets,2)     # one listing per folder
+      self.assertEqual(indexes[first].select(['a.mlc','b.mlc','c.mlc']),(['a.mlc','b.mlc'],['c.mlc']))
+      self.assertEqual(indexes[second].size('a.mlc'),100)
+
+if __name__ == '__main__':
+   unittest.main()
@@ -0,0 +1,101 @@
+from __future__ import print_function, division
+import os,time,random,shutil,tempfile,unittest,urlparse
+import http_retrieve as hr
+from http_retrieve import Session, http_retrieve, partial_size
+from retry_policy import RetryPolicy
+from line_manifest import LineManifest
+from standin_server import StandinServer
+
+SIZE = 40*65536 + 1234
+
+class RetrieveTest(unittest.TestCase):
+   def setUp(self):
+      self.tmp = tempfile.mkdtemp()
+      os.makedirs(os.path.join(self.tmp,'data','UA_line'))
+      self.data = os.urandom(SIZE)
+      fid = open(os.path.join(self.tmp,'data','UA_line','line.mlc'),'wb')
+      fid.write(self.data)
+      fid.close()
+      self.server = StandinServer(os.path.join(self.tmp,'data'))
+      self.url = self.server.start() + '/UA_line/line.mlc'
+      self.session = Session('user','pass')
+      self.session.probe(self.url)                           # log in
+      self.filename = os.path.join(self.tmp,'line.mlc')
+      self.manifest = LineManifest(self.tmp)
+
+   def tearDown(self):
+      self.session.close()
+      self.server.stop()
+      shutil.rmtree(self.tmp)
+
+   def retrieve(self,**kwargs):
+      return http_retrieve(self.url,session=self.session,filename=self.filename,
+                           manifest=self.manifest,**kwargs)
+
+   def check(self):
+      self.assertEqual(open(self.filename,'rb').read(),self.data)
+      self.assertTrue(self.manifest.verify(self.filename))
+      self.assertFalse(os.path.exists(self.filename+'.part'))
+
+class ResumeTest(RetrieveTest):
+   def test_resume_after_fault(self):
+      random.seed(4)
+      self.server.fail = 0.2
+      for attempt in range(20):                              # until a transfer is cut
+         if self.retrieve(policy=RetryPolicy(0)) is None: break
+         os.remove(self.filename)
+      self.assertTrue(0 < partial_size(self.filename) < SIZE)
+      sent = self.server.stats['bytes']
+      self.server.fail = 0.
+      self.assertEqual(self.retrieve(),self.filename)
+      self.check()
+      self.assertTrue(self.server.stats['bytes']-sent < SIZE)  # only the rest was sent again
+
+   def test_retries_through_faults(self):
+      random.seed(5)
+      self.server.fail = 0.05
+      self.assertEqual(self.retrieve(policy=RetryPolicy(50,backoff=0.01)),self.filename)
+      self.check()
+      self.assertTrue(self.server.stats['cut'] > 0)
+
+   def test_local_error_not_retried(self):
+      gets = self.server.stats['GET']
+      self.filename = os.path.join(self.tmp,'missing','line.mlc')   # the part file cannot be opened
+      started = time.time()
+      self.assertRaises(IOError,self.retrieve,policy=RetryPolicy(3,backoff=5.))
+      self.assertTrue(time.time()-started < 5.)
+      self.assertEqual(self.server.stats['GET']-gets,1)
+      self.assertFalse(urlparse.urlsplit(self.url).netloc in self.session.breaker._hosts)
+
+class SegmentedTest(RetrieveTest):
+   def setUp(self):
+      RetrieveTest.setUp(self)
+      self.piece_size, hr.PIECE_SIZE = hr.PIECE_SIZE, 8*65536   # ranges start on these
+
+   def tearDown(self):
+      hr.PIECE_SIZE = self.piece_size
+      RetrieveTest.tearDown(self)
+
+   def test_segments(self):
+      gets = self.server.stats['GET']
+      self.assertEqual(self.retrieve(segments=4,segment_min=0),self.filename)
+      self.check()
+      self.assertEqual(self.server.stats['GET']-gets,3)        # 4 ranges rounded up to whole pieces
+
+   def test_segments_resume_after_fault(self):
+      random.seed(6)
+      self.server.fail = 0.1
+      self.assertEqual(self.retrieve(segments=4,segment_min=0,policy=RetryPolicy(50,backoff=0.01)),
+                       self.filename)
+      self.check()
+      self.assertTrue(self.server.stats['cut'] > 0)
+
+   def test_ranges_ignored(self):
+      self.server.ranges = False
+      gets = self.server.stats['GET']
+      self.assertEqual(self.retrieve(segments=4,segment_min=0),self.filename)
+      self.check()
+      self.assertEqual(self.server.stats['GET']-gets,1)
+
+if __name__ == '__main__':
+   unittest.main()
@@ -0,0 +1,67 @@
+from __future__ import print_function, division
+import os,shutil,tempfile,unittest
+from line_catalog import LineCatalog
+from product_name import parse_name
+
+SERVER = 'http://uavsar.asfdaac.alaska.edu/'
+INSAR = 'SanAnd_08503_09083-008_10027-003_0174d_s01_L090%s_01%s'
+POLSAR = 'SanAnd_08503_10071_003_100928_L090%s_CX_01%s'
+
+def _names(pattern,products):
+   return [parse_name(pattern % product) for product in products]
+
+class LineCatalogTest(unittest.TestCase):
+   def setUp(self):
+      self.tmp = tempfile.mkdtemp()
+      self.path = os.path.join(self.tmp,'catalog.db')
+      self.catalog = LineCatalog(self.path)
+      names = _names(INSAR,[('HH','.int'),('HH','.unw.grd'),('HV','.unw'),('','.ann')])
+      self.insar = SERVER + names[0].folder + '/'
+      self.catalog.add_line(self.insar,names,{names[0].name: 1000},('2009-06-10','2010-06-01'))
+      names = _names(POLSAR,[('HHHH','.mlc'),('HHHH','.grd'),('HVHV','.mlc'),('','.ann')])
+      self.polsar = SERVER + names[0].folder + '/'
+      self.catalog.add_line(self.polsar,names,dates=('2010-09-28','2010-09-28'))
+
+   def tearDown(self):
+      self.catalog.close()
+      shutil.rmtree(self.tmp)
+
+   def names(self,**selection):
+      return [row['name'] for row in self.catalog.query(**selection)]
+
+   def test_query(self):
+      self.assertEqual(len(self.names()),8)
+      self.assertEqual(self.names(site='sanand',kind='insar',pol='hh'),
+                       [INSAR % ('HH','.int'),INSAR % ('HH','.unw.grd')])
+      self.assertEqual(self.names(product='mlc',ground=True),[POLSAR % ('HHHH','.grd')])
+      self.assertEqual(self.names(product='unw',ground=False),[INSAR % ('HV','.unw')])
+      self.assertEqual(self.names(site='Other'),[])
+
+   def test_rows(self):
+      row = self.catalog.query(product='int')[0]
+      self.assertEqual(row['url'],self.insar+INSAR % ('HH','.int'))
+      self.assertEqual((row['folder'],row['pol'],row['ground'],row['size']),
+                       ('UA_'+INSAR % ('',''),'HH',0,1000))
+      self.assertEqual((row['date1'],row['date2']),('2009-06-10','2010-06-01'))
+      self.assertEqual(self.catalog.query(product='mlc')[0]['size'],None)
+
+   def test_dates(self):
+      self.assertEqual(len(self.names(since='2010')),4)
+      self.assertEqual(len(self.names(since='2009-06')),8)
+      self.assertEqual(len(self.names(until='2010-06')),4)
+      self.assertEqual(len(self.names(until='2010-06-01')),4)
+      self.assertEqual(self.names(since='2011'),[])
+
+   def test_ann(self):
+      self.assertEqual(self.names(pol='HVHV',ann=True),[POLSAR % ('HVHV','.mlc'),POLSAR % ('','.ann')])
+
+   def test_persists_and_replaces(self):
+      self.catalog.close()
+      self.catalog = LineCatalog(self.path)
+      self.assertEqual(len(self.names()),8)
+      self.catalog.add_line(self.polsar,_names(POLSAR,[('VVVV','.mlc')]),dates=('2010-09-28',)*2)
+      self.assertEqual(self.names(kind='polsar'),[POLSAR % ('VVVV','.mlc')])
+      self.assertEqual(len(self.names(kind='insar')),4)
+
+if __name__ == '__main__':
+   unittest.main()
@@ -0,0 +1,59 @@
+from __future__ import print_function, division
+import os,shutil,tempfile,unittest
+from line_manifest import PieceHasher, complete_pieces, file_checksum
+
+PIECE = 1000
+
+class PiecesTest(unittest.TestCase):
+   def setUp(self):
+      self.tmp = tempfile.mkdtemp()
+      self.filename = os.path.join(self.tmp,'data.bin')
+      self.data = ''.join(chr(i % 253) for i in range(4500))
+      fid = open(self.filename,'wb')
+      fid.write(self.data)
+      fid.close()
+      self.whole = file_checksum(self.filename,PIECE)
+
+   def tearDown(self):
+      shutil.rmtree(self.tmp)
+
+   def feed(self,hasher,first,stop,block=333):
+      for offset in range(first,stop,block):
+         hasher.update(self.data[offset:min(offset+block,stop)])
+      hasher.finish(len(self.data))
+
+   def test_streamed_matches_file(self):
+      pieces = {}
+      self.feed(PieceHasher(pieces,piece=PIECE),0,len(self.data))
+      self.assertEqual(sorted(pieces),['0','1','2','3','4'])
+      self.assertEqual(complete_pieces(self.filename,pieces,len(self.data),PIECE),self.whole)
+
+   def test_split_pieces(self):
+      pieces = {}       # two segments split pieces 1 and 3 between them
+      self.feed(PieceHasher(pieces,0,piece=PIECE),0,1500)
+      self.feed(PieceHasher(pieces,1500,piece=PIECE),1500,3200)
+      self.feed(PieceHasher(pieces,3200,piece=PIECE),3200,len(self.data))
+      self.assertEqual(sorted(pieces),['0','2','4'])
+      self.assertEqual(complete_pieces(self.filename,pieces,len(self.data),PIECE),self.whole)
+
+   def test_resumed_piece_read_back(self):
+      pieces = {}
+      self.feed(PieceHasher(pieces,0,piece=PIECE),0,1500)
+      self.feed(PieceHasher(pieces,1500,self.filename,piece=PIECE),1500,len(self.data))
+      self.assertEqual(sorted(pieces),['0','1','2','3','4'])
+      self.assertEqual(complete_pieces(self.filename,pieces,len(self.data),PIECE),self.whole)
+
+   def test_segment_does_not_read_before_start(self):
+      pieces = {}
+      self.feed(PieceHasher(pieces,1500,self.filename,start=1500,piece=PIECE),1500,len(self.data))
+      self.assertEqual(sorted(pieces),['2','3','4'])
+
+   def test_corrupt_piece_changes_digest(self):
+      pieces = {}
+      self.feed(PieceHasher(pieces,piece=PIECE),0,len(self.data))
+      pieces['2'] = '0'*64
+      self.assertNotEqual(complete_pieces(self.filename,pieces,len(self.data),PIECE)['digest'],
+                          self.whole['digest'])
+
+if __name__ == '__main__':
+   unittest.main()
@@ -0,0 +1,52 @@
+from __future__ import print_function, division
+import unittest
+from product_name import parse_name
+
+INSAR = 'SanAnd_08503_09083-008_10027-003_0174d_s01_L090HH_01'
+POLSAR = 'SanAnd_08503_10071_003_100928_L090HHHH_CX_01'
+
+class ParseNameTest(unittest.TestCase):
+   def test_insar(self):
+      name = parse_name('http://uavsar.asfdaac.alaska.edu/UA_SanAnd_08503_09083-008_10027-003_'
+                        '0174d_s01_L090_01/'+INSAR+'.int')
+      self.assertEqual(name.name,INSAR+'.int')
+      self.assertEqual((name.kind,name.site,name.line,name.heading),('insar','SanAnd','08503',85))
+      self.assertEqual(name.flights,[('09083','008'),('10027','003')])
+      self.assertEqual((name.baseline,name.segment,name.date,name.tag),(174,'01',None,None))
+      self.assertEqual((name.band,name.steering,name.pol,name.version),('L','090','HH','01'))
+      self.assertEqual((name.ext,name.product,name.ground),('.int','int',False))
+      self.assertEqual(name.folder,'UA_SanAnd_08503_09083-008_10027-003_0174d_s01_L090_01')
+
+   def test_insar_ground(self):
+      name = parse_name(INSAR+'.unw.grd')
+      self.assertEqual((name.ext,name.product,name.ground),('.unw.grd','unw',True))
+      name = parse_name('SanAnd_08503_09083-008_10027-003_0174d_s01_L090_01.hgt.grd')
+      self.assertEqual((name.pol,name.product,name.ground),(None,'hgt',True))
+
+   def test_polsar(self):
+      name = parse_name(POLSAR+'.mlc')
+      self.assertEqual((name.kind,name.site,name.line,name.heading),('polsar','SanAnd','08503',85))
+      self.assertEqual(name.flights,[('10071','003')])
+      self.assertEqual((name.date,name.tag,name.baseline,name.segment),('2010-09-28','CX',None,None))
+      self.assertEqual((name.band,name.steering,name.pol,name.version),('L','090','HHHH','01'))
+      self.assertEqual((name.product,name.ground),('mlc',False))
+      self.assertEqual(name.folder,'UA_SanAnd_08503_10071_003_100928_L090_CX_01')
+
+   def test_polsar_ground(self):
+      name = parse_name(POLSAR+'.grd')
+      self.assertEqual((name.product,name.ground),('mlc',True))
+      name = parse_name('SanAnd_08503_10071_003_100928_L090_CX_01.hgt')
+      self.assertEqual((name.pol,name.product,name.ground),(None,'hgt',True))
+      name = parse_name('SanAnd_08503_10071_003_100928_L090_CX_01.ann')
+      self.assertEqual((name.pol,name.product,name.ground),(None,'ann',False))
+      self.assertEqual(name.folder,'UA_SanAnd_08503_10071_003_100928_L090_CX_01')
+
+   def test_malformed(self):
+      for name in ['SanAnd_08503_L090HH_01.int',              # no flights
+                   'SanAnd_8503_10071_003_100928_L090HHHH_CX_01.mlc',
+                   'SanAnd_08503_09083-008_10027-003_0174d_s01_L090HHHV_01.int',
+                   'README.md','']:
+         self.assertEqual(parse_name(name),None)
+
+if __name__ == '__main__':
+   unittest.main()
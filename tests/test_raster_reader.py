@@ -0,0 +1,82 @@
+from __future__ import print_function, division
+import os,shutil,tempfile,unittest
+import numpy as np
+from raster_reader import open_raster, index_window, clip_window
+
+LINE = 'SanAnd_08503_10071_003_100928_L090'
+ANN = """mlc_pwr.set_rows                  (pixels)        = 7
+mlc_pwr.set_cols                  (pixels)        = 5
+mlc_pwr.val_size                  (bytes)         = 4
+mlc_pwr.val_frmt                  (&)             = REAL*4
+mlc_pwr.val_endi                  (&)             = LITTLE ENDIAN
+"""
+
+class IndexWindowTest(unittest.TestCase):
+   def check(self,key,shape=(7,5)):
+      array = np.arange(shape[0]*shape[1]).reshape(shape)
+      bounds, picks = index_window(key,shape)
+      for (first,stop), size in zip(bounds,shape):
+         self.assertTrue(0 <= first <= stop <= size)
+      window = array[bounds[0][0]:bounds[0][1],bounds[1][0]:bounds[1][1]]
+      self.assertTrue(np.array_equal(window[picks[0]][...,picks[1]],array[key]))
+
+   def test_slices(self):
+      for key in [slice(None),slice(2,5),(slice(1,3),slice(None,None,2)),(3,),(3,slice(1,4)),
+                  (slice(None),2),(slice(5,1,-1),slice(None))]:
+         self.check(key)
+
+   def test_negative(self):
+      for key in [-1,slice(-5,None),slice(None,-2),(slice(-3,-1),-2),(-7,-5),slice(-100,3)]:
+         self.check(key)
+
+   def test_out_of_range(self):
+      for key in [slice(3,100),slice(100,200),(slice(None),slice(4,50)),slice(-100,-50)]:
+         self.check(key)
+      for key in [7,-8,(0,5),(0,-6)]:
+         self.assertRaises(IndexError,index_window,key,(7,5))
+      self.assertRaises(IndexError,index_window,(1,2,3),(7,5))
+
+class ClipWindowTest(unittest.TestCase):
+   def test_clip(self):
+      self.assertEqual(clip_window(None,7),(0,7))
+      self.assertEqual(clip_window((2,5),7),(2,5))
+      self.assertEqual(clip_window((-3,4),7),(0,4))
+      self.assertEqual(clip_window((5,100),7),(5,7))
+      self.assertEqual(clip_window((9,12),7),(7,7))     # past the end
+      self.assertEqual(clip_window((-9,-2),7),(0,0))    # before the start
+      self.assertEqual(clip_window((5,2),7),(5,5))      # inverted
+
+class RasterTest(unittest.TestCase):
+   def setUp(self):
+      self.tmp = tempfile.mkdtemp()
+      fid = open(os.path.join(self.tmp,LINE+'_CX_01.ann'),'w')
+      fid.write(ANN)
+      fid.close()
+      self.array = np.arange(35,dtype='<f4').reshape(7,5)
+      self.filename = os.path.join(self.tmp,LINE+'HHHH_CX_01.mlc')
+      self.array.tofile(self.filename)
+      self.raster = open_raster(self.filename)
+
+   def tearDown(self):
+      self.raster.close()
+      shutil.rmtree(self.tmp)
+
+   def test_layout(self):
+      self.assertEqual(self.raster.shape,(7,5))
+      self.assertEqual(self.raster.dtype,np.dtype('<f4'))
+      self.assertEqual(len(self.raster),7)
+
+   def test_negative_and_open_ended_slices(self):
+      for key in [slice(-5,None),slice(None,-2),slice(2,None),slice(None,3),slice(-3,-1),
+                  (slice(-2,None),slice(None,-1)),(-1,slice(None)),slice(-100,100)]:
+         self.assertTrue(np.array_equal(self.raster[key],self.array[key]))
+      self.assertTrue(np.array_equal(self.raster[-5:],self.array[-5:]))
+      self.assertTrue(np.array_equal(self.raster[:-2],self.array[:-2]))
+
+   def test_read(self):
+      self.assertTrue(np.array_equal(self.raster.read((2,4),(1,3)),self.array[2:4,1:3]))
+      self.assertTrue(np.array_equal(self.raster.read(),self.array))
+      self.assertEqual(self.raster.read((5,20),(-2,3)).shape,(2,3))
+
+if __name__ == '__main__':
+   unittest.main()
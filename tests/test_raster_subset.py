@@ -0,0 +1,102 @@
+from __future__ import print_function, division
+import os,shutil,tempfile,unittest
+import numpy as np
+from http_retrieve import Session
+from standin_server import StandinServer
+from raster_subset import RasterSubset, byte_ranges, bbox_window, bbox_option, MERGE_GAP
+from tests.test_raster_reader import LINE
+
+ROWS, COLS = 6, 80000  # rows further apart than MERGE_GAP, so a column window takes a range per row
+ANN = """mlc_pwr.set_rows                  (pixels)        = %d
+mlc_pwr.set_cols                  (pixels)        = %d
+mlc_pwr.val_size                  (bytes)         = 4
+mlc_pwr.val_frmt                  (&)             = REAL*4
+mlc_pwr.val_endi                  (&)             = LITTLE ENDIAN
+""" % (ROWS,COLS)
+
+class ByteRangesTest(unittest.TestCase):
+   def test_ranges(self):
+      self.assertEqual(byte_ranges(10,4,(0,3),(0,10)),[[0,119]])
+      self.assertEqual(byte_ranges(10,4,(1,3),(2,5)),[[48,99]])
+      stride = COLS*4
+      self.assertTrue(stride > MERGE_GAP)
+      self.assertEqual(byte_ranges(COLS,4,(1,3),(2,5)),
+                       [[stride+8,stride+19],[2*stride+8,2*stride+19]])
+
+class BboxWindowTest(unittest.TestCase):
+   geo = (36.0,-121.0,-0.01,0.01)   # latitude decreases down the rows
+
+   def test_inside(self):
+      # centers 35.99 .. 35.95 and -120.98 .. -120.95 are inside
+      self.assertEqual(bbox_window(self.geo,(35.945,35.995,-120.985,-120.945)),((1,6),(2,6)))
+
+   def test_edges_on_centers(self):
+      self.assertEqual(bbox_window(self.geo,(35.95,35.99,-120.98,-120.95)),((1,6),(2,6)))
+
+   def test_box_between_centers(self):
+      lines, samples = bbox_window(self.geo,(35.951,35.959,-120.98,-120.95))
+      self.assertEqual(lines[0],lines[1])  # no center inside: an empty window
+
+   def test_box_past_the_grid(self):
+      lines, samples = bbox_window(self.geo,(35.0,37.0,-122.0,-120.0))
+      self.assertTrue(lines[0] < 0 and samples[0] < 0)  # cut to the product by RasterSubset
+
+   def test_option(self):
+      self.assertEqual(bbox_option('35.9,36,-121,-120.9'),(35.9,36.0,-121.0,-120.9))
+      for value in ['36,35.9,-121,-120.9','35.9,36,-120.9,-121','35,91,0,1','1,2,3']:
+         self.assertRaises(ValueError,bbox_option,value)
+
+class RasterSubsetTest(unittest.TestCase):
+   def setUp(self):
+      self.tmp = tempfile.mkdtemp()
+      folder = os.path.join(self.tmp,'data','UA_'+LINE+'_CX_01')
+      os.makedirs(folder)
+      os.makedirs(os.path.join(self.tmp,'out'))
+      for path in (folder,os.path.join(self.tmp,'out')):
+         fid = open(os.path.join(path,LINE+'_CX_01.ann'),'w')
+         fid.write(ANN)
+         fid.close()
+      self.array = np.arange(ROWS*COLS,dtype='<f4').reshape(ROWS,COLS)
+      self.array.tofile(os.path.join(folder,LINE+'HHHH_CX_01.mlc'))
+      self.filename = os.path.join(self.tmp,'out',LINE+'HHHH_CX_01.mlc')
+
+   def tearDown(self):
+      shutil.rmtree(self.tmp)
+
+   def retrieve(self,ranges,lines,samples):
+      server = StandinServer(os.path.join(self.tmp,'data'),ranges=ranges)
+      url = server.start() + '/UA_%s_CX_01/%sHHHH_CX_01.mlc' % (LINE,LINE)
+      session = Session('user','pass')
+      try:
+         subset = RasterSubset(self.filename,lines,samples)
+         session.probe(url)  # log in first, so only the data requests are counted
+         gets = server.stats['GET']
+         output = subset.retrieve(session,url)
+         return subset, output, server.stats['GET'] - gets
+      finally:
+         session.close()
+         server.stop()
+
+   def check(self,subset,output):
+      data = np.fromfile(output,dtype='<f4')
+      window = self.array[subset.lines[0]:subset.lines[1],subset.samples[0]:subset.samples[1]]
+      self.assertTrue(np.array_equal(data.reshape(window.shape),window))
+
+   def test_ranges(self):
+      subset, output, gets = self.retrieve(True,(1,5),(100,110))
+      self.assertEqual(len(subset.ranges),4)
+      self.assertEqual(gets,4)
+      self.check(subset,output)
+
+   def test_range_ignored(self):
+      subset, output, gets = self.retrieve(False,(1,5),(100,110))
+      self.check(subset,output)
+      self.assertEqual(gets,1)  # one stream of the whole file, not one per range
+
+   def test_window_outside(self):
+      self.assertRaises(ValueError,RasterSubset,self.filename,(ROWS+2,ROWS+5),None)
+      subset = RasterSubset(self.filename,(4,100),(COLS-3,COLS+10))
+      self.assertEqual((subset.lines,subset.samples),((4,ROWS),(COLS-3,COLS)))
+
+if __name__ == '__main__':
+   unittest.main()
@@ -0,0 +1,43 @@
+from __future__ import print_function, division
+import os,shutil,tempfile,unittest
+import numpy as np
+from http_retrieve import Session
+from standin_server import StandinServer
+from remote_raster import open_remote, BlockCache
+from tests.test_raster_reader import LINE, ANN
+
+class RemoteRasterTest(unittest.TestCase):
+   def setUp(self):
+      self.tmp = tempfile.mkdtemp()
+      folder = os.path.join(self.tmp,'data','UA_'+LINE+'_CX_01')
+      os.makedirs(folder)
+      fid = open(os.path.join(folder,LINE+'_CX_01.ann'),'w')
+      fid.write(ANN)
+      fid.close()
+      self.array = np.arange(35,dtype='<f4').reshape(7,5)
+      self.array.tofile(os.path.join(folder,LINE+'HHHH_CX_01.mlc'))
+      self.server = StandinServer(os.path.join(self.tmp,'data'))
+      url = self.server.start() + '/UA_%s_CX_01/%sHHHH_CX_01.mlc' % (LINE,LINE)
+      self.session = Session('user','pass')
+      self.raster = open_remote(url,self.session,block_size=40,readahead=0,
+                                cache=BlockCache(os.path.join(self.tmp,'blocks')))
+
+   def tearDown(self):
+      self.raster.close()
+      self.session.close()
+      self.server.stop()
+      shutil.rmtree(self.tmp)
+
+   def test_reads_match(self):
+      self.assertEqual((self.raster.shape,len(self.raster)),((7,5),7))
+      self.assertTrue(np.array_equal(self.raster.read(),self.array))
+      self.assertTrue(np.array_equal(self.raster.read((2,6),(1,4)),self.array[2:6,1:4]))
+      self.assertEqual(self.raster.read((9,12)).shape,(0,5))
+
+   def test_negative_and_open_ended_slices(self):
+      for key in [slice(-5,None),slice(None,-2),slice(3,None),(slice(-3,-1),-2),(-1,slice(None))]:
+         self.assertTrue(np.array_equal(self.raster[key],self.array[key]))
+      self.assertTrue(np.array_equal(self.raster[-5:],self.array[-5:]))
+
+if __name__ == '__main__':
+   unittest.main()
@@ -0,0 +1,62 @@
+from __future__ import print_function, division
+import time,errno,socket,unittest,httplib
+import mechanize
+from cStringIO import StringIO
+from urllib2 import HTTPError, URLError
+from retry_policy import RetryPolicy, CircuitBreaker, retry_after
+
+def _http_error(code,retry=None):
+   headers = httplib.HTTPMessage(StringIO('Retry-After: %s\r\n\r\n' % retry if retry else '\r\n'))
+   return HTTPError('http://example.org/file',code,'error',headers,None)
+
+class RetryPolicyTest(unittest.TestCase):
+   def test_retryable(self):
+      policy = RetryPolicy()
+      for error in [_http_error(503),_http_error(429),URLError('down'),socket.error('reset'),
+                    httplib.IncompleteRead(''),mechanize.ContentTooShortError('short',None)]:
+         self.assertTrue(policy.retryable(error))
+      for error in [_http_error(404),_http_error(403),ValueError('bug'),
+                    IOError(errno.ENOSPC,'No space left on device'),
+                    OSError(errno.EACCES,'Permission denied')]:
+         self.assertFalse(policy.retryable(error))
+
+   def test_backoff(self):
+      policy = RetryPolicy(backoff=2.,factor=3.,jitter=0.)
+      self.assertEqual([policy.delay(n) for n in (1,2,3)],[2.,6.,18.])
+      policy = RetryPolicy(backoff=2.,factor=3.,jitter=0.5,max_delay=10.)
+      for attempt in range(1,6):
+         delay = policy.delay(attempt)
+         self.assertTrue(min(10.,0.5*2.*3.**(attempt-1)) <= delay <= 10.)
+
+   def test_retry_after(self):
+      self.assertEqual(retry_after(_http_error(503,7)),7.)
+      self.assertEqual(retry_after(_http_error(503)),None)
+      self.assertEqual(retry_after(socket.error('reset')),None)
+      policy = RetryPolicy(max_delay=60.)
+      self.assertEqual(policy.delay(1,_http_error(429,30)),30.)
+      self.assertEqual(policy.delay(1,_http_error(429,3600)),60.)
+
+class CircuitBreakerTest(unittest.TestCase):
+   def test_opens_and_recovers(self):
+      breaker = CircuitBreaker(threshold=3,cooldown=0.2)
+      self.assertFalse(breaker.failure('a'))
+      self.assertFalse(breaker.failure('a'))
+      self.assertTrue(breaker.failure('a'))
+      self.assertTrue(breaker.allow('a') > 0)
+      self.assertEqual(breaker.allow('b'),0.)            # other hosts are not affected
+      time.sleep(0.25)
+      self.assertEqual(breaker.allow('a'),0.)            # the trial
+      self.assertTrue(breaker.allow('a') > 0)            # only one at a time
+      breaker.success('a')
+      self.assertEqual(breaker.allow('a'),0.)
+
+   def test_failed_trial_doubles_cooldown(self):
+      breaker = CircuitBreaker(threshold=1,cooldown=0.2)
+      self.assertTrue(breaker.failure('a'))
+      time.sleep(0.25)
+      self.assertEqual(breaker.allow('a'),0.)
+      self.assertTrue(breaker.failure('a'))
+      self.assertTrue(0.3 < breaker.allow('a') <= 0.4)
+
+if __name__ == '__main__':
+   unittest.main()
@@ -0,0 +1,61 @@
+from __future__ import print_function, division
+import os,shutil,tempfile,threading,unittest
+import numpy as np
+from stream_stage import StreamStage, ByteSwap, convert_file, stream_pipeline
+from tests.test_raster_reader import LINE, ANN
+
+class _Failing(StreamStage):
+   def convert(self,samples):
+      self.write('.fail',samples)
+
+   def finish(self):
+      raise ValueError('broken stage')
+
+def _in_thread(function,*args):
+   """
+   function(*args) from a thread; returns its result, or 'hung' after 10 s
+   """
+   result = ['hung']
+   def run():
+      result[0] = function(*args)
+   t = threading.Thread(target=run)
+   t.daemon = True
+   t.start()
+   t.join(10.)
+   return result[0]
+
+class PipelineTest(unittest.TestCase):
+   def setUp(self):
+      self.tmp = tempfile.mkdtemp()
+      fid = open(os.path.join(self.tmp,LINE+'_CX_01.ann'),'w')
+      fid.write(ANN)
+      fid.close()
+      self.array = np.arange(35,dtype='<f4').reshape(7,5)
+      self.filename = os.path.join(self.tmp,LINE+'HHHH_CX_01.mlc')
+      self.array.tofile(self.filename)
+
+   def tearDown(self):
+      shutil.rmtree(self.tmp)
+
+   def test_failing_finish_stops_pipeline(self):
+      outputs = _in_thread(convert_file,self.filename,[_Failing,ByteSwap])
+      self.assertEqual(outputs,[self.filename+'.swap'])
+      self.assertTrue(np.array_equal(np.fromfile(outputs[0],dtype='>f4'),self.array.ravel()))
+      self.assertFalse([name for name in os.listdir(self.tmp) if name.endswith('.part')])
+
+   def test_failing_feed_drops_stages(self):
+      pipeline = stream_pipeline(self.filename,[_Failing,ByteSwap],source=self.filename)
+      pipeline.feed(0,'\0'*4)
+      pipeline._queue.put(('read',(0,10**6)))        # past the end of the file
+      self.assertEqual(_in_thread(pipeline.finish,140),[])
+      self.assertFalse([name for name in os.listdir(self.tmp) if name.endswith('.part')])
+
+   def test_abort(self):
+      pipeline = stream_pipeline(self.filename,[_Failing,ByteSwap],source=self.filename)
+      pipeline.feed(0,self.array.tostring())
+      self.assertEqual(_in_thread(pipeline.abort),None)
+      self.assertEqual(sorted(os.listdir(self.tmp)),sorted([LINE+'_CX_01.ann',
+                                                            os.path.basename(self.filename)]))
+
+if __name__ == '__main__':
+   unittest.main()
@@ -0,0 +1,39 @@
+from __future__ import print_function, division
+import os,shutil,tempfile,unittest
+from throttle import Throttle
+
+MB = 1 << 20
+
+class RateFileTest(unittest.TestCase):
+   def setUp(self):
+      self.tmp = tempfile.mkdtemp()
+      self.rate_file = os.path.join(self.tmp,'rates')
+
+   def tearDown(self):
+      shutil.rmtree(self.tmp)
+
+   def limits(self,text,rate=None,host_rate=None):
+      fid = open(self.rate_file,'w')
+      fid.write(text)
+      fid.close()
+      throttle = Throttle(rate,host_rate,self.rate_file)
+      return throttle._total.rate, throttle._host_rate
+
+   def test_both_lines(self):
+      self.assertEqual(self.limits('rate 20\nhost-rate 10\n',5*MB,5*MB),(20*MB,10*MB))
+
+   def test_only_rate(self):
+      self.assertEqual(self.limits('rate 20\n',host_rate=5*MB),(20*MB,5*MB))
+
+   def test_only_host_rate(self):
+      self.assertEqual(self.limits('# limits\nhost-rate 10\n',rate=8*MB),(8*MB,10*MB))
+
+   def test_zero_removes_limit(self):
+      self.assertEqual(self.limits('rate 0\n',2*MB,3*MB),(None,3*MB))
+
+   def test_missing_file(self):
+      throttle = Throttle(2*MB,None,os.path.join(self.tmp,'absent'))
+      self.assertEqual((throttle._total.rate,throttle._host_rate),(2*MB,None))
+
+if __name__ == '__main__':
+   unittest.main()
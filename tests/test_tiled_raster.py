@@ -0,0 +1,138 @@
+from __future__ import print_function, division
+import os,stat,shutil,tempfile,unittest
+import numpy as np
+from raster_reader import open_raster
+from tiled_raster import tile_raster
+from stream_stage import parse_stages, convert_file, replacement, stream_pipeline
+from http_retrieve import Session, RemoteFile, http_retrieve
+from standin_server import StandinServer
+from line_manifest import LineManifest
+from download_cache import DownloadCache
+from tests.test_stream_stage import _in_thread
+from tests.test_raster_reader import LINE, ANN
+
+class TiledTest(unittest.TestCase):
+   def setUp(self):
+      self.tmp = tempfile.mkdtemp()
+      fid = open(os.path.join(self.tmp,LINE+'_CX_01.ann'),'w')
+      fid.write(ANN)
+      fid.close()
+      self.array = np.arange(35,dtype='<f4').reshape(7,5)
+      self.filename = os.path.join(self.tmp,LINE+'HHHH_CX_01.mlc')
+      self.array.tofile(self.filename)
+
+   def tearDown(self):
+      for root, dirs, files in os.walk(self.tmp):
+         for name in files: os.chmod(os.path.join(root,name),stat.S_IRUSR|stat.S_IWUSR)
+      shutil.rmtree(self.tmp)
+
+class TiledRasterTest(TiledTest):
+   def setUp(self):
+      TiledTest.setUp(self)
+      self.raster = open_raster(tile_raster(self.filename,tile=2))
+
+   def tearDown(self):
+      self.raster.close()
+      TiledTest.tearDown(self)
+
+   def test_round_trip(self):
+      self.assertEqual(self.raster.shape,(7,5))
+      self.assertEqual(len(self.raster),7)
+      self.assertTrue(np.array_equal(self.raster.read(),self.array))
+      self.assertTrue(np.array_equal(self.raster.read((1,6),(3,9)),self.array[1:6,3:]))
+
+   def test_negative_and_open_ended_slices(self):
+      for key in [slice(-5,None),slice(None,-2),slice(3,None),(slice(-3,-1),slice(1,None)),
+                  (-1,slice(None)),(slice(None),-2),slice(-100,100)]:
+         self.assertTrue(np.array_equal(self.raster[key],self.array[key]))
+      self.assertTrue(np.array_equal(self.raster[-5:],self.array[-5:]))
+
+class TileOnlyTest(TiledTest):
+   def setUp(self):
+      TiledTest.setUp(self)
+      self.stages = parse_stages('tile-only')
+      self.remote = RemoteFile('http://example.org/line/'+os.path.basename(self.filename))
+      self.remote.available, self.remote.etag = True, '"mlc"'
+      self.remote.size = os.path.getsize(self.filename)
+
+   def test_replaces_product(self):
+      tiles = replacement(self.filename,self.stages)
+      self.assertEqual(tiles,self.filename+'.tiles')
+      self.assertEqual(convert_file(self.filename,self.stages),[tiles])
+      self.assertFalse(os.path.exists(self.filename))
+      raster = open_raster(tiles)
+      self.assertTrue(np.array_equal(raster.read(),self.array))
+      raster.close()
+      self.assertEqual(replacement(self.filename,parse_stages('tile')),None)
+
+   def test_manifest_and_cache_record_tiles(self):
+      tiles = convert_file(self.filename,self.stages)[0]
+      manifest = LineManifest(self.tmp)
+      manifest.record(tiles,self.remote)
+      self.assertTrue(manifest.is_current(self.filename,self.remote))
+      self.remote.size += 1
+      self.assertFalse(manifest.is_current(self.filename,self.remote))
+      self.remote.size -= 1
+
+      cache = DownloadCache(os.path.join(self.tmp,'cache'))
+      cache.store(self.remote,tiles)
+      self.assertFalse(cache.fetch(self.remote,self.filename))   # only the tiles are cached
+      os.remove(tiles)
+      self.assertTrue(cache.fetch(self.remote,tiles))
+      raster = open_raster(tiles)
+      self.assertTrue(np.array_equal(raster.read(),self.array))
+      raster.close()
+
+class TruncatedTest(TiledTest):
+   """
+   A product shorter than the rows x cols of its annotation
+   """
+   def setUp(self):
+      TiledTest.setUp(self)
+      self.array[:5].tofile(self.filename)
+
+   def leftovers(self):
+      return [name for name in os.listdir(self.tmp) if name.endswith('.part') or
+              name.endswith('.json') or '.tiles' in name]
+
+   def test_stage_dropped(self):
+      size = os.path.getsize(self.filename)
+      self.assertEqual(stream_pipeline(self.filename,parse_stages('tile'),size=size),None)
+      pipeline = stream_pipeline(self.filename,parse_stages('tile'),size=7*5*4)   # whole product
+      self.assertNotEqual(pipeline,None)
+      pipeline.abort()
+
+   def test_not_tiled(self):
+      for stages in ['tile','tile-only']:
+         self.assertEqual(convert_file(self.filename,parse_stages(stages)),[])
+         self.assertTrue(os.path.exists(self.filename))
+         self.assertEqual(self.leftovers(),[])
+
+   def test_size_unknown(self):
+      pipeline = stream_pipeline(self.filename,parse_stages('tile'),source=self.filename)
+      self.assertEqual(_in_thread(pipeline.finish,os.path.getsize(self.filename)),[])
+      self.assertEqual(self.leftovers(),[])
+
+   def test_download(self):
+      folder = os.path.join(self.tmp,'data','UA_'+LINE+'_CX_01')
+      os.makedirs(folder)
+      for name in os.listdir(self.tmp):
+         if name != 'data': os.rename(os.path.join(self.tmp,name),os.path.join(folder,name))
+      server = StandinServer(os.path.join(self.tmp,'data'))
+      base = server.start() + '/UA_%s_CX_01/' % LINE
+      session = Session('user','pass')
+      try:
+         http_retrieve(base+LINE+'_CX_01.ann',session=session,
+                       filename=os.path.join(self.tmp,LINE+'_CX_01.ann'))
+         result = _in_thread(lambda: http_retrieve(base+os.path.basename(self.filename),
+                                                   session=session,filename=self.filename,
+                                                   stages=parse_stages('tile-only')))
+      finally:
+         session.close()
+         server.stop()
+      self.assertEqual(result,self.filename)
+      self.assertEqual(open(self.filename,'rb').read(),self.array[:5].tostring())
+      self.assertEqual(self.leftovers(),[])
+
+if __name__ == '__main__':
+   unittest.main()
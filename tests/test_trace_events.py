@@ -0,0 +1,78 @@
+from __future__ import print_function, division
+import os,json,time,atexit,shutil,tempfile,threading,unittest
+import trace_events
+from trace_events import enable, enabled, span, traced, add_span, new_track, TRACK_BASE
+
+@traced('work')
+def _work(value):
+   with span('inner',value=value) as inner:
+      inner.set(done=True)
+   return 2*value
+
+class TraceOffTest(unittest.TestCase):
+   def test_no_op(self):
+      self.assertFalse(enabled())
+      self.assertTrue(span('a') is span('b',url='x'))
+      with span('a') as s:
+         s.set(bytes=1)
+      self.assertEqual(_work(3),6)
+      self.assertEqual(new_track('connection'),None)
+      add_span('dns',0.,1.)
+
+class TraceTest(unittest.TestCase):
+   def setUp(self):
+      self.tmp = tempfile.mkdtemp()
+      self.filename = os.path.join(self.tmp,'run.json')
+      self.tracer = enable(self.filename)
+
+   def tearDown(self):
+      trace_events._tracer = None
+      atexit._exithandlers.remove((self.tracer.save,(),{}))   # nothing left to save at exit
+      shutil.rmtree(self.tmp)
+
+   def trace(self):
+      self.tracer.save()
+      self.assertEqual(os.listdir(self.tmp),['run.json'])      # no .tmp left
+      return json.load(open(self.filename))
+
+   def test_spans(self):
+      self.assertTrue(enabled())
+      with span('outer',url='http://a.org/f'):
+         self.assertEqual(_work(3),6)
+         time.sleep(0.002)
+      try:
+         with span('failing'):
+            raise ValueError('bad')
+      except ValueError:
+         pass
+      events = [e for e in self.trace()['traceEvents'] if e['ph'] == 'X']
+      self.assertEqual([e['name'] for e in events],['outer','work','inner','failing'])
+      outer, work, inner, failing = events
+      self.assertEqual(outer['args'],{'url': 'http://a.org/f'})
+      self.assertEqual(inner['args'],{'value': 3, 'done': True})
+      self.assertFalse('args' in work)
+      self.assertEqual(failing['args'],{'error': 'ValueError: bad'})
+      for parent, child in [(outer,work),(work,inner)]:
+         self.assertTrue(parent['ts'] <= child['ts'])
+         self.assertTrue(child['ts']+child['dur'] <= parent['ts']+parent['dur'])
+      self.assertEqual(set(e['tid'] for e in events),set([threading.current_thread().ident]))
+
+   def test_rows(self):
+      thread = threading.Thread(target=_work,args=(1,),name='worker')
+      thread.start()
+      thread.join()
+      tid = new_track('connection')
+      self.assertEqual(tid,TRACK_BASE+1)
+      start = time.time()
+      add_span('connect',start,start+0.5,tid,host='a.org')
+      trace = self.trace()
+      names = dict((e['tid'],e['args']['name']) for e in trace['traceEvents'] if e['ph'] == 'M')
+      self.assertEqual(names[tid],'connection (1)')
+      self.assertEqual(names[thread.ident],'worker')
+      connect = [e for e in trace['traceEvents'] if e['name'] == 'connect'][0]
+      self.assertEqual((connect['tid'],connect['args']),(tid,{'host': 'a.org'}))
+      self.assertTrue(abs(connect['dur']-500000) <= 1)
+      self.assertEqual(trace['displayTimeUnit'],'ms')
+
+if __name__ == '__main__':
+   unittest.main()
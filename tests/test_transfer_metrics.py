@@ -0,0 +1,118 @@
+from __future__ import print_function, division
+import os,json,shutil,tempfile,unittest
+from transfer_metrics import TransferMetrics
+from http_retrieve import Session
+from download_queue import DownloadQueue, get_options, retrieve_options
+from standin_server import StandinServer
+
+def _events(path):
+   return [json.loads(line) for line in open(path)]
+
+def _samples(path):
+   """
+   Samples of a Prometheus text file, as a dict of 'name{labels}' to value
+   """
+   samples = {}
+   for line in open(path).read().splitlines():
+      if line and line[0] != '#':
+         name, value = line.rsplit(' ',1)
+         samples[name] = float(value)
+   return samples
+
+class MetricsTest(unittest.TestCase):
+   def setUp(self):
+      self.tmp = tempfile.mkdtemp()
+      self.events = os.path.join(self.tmp,'events.jsonl')
+      self.textfile = os.path.join(self.tmp,'uavsar.prom')
+
+   def tearDown(self):
+      shutil.rmtree(self.tmp)
+
+class TransferMetricsTest(MetricsTest):
+   def test_run(self):
+      metrics = TransferMetrics(self.events,self.textfile)
+      metrics.begin(2,3000)
+      transfer = metrics.transfer('http://a.org/line/one.mlc','one.mlc')
+      transfer.logged_in(0.25)
+      transfer.retry(IOError('reset'))
+      transfer.count(1000)
+      transfer.count(500)
+      transfer.finish('done')
+      metrics.transfer('http://b.org/line/two.mlc','two.mlc').finish('failed')
+      metrics.end()
+
+      events = _events(self.events)
+      self.assertEqual([e['event'] for e in events],['run_start','start','login','retry','finish',
+                                                     'start','finish','run_end'])
+      self.assertEqual((events[0]['files'],events[0]['bytes']),(2,3000))
+      self.assertEqual((events[3]['attempt'],events[3]['error']),(1,'reset'))
+      finish = events[4]
+      self.assertEqual((finish['url'],finish['file'],finish['status']),
+                       ('http://a.org/line/one.mlc','one.mlc','done'))
+      self.assertEqual((finish['bytes'],finish['retries'],finish['login_seconds']),(1500,1,0.25))
+      self.assertTrue(finish['ttfb'] >= 0 and finish['mb_per_s'] > 0)
+      self.assertEqual((events[6]['status'],events[6]['ttfb'],events[6]['mb_per_s']),('failed',None,None))
+      self.assertEqual((events[7]['files'],events[7]['failed'],events[7]['bytes']),(2,1,1500))
+
+      samples = _samples(self.textfile)
+      self.assertEqual(samples['uavsar_download_bytes_total{host="a.org"}'],1500)
+      self.assertEqual(samples['uavsar_download_bytes_total{host="b.org"}'],0)
+      self.assertEqual(samples['uavsar_download_files_total{host="a.org",status="done"}'],1)
+      self.assertEqual(samples['uavsar_download_files_total{host="b.org",status="failed"}'],1)
+      self.assertEqual(samples['uavsar_download_retries_total{host="a.org"}'],1)
+      self.assertEqual(samples['uavsar_download_ttfb_seconds_count{host="a.org"}'],1)
+      self.assertEqual(samples['uavsar_download_ttfb_seconds_count{host="b.org"}'],0)
+      self.assertTrue('uavsar_run_duration_seconds' in samples)
+      self.assertEqual(sorted(os.listdir(self.tmp)),['events.jsonl','uavsar.prom'])   # no .tmp left
+
+   def test_events_appended(self):
+      for run in range(2):
+         metrics = TransferMetrics(self.events)
+         metrics.begin(0)
+         metrics.end()
+      self.assertEqual([e['event'] for e in _events(self.events)],['run_start','run_end']*2)
+      self.assertFalse(os.path.exists(self.textfile))
+
+class QueueMetricsTest(MetricsTest):
+   def setUp(self):
+      MetricsTest.setUp(self)
+      os.makedirs(os.path.join(self.tmp,'data','UA_line'))
+      fid = open(os.path.join(self.tmp,'data','UA_line','line.mlc'),'wb')
+      fid.write(os.urandom(100000))
+      fid.close()
+      self.server = StandinServer(os.path.join(self.tmp,'data'))
+      self.base = self.server.start() + '/UA_line/'
+      self.session = Session('user','pass')
+
+   def tearDown(self):
+      self.session.close()
+      self.server.stop()
+      MetricsTest.tearDown(self)
+
+   def run_queue(self,engine):
+      args, opts = get_options(['--events',self.events,'--prometheus',self.textfile,'--engine',engine,
+                                '--retries','0'])
+      queue = DownloadQueue(session=self.session,**retrieve_options(opts))
+      for name in ['line.mlc','missing.mlc']:
+         queue.add(self.base+name,filename=os.path.join(self.tmp,engine+'_'+name))
+      return queue.run()
+
+   def check(self,engine):
+      self.assertEqual(self.run_queue(engine),[os.path.join(self.tmp,engine+'_line.mlc'),None])
+      finish = dict((e['url'].split('/')[-1],e) for e in _events(self.events) if e['event'] == 'finish')
+      self.assertEqual((finish['line.mlc']['status'],finish['line.mlc']['bytes']),('done',100000))
+      self.assertEqual(finish['missing.mlc']['status'],'failed')
+      samples = _samples(self.textfile)
+      self.assertEqual([value for name,value in samples.items()
+                        if name.startswith('uavsar_download_bytes_total')],[100000])
+      self.assertEqual(sum(value for name,value in samples.items()
+                           if name.startswith('uavsar_download_files_total') and 'failed' in name),1)
+
+   def test_threads(self):
+      self.check('threads')
+
+   def test_async(self):
+      self.check('async')
+
+if __name__ == '__main__':
+   unittest.main()
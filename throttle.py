@@ -0,0 +1,198 @@
+"""
+throttle.py  :  Bandwidth limits shared by all downloads of a run
+
+A :class:`Throttle` holds a token bucket for the total rate and one for each
+host.  Every block read from the network is charged to both buckets and the
+reader waits until the debt is paid off, so concurrent transfers take turns
+block by block and each gets an equal share of the allowed rate.  While a limit
+is in force, reads are cut into small blocks so that a file that has just started
+(e.g. the .ann) is not left waiting behind the large blocks of the rasters.
+
+The limits may be changed while downloads run, with :meth:`Throttle.set_rate`
+or by editing the rate file given with ``--rate-file``; the file is read again
+whenever it changes and holds lines such as::
+
+   rate 20
+   host-rate 10
+
+(MB/s; 0 removes a limit, lines starting with # are ignored).  A limit the file
+does not set stays as given with ``--rate`` or ``--host-rate``.
+
+Every block is counted whether or not a limit is in force, so the bytes actually
+transferred by a run (not those linked from the cache or resumed) are in
+:attr:`Throttle.transferred`.
+
+Options
+-------
+   --rate MB        :  limit on the total download rate in MB/s [no limit]
+   --host-rate MB   :  limit on the download rate from any one host in MB/s [no limit]
+   --rate-file FILE :  file holding the limits, re-read when it changes
+
+See Also
+--------
+:ref:`http_retrieve`, :ref:`download_queue`
+"""
+from __future__ import print_function, division
+import os,time,threading
+from http_retrieve import say
+
+__title__      = 'throttle.py'
+__author__     = 'UAVSAR_WebPy contributors'
+__email__      = ''
+__created__    = 'October 2026'
+__modified__   = ''
+__version__    = '1.0'
+__status__     = 'Development'
+__conditions__ = 'Use at your own risk.'
+__license__    = """
+Copyright (C) 2026   UAVSAR_WebPy contributors
+--------------------------------------------------------------------
+GNU Licensed
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+--------------------------------------------------------------------
+"""
+
+QUANTUM = 64 << 10
+POLL_INTERVAL = 2.
+
+###==============================================================================###
+class Throttle():
+   """
+   Global and per-host download rate limits
+
+   Parameters
+   ----------
+   rate      :  total rate in bytes per second (None for no limit) [None]
+   host_rate :  rate from each host in bytes per second (None for no limit) [None]
+   rate_file :  file with ``rate`` and ``host-rate`` lines in MB/s, re-read when it
+                changes; they override rate and host_rate [None]
+   """
+   def __init__(self,rate=None,host_rate=None,rate_file=None):
+      self.rate_file = rate_file
+      self._given = {'rate': rate, 'host-rate': host_rate}
+      self._total = TokenBucket(rate)
+      self._hosts = {}
+      self._host_rate = host_rate
+      self._lock = threading.Lock()
+      self._stamp, self._checked = None, 0.
+      self.transferred = 0
+      self._poll()
+
+   def set_rate(self,rate=None,host_rate=None):
+      """
+      Change the limits (bytes per second, None for no limit) of the running downloads
+      """
+      self._lock.acquire()
+      try:
+         self._total.set_rate(rate)
+         self._host_rate = host_rate
+         for bucket in self._hosts.values():
+            bucket.set_rate(host_rate)
+      finally:
+         self._lock.release()
+
+   def limited(self):
+      return bool(self._total.rate or self._host_rate)
+
+   def blocksize(self,blocksize):
+      """
+      Size of the next read: blocksize, or a small block while a limit is in force
+      """
+      return min(blocksize,QUANTUM) if self.limited() else blocksize
+
+   def take(self,host,nbytes):
+      """
+      Charge nbytes just read from host; returns the seconds to wait before reading again
+      """
+      self._poll()
+      self._lock.acquire()
+      try:
+         self.transferred += nbytes
+         if not self.limited(): return 0.
+         now = time.time()
+         bucket = self._hosts.get(host)
+         if bucket is None:
+            bucket = self._hosts[host] = TokenBucket(self._host_rate)
+         return max(self._total.take(nbytes,now),bucket.take(nbytes,now))
+      finally:
+         self._lock.release()
+
+   def wait(self,host,nbytes):
+      """
+      Charge nbytes read from host and sleep until the limits allow more
+      """
+      delay = self.take(host,nbytes)
+      if delay > 0:
+         time.sleep(delay)
+
+   def _poll(self):
+      """
+      Re-read the rate file if it changed (at most every POLL_INTERVAL seconds)
+      """
+      if self.rate_file is None or time.time() - self._checked < POLL_INTERVAL: return
+      first, self._checked = self._checked == 0., time.time()
+      try:
+         stamp = os.path.getmtime(self.rate_file)
+         if stamp == self._stamp: return
+         self._stamp = stamp
+         limits = dict(self._given)
+         for line in open(self.rate_file):
+            fields = line.split()
+            if len(fields) < 2 or fields[0][0] == '#' or fields[0] not in limits: continue
+            limits[fields[0]] = float(fields[1])*(1 << 20) or None
+      except (OSError,IOError), e:  # e.g. while the file is being replaced
+         if first: say('Cannot read the rate file (no limits from it until it can be): %s' % e)
+         return
+      except ValueError, e:        # reported once for every version of the file
+         say('Invalid line in the rate file %s, limits left as they were: %s' % (self.rate_file,e))
+         return
+      self.set_rate(limits['rate'],limits['host-rate'])
+
+###-------------------------------------------------------------------------------###
+class TokenBucket():
+   """
+   Token bucket filled at rate bytes per second and holding at most burst bytes
+
+   Taking more tokens than are in the bucket leaves it in debt; the taker waits
+   until the debt is paid off, which makes concurrent takers line up in turn.
+   """
+   def __init__(self,rate=None,burst=None):
+      self.rate, self.burst = None, 0.
+      self.tokens, self.stamp = 0., time.time()
+      self.set_rate(rate,burst)
+
+   def set_rate(self,rate,burst=None):
+      self._refill(time.time())
+      self.rate = rate
+      self.burst = burst if burst is not None else (max(QUANTUM,rate/4.) if rate else 0.)
+      self.tokens = min(self.tokens,self.burst) if rate else 0.
+
+   def take(self,nbytes,now=None):
+      """
+      Take nbytes; returns the seconds until the bucket is out of debt
+      """
+      if not self.rate: return 0.
+      if now is None: now = time.time()
+      self._refill(now)
+      self.tokens -= nbytes
+      return max(0.,-self.tokens/self.rate)
+
+   def _refill(self,now):
+      if self.rate:
+         self.tokens = min(self.burst,self.tokens + (now-self.stamp)*self.rate)
+      self.stamp = now
+
+###-------------------------------------------------------------------------------###
@@ -0,0 +1,268 @@
+"""
+tiled_raster.py  :  Compressed, tiled storage of UAVSAR products
+
+A product stored row after row has to be read whole to get a column profile or
+a small window.  A .tiles file holds it instead as square tiles (256 x 256
+samples), each compressed with zlib, with an index of where each tile is, so a
+window costs the tiles it touches and the file takes a fraction of the space
+(most of all for .cor, .unw, and the ground-projected products, whose no-data
+areas compress to almost nothing).
+
+The file is written in one pass, as the rows arrive: the download scripts write
+it while a product is downloaded with ``--convert tile`` (or ``tile-only``, which
+keeps the .tiles alone, see :ref:`stream_stage`),
+and :func:`tile_raster` converts a product already on disk.  :func:`raster_reader.open_raster`
+opens a .tiles file as a :class:`TiledRaster`, which reads like a :class:`raster_reader.Raster`::
+
+   >>> from raster_reader import open_raster
+   >>> cor = open_raster('SanAnd_08503_09083-008_10027-003_0174d_s01_L090HH_01.cor.grd.tiles')
+   >>> cor.shape, cor.dtype
+   ((5928, 6336), dtype('<f4'))
+   >>> block = cor.read(rows=(1000,1512),cols=(2000,2512))
+   >>> profile = cor[:,3000]
+
+Notes
+-----
+* Layout:  'UAVTILES', the compressed tiles in row-major tile order, the index as
+   JSON (rows, cols, dtype, tile, geo, and the offset and length of each tile),
+   the offset of the index as a little-endian 8-byte integer, and 'UAVTILES' again
+
+* The file describes itself: no .ann is needed to read it
+
+See Also
+--------
+:ref:`raster_reader`, :ref:`stream_stage`
+"""
+from __future__ import print_function, division
+import os,json,struct,zlib
+import numpy as np
+from raster_reader import open_raster, index_window, clip_window
+
+__title__      = 'tiled_raster.py'
+__author__     = 'UAVSAR_WebPy contributors'
+__email__      = ''
+__created__    = 'October 2026'
+__modified__   = ''
+__version__    = '1.0'
+__status__     = 'Development'
+__conditions__ = 'Use at your own risk.'
+__license__    = """
+Copyright (C) 2026   UAVSAR_WebPy contributors
+--------------------------------------------------------------------
+GNU Licensed
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+--------------------------------------------------------------------
+"""
+
+MAGIC = 'UAVTILES'
+TRAILER = struct.Struct('<Q8s')
+TILE = 256          # rows and columns per tile
+LEVEL = 6           # zlib compression level
+CACHED_TILES = 64   # decompressed tiles kept by a TiledRaster
+
+###==============================================================================###
+class TileWriter():
+   """
+   Write a raster to an open file as compressed tiles, one band of rows at a time
+
+   Parameters
+   ----------
+   fid          :  file opened for binary writing
+   rows, cols   :  dimensions of the raster
+   dtype        :  numpy dtype of the samples
+   geo          :  (first latitude, first longitude, latitude step, longitude step) or None
+   tile         :  rows and columns per tile [256]
+   level        :  zlib compression level [6]
+
+   Rows are passed to :meth:`write` in order, any number at a time; :meth:`close`
+   writes the index (and does not close fid).
+   """
+   def __init__(self,fid,rows,cols,dtype,geo=None,tile=TILE,level=LEVEL):
+      self.fid, self.rows, self.cols, self.dtype = fid, rows, cols, np.dtype(dtype)
+      self.geo, self.tile, self.level = geo, tile, level
+      self.offsets, self.lengths = [], []
+      self.written = 0
+      self._band = np.empty((min(tile,rows),cols),dtype=self.dtype)
+      self._nband = 0
+      fid.write(MAGIC)
+      self._position = len(MAGIC)
+
+   def write(self,rows):
+      """
+      Append the rows (an array with cols columns) to the raster
+      """
+      rows = np.asarray(rows,dtype=self.dtype).reshape(-1,self.cols)
+      if self.written + len(rows) > self.rows:
+         raise ValueError('%d rows written to a raster of %d' % (self.written+len(rows),self.rows))
+      i = 0
+      while i < len(rows):
+         n = min(len(rows)-i,len(self._band)-self._nband)
+         self._band[self._nband:self._nband+n] = rows[i:i+n]
+         self._nband += n
+         self.written += n
+         i += n
+         if self._nband == len(self._band) or self.written == self.rows:
+            self._flush()
+
+   def close(self):
+      """
+      Write the index; all the rows must have been written
+      """
+      if self.written != self.rows:
+         raise ValueError('%d of %d rows written' % (self.written,self.rows))
+      index = json.dumps({'rows': self.rows, 'cols': self.cols, 'dtype': self.dtype.str,
+                          'tile': self.tile, 'geo': self.geo, 'codec': 'zlib',
+                          'offsets': self.offsets, 'lengths': self.lengths})
+      self.fid.write(index)
+      self.fid.write(TRAILER.pack(self._position,MAGIC))
+
+   def _flush(self):
+      band = self._band[:self._nband]
+      for c in range(0,self.cols,self.tile):
+         data = zlib.compress(np.ascontiguousarray(band[:,c:c+self.tile]).tostring(),self.level)
+         self.fid.write(data)
+         self.offsets.append(self._position)
+         self.lengths.append(len(data))
+         self._position += len(data)
+      self._nband = 0
+
+###==============================================================================###
+class TiledRaster(object):
+   """
+   A .tiles file, read like a :class:`raster_reader.Raster`
+
+   Parameters
+   ----------
+   filename :  .tiles file
+   cached   :  decompressed tiles kept in memory [64]
+
+   Attributes
+   ----------
+   shape    :  (rows, cols)
+   dtype    :  numpy dtype of the samples
+   geo      :  (first latitude, first longitude, latitude step, longitude step) of a
+               ground-projected raster, None otherwise
+   tile     :  rows and columns per tile
+   """
+   def __init__(self,filename,cached=CACHED_TILES):
+      self.filename = filename
+      self.fid = open(filename,'rb')
+      try:
+         if self.fid.read(len(MAGIC)) != MAGIC:
+            raise IOError(filename+' is not a .tiles file')
+         self.fid.seek(-TRAILER.size,2)
+         start, magic = TRAILER.unpack(self.fid.read(TRAILER.size))
+         end = self.fid.tell() - TRAILER.size
+         if magic != MAGIC:
+            raise IOError(filename+' is incomplete')
+         self.fid.seek(start)
+         index = json.loads(self.fid.read(end-start))
+      except:
+         self.fid.close()
+         raise
+      self.shape = (index['rows'],index['cols'])
+      self.dtype = np.dtype(str(index['dtype']))
+      self.geo = tuple(index['geo']) if index['geo'] is not None else None
+      self.tile = index['tile']
+      self._offsets, self._lengths = index['offsets'], index['lengths']
+      self._tcols = -(-self.shape[1] // self.tile)
+      self.cached = cached
+      self._tiles, self._used, self._tick = {}, {}, 0
+
+   def __getitem__(self,key):
+      bounds, picks = index_window(key,self.shape)
+      return self.read(*bounds)[picks[0]][...,picks[1]]
+
+   def __len__(self):
+      return self.shape[0]
+
+   def read(self,rows=None,cols=None):
+      """
+      The block rows=(first,stop), cols=(first,stop) (all of them if None)
+      """
+      rows = clip_window(rows,self.shape[0])
+      cols = clip_window(cols,self.shape[1])
+      out = np.empty((rows[1]-rows[0],cols[1]-cols[0]),dtype=self.dtype)
+      if out.size == 0: return out
+      t = self.tile
+      for tr in range(rows[0]//t,(rows[1]-1)//t+1):
+         for tc in range(cols[0]//t,(cols[1]-1)//t+1):
+            data = self._get(tr,tc)
+            r0, r1 = max(rows[0],tr*t), min(rows[1],tr*t+data.shape[0])
+            c0, c1 = max(cols[0],tc*t), min(cols[1],tc*t+data.shape[1])
+            out[r0-rows[0]:r1-rows[0],c0-cols[0]:c1-cols[0]] = data[r0-tr*t:r1-tr*t,c0-tc*t:c1-tc*t]
+      return out
+
+   def latlon(self,row,col):
+      """
+      Latitude and longitude of the center of pixel (row, col) of a ground-projected product
+      """
+      if self.geo is None:
+         raise ValueError(self.filename+' is not ground-projected')
+      return self.geo[0] + row*self.geo[2], self.geo[1] + col*self.geo[3]
+
+   def close(self):
+      self.fid.close()
+      self._tiles, self._used = {}, {}
+
+   def _get(self,tr,tc):
+      key = tr*self._tcols + tc
+      self._tick += 1
+      data = self._tiles.get(key)
+      if data is None:
+         self.fid.seek(self._offsets[key])
+         rows = min(self.tile,self.shape[0]-tr*self.tile)
+         data = np.frombuffer(zlib.decompress(self.fid.read(self._lengths[key])),
+                              dtype=self.dtype).reshape(rows,-1)
+         if len(self._tiles) >= self.cached:
+            oldest = min(self._used,key=self._used.get)
+            del self._tiles[oldest], self._used[oldest]
+         self._tiles[key] = data
+      self._used[key] = self._tick
+      return data
+
+###-------------------------------------------------------------------------------###
+def open_tiled(filename):
+   """
+   Open the .tiles file filename; returns a :class:`TiledRaster`
+   """
+   return TiledRaster(filename)
+
+def tile_raster(filename,output=None,tile=TILE,level=LEVEL):
+   """
+   Write the product filename (with its .ann next to it) as a .tiles file
+   [filename.tiles]; returns the name of the output
+   """
+   output = output or filename+'.tiles'
+   raster = open_raster(filename)
+   fid = open(output+'.part','wb')
+   try:
+      writer = TileWriter(fid,raster.shape[0],raster.shape[1],raster.dtype,raster.geo,tile,level)
+      step = max(1,tile)
+      for row in range(0,raster.shape[0],step):
+         writer.write(raster.read((row,row+step)))
+      writer.close()
+   except:
+      fid.close()
+      os.remove(output+'.part')
+      raise
+   fid.close()
+   raster.close()
+   if os.path.exists(output): os.remove(output)
+   os.rename(output+'.part',output)
+   return output
+
+###-------------------------------------------------------------------------------###
@@ -0,0 +1,222 @@
+"""
+trace_events.py  :  Timeline of the phases of a download run, for Chrome or Perfetto
+
+With ``--trace FILE`` the download scripts record a span for every phase of the
+run and write them, when the run ends, as a Chrome trace-event JSON file, to be
+opened in chrome://tracing or https://ui.perfetto.dev::
+
+   $ uavsar_insar_download.py $link --trace run.json
+
+Spans recorded
+--------------
+   main, folder_index, sync_filter, queue   :  the steps of the scripts
+   get_password                             :  reading (or asking for) the credentials
+   http_retrieve                            :  one file, from the first request to the rename
+   probe, login                             :  the HEAD request and the login form round trip
+   dns, connect                             :  name lookup, and TCP (and TLS) connection
+   wait response                            :  request sent until the response headers are in,
+                                               i.e. the network round trip and server think time
+   body                                     :  reading the data of a response
+   checksum, convert finish, cache lookup,
+   backoff                                  :  the smaller steps of a transfer
+
+Each thread is a row of the timeline; the connections of the async engine get
+rows of their own ("connection N") with their connect, wait response, and body
+spans.  Spans carry the URL (and bytes, status, or error where known) as args.
+
+Notes
+-----
+* When tracing is off :func:`span` returns a shared object that does nothing, so
+   the cost is one global lookup per phase
+
+* The dns span resolves the host name before the connection is opened, so that
+   the connect span that follows holds little more than TCP and TLS
+
+* Times are in microseconds from the start of tracing; the file is written at
+   exit, also when the run ends in an error
+
+See Also
+--------
+:ref:`http_retrieve`, :ref:`transfer_metrics`
+"""
+from __future__ import print_function, division
+import os,sys,time,json,atexit,threading,functools
+
+__title__      = 'trace_events.py'
+__author__     = 'UAVSAR_WebPy contributors'
+__email__      = ''
+__created__    = 'October 2026'
+__modified__   = ''
+__version__    = '1.0'
+__status__     = 'Development'
+__conditions__ = 'Use at your own risk.'
+__license__    = """
+Copyright (C) 2026   UAVSAR_WebPy contributors
+--------------------------------------------------------------------
+GNU Licensed
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+--------------------------------------------------------------------
+"""
+
+TRACK_BASE = 1 << 20   # tids of the rows that are not threads (async connections)
+
+_tracer = None
+
+###==============================================================================###
+class Tracer():
+   """
+   Collects trace events and writes them to filename with :meth:`save`
+   """
+   def __init__(self,filename):
+      self.filename = filename
+      self.origin = time.time()
+      self.pid = os.getpid()
+      self.events = []
+      self._names = {}
+      self._tracks = 0
+      self._lock = threading.Lock()
+
+   def add(self,name,start,end,tid=None,args=None):
+      """
+      Record a span from start to end (Unix seconds) on the row tid [this thread]
+      """
+      if tid is None:
+         thread = threading.current_thread()
+         tid = thread.ident
+         if tid not in self._names: self._name(tid,thread.name)
+      event = {'name': name, 'ph': 'X', 'pid': self.pid, 'tid': tid,
+               'ts': int((start-self.origin)*1.e6), 'dur': max(0,int((end-start)*1.e6))}
+      if args: event['args'] = args
+      self.events.append(event)  # list.append is atomic
+
+   def track(self,name):
+      """
+      A new row of the timeline called name (and its number); returns its tid
+      """
+      self._lock.acquire()
+      try:
+         self._tracks += 1
+         tid = TRACK_BASE + self._tracks
+      finally:
+         self._lock.release()
+      self._name(tid,'%s (%d)' % (name,tid-TRACK_BASE))
+      return tid
+
+   def save(self):
+      """
+      Write the trace-event JSON file
+      """
+      meta = [{'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'tid': 0,
+               'args': {'name': os.path.basename(sys.argv[0]) or 'python'}}]
+      meta += [{'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid, 'args': {'name': name}}
+               for tid, name in sorted(self._names.items())]
+      tmp = '%s.%d.tmp' % (self.filename,self.pid)
+      fid = open(tmp,'w')
+      try:
+         json.dump({'traceEvents': meta + sorted(self.events,key=lambda e: (e['ts'],-e['dur'])),
+                    'displayTimeUnit': 'ms',
+                    'otherData': {'command': ' '.join(sys.argv),
+                                  'started': time.strftime('%Y-%m-%dT%H:%M:%S',
+                                                           time.localtime(self.origin))}},fid)
+      finally:
+         fid.close()
+      os.rename(tmp,self.filename)
+
+   def _name(self,tid,name):
+      self._lock.acquire()
+      self._names[tid] = name
+      self._lock.release()
+
+###-------------------------------------------------------------------------------###
+class _Span():
+   """
+   Span recorded from the start to the end of a with block; args can be added
+   while it runs with :meth:`set`
+   """
+   def __init__(self,tracer,name,args):
+      self.tracer, self.name, self.args = tracer, name, args
+
+   def __enter__(self):
+      self.start = time.time()
+      return self
+
+   def __exit__(self,kind,error,tb):
+      if error is not None and kind is not GeneratorExit:
+         self.args['error'] = '%s: %s' % (kind.__name__,error)
+      self.tracer.add(self.name,self.start,time.time(),args=self.args)
+      return False
+
+   def set(self,**args):
+      self.args.update(args)
+
+class _NoSpan():
+   def __enter__(self):
+      return self
+
+   def __exit__(self,kind,error,tb):
+      return False
+
+   def set(self,**args):
+      pass
+
+_NO_SPAN = _NoSpan()
+
+###-------------------------------------------------------------------------------###
+def enable(filename):
+   """
+   Start tracing; the trace is written to filename at exit
+   """
+   global _tracer
+   _tracer = Tracer(filename)
+   atexit.register(_tracer.save)
+   return _tracer
+
+def enabled():
+   return _tracer is not None
+
+def span(name,**args):
+   """
+   Context manager recording the phase name (with args) when tracing is on
+   """
+   if _tracer is None: return _NO_SPAN
+   return _Span(_tracer,name,args)
+
+def traced(name):
+   """
+   Decorator recording every call of a function as a span called name
+   """
+   def decorate(function):
+      @functools.wraps(function)
+      def wrapper(*args,**kwargs):
+         if _tracer is None: return function(*args,**kwargs)
+         with _Span(_tracer,name,{}):
+            return function(*args,**kwargs)
+      return wrapper
+   return decorate
+
+def add_span(name,start,end,tid=None,**args):
+   """
+   Record a span timed by the caller (Unix seconds), e.g. by an event loop
+   """
+   if _tracer is not None: _tracer.add(name,start,end,tid,args)
+
+def new_track(name):
+   """
+   tid of a new row of the timeline called name (None when tracing is off)
+   """
+   return _tracer.track(name) if _tracer is not None else None
+
+###-------------------------------------------------------------------------------###
@@ -0,0 +1,369 @@
+"""
+transfer_metrics.py  :  Per-transfer metrics, event log, and progress of a download run
+
+Every file downloaded through a :class:`download_queue.DownloadQueue` that was given
+a :class:`TransferMetrics` (the ``--events``, ``--prometheus``, and ``--progress``
+options of the download scripts) is followed from start to end: bytes, time to the
+first byte of data, time spent logging in, throughput, retries, and final status.
+
+Options
+-------
+   --events FILE      :  append one JSON object per line for every event of the run
+   --prometheus FILE  :  write a summary of the run in the Prometheus text format
+                         (for the textfile collector of node_exporter)
+   --progress         :  show the total bytes, rate, and time left on one line
+
+Notes
+-----
+* Events have the fields event, time (Unix seconds), and, for transfers, url:
+
+   ============  ==============================================================
+   run_start     files, bytes expected (null if a size is unknown)
+   start         file
+   login         seconds
+   retry         attempt, error
+   finish        file, status (done, cached, failed), bytes, seconds, ttfb,
+                 login_seconds, retries, mb_per_s
+   run_end       files, failed, bytes, seconds, logins, login_seconds
+   ============  ==============================================================
+
+* ttfb is the time from the start of a transfer to its first byte of data, so it
+   includes any login and retries before it; bytes counts only what came over
+   the network (not what a resumed transfer already had)
+
+* The Prometheus file is written when the run ends, to a temporary name that is
+   then renamed, so a collector never reads half of it.  Its metrics are labeled
+   by host, to spot slow mirrors: uavsar_download_bytes_total,
+   uavsar_download_files_total (also by status), uavsar_download_retries_total,
+   uavsar_download_seconds_total, uavsar_download_throughput_bytes_per_second,
+   uavsar_download_ttfb_seconds (a summary with quantiles), uavsar_login_seconds,
+   uavsar_run_duration_seconds, and uavsar_run_end_timestamp_seconds
+
+* Without a terminal, --progress prints a progress line every 10 s instead
+
+See Also
+--------
+:ref:`download_queue`, :ref:`http_retrieve`
+"""
+from __future__ import print_function, division
+import os,sys,time,json,threading,urlparse
+from http_retrieve import say, set_status
+
+__title__      = 'transfer_metrics.py'
+__author__     = 'UAVSAR_WebPy contributors'
+__email__      = ''
+__created__    = 'October 2026'
+__modified__   = ''
+__version__    = '1.0'
+__status__     = 'Development'
+__conditions__ = 'Use at your own risk.'
+__license__    = """
+Copyright (C) 2026   UAVSAR_WebPy contributors
+--------------------------------------------------------------------
+GNU Licensed
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+--------------------------------------------------------------------
+"""
+
+PROGRESS_INTERVAL = 0.5   # seconds between redraws of the progress line
+LOG_INTERVAL = 10.        # seconds between progress lines without a terminal
+RATE_WINDOW = 10.         # seconds over which the current rate is measured
+QUANTILES = (0.5,0.9,0.99)
+
+###==============================================================================###
+class TransferMetrics():
+   """
+   Metrics of the transfers of one run
+
+   Parameters
+   ----------
+   events   :  file to append JSON-lines events to [None]
+   textfile :  file to write the Prometheus summary to at the end of the run [None]
+   progress :  show a live progress line [False]
+
+   :meth:`transfer` starts following one file; :meth:`begin` and :meth:`end`
+   bracket the run.
+   """
+   def __init__(self,events=None,textfile=None,progress=False):
+      self.textfile, self.progress = textfile, progress
+      self.events = open(events,'a') if events else None
+      self.transfers = []
+      self.expected, self.nfiles = None, 0
+      self.started = None
+      self._lock = threading.Lock()
+      self._samples = []
+      self._stop = threading.Event()
+      self._thread = None
+
+   def begin(self,nfiles,expected=None):
+      """
+      Start of a run of nfiles files holding expected bytes (None if unknown)
+      """
+      self.nfiles, self.expected = nfiles, expected
+      self.started = time.time()
+      self.emit('run_start',files=nfiles,bytes=expected)
+      if self.progress:
+         self._stop.clear()
+         self._thread = threading.Thread(target=self._show)
+         self._thread.daemon = True
+         self._thread.start()
+
+   def transfer(self,url,filename=None):
+      """
+      Start following the download of url; returns its :class:`Transfer`
+      """
+      transfer = Transfer(self,url,filename)
+      self._lock.acquire()
+      self.transfers.append(transfer)
+      self._lock.release()
+      self.emit('start',url=url,file=filename)
+      return transfer
+
+   def end(self,session=None):
+      """
+      End of the run: stop the progress line, log the totals, and write the
+      Prometheus file; session (an :class:`http_retrieve.Session`) gives the logins
+      """
+      if self._thread is not None:
+         self._stop.set()
+         self._thread.join()
+         self._thread = None
+         set_status(None)
+      logins = session.login_seconds if session is not None else []
+      finished = [t for t in self.transfers if t.status is not None]
+      self.emit('run_end',files=len(finished),failed=sum(t.status == 'failed' for t in finished),
+                bytes=sum(t.nbytes for t in self.transfers),seconds=self._elapsed(),
+                logins=len(logins),login_seconds=sum(logins))
+      if self.textfile:
+         self.write_textfile(self.textfile,logins)
+      if self.events is not None:
+         self.events.close()
+         self.events = None
+
+   def emit(self,event,**fields):
+      """
+      Append one event to the events file
+      """
+      if self.events is None: return
+      fields['event'], fields['time'] = event, round(time.time(),6)
+      line = json.dumps(fields,sort_keys=True)
+      self._lock.acquire()
+      try:
+         self.events.write(line+'\n')
+         self.events.flush()
+      finally:
+         self._lock.release()
+
+   ###----------------------------------------------------------------------------###
+   def write_textfile(self,path,logins=()):
+      """
+      Write the summary of the run to path in the Prometheus text format
+      """
+      hosts = {}
+      for t in self.transfers:
+         hosts.setdefault(t.host,[]).append(t)
+      lines = []
+      def metric(name,kind,text,samples):
+         lines.append('# HELP %s %s' % (name,text))
+         lines.append('# TYPE %s %s' % (name,kind))
+         for labels, value in samples:
+            label = ','.join('%s="%s"' % (k,_escape(v)) for k,v in labels)
+            lines.append('%s%s %s' % (name,'{%s}' % label if label else '',_number(value)))
+      metric('uavsar_download_bytes_total','counter','Bytes downloaded.',
+             [((('host',h),),sum(t.nbytes for t in ts)) for h,ts in sorted(hosts.items())])
+      metric('uavsar_download_files_total','counter','Files by final status.',
+             [((('host',h),('status',s)),sum(t.status == s for t in ts))
+              for h,ts in sorted(hosts.items()) for s in sorted(set(t.status for t in ts if t.status))])
+      metric('uavsar_download_retries_total','counter','Retried attempts.',
+             [((('host',h),),sum(t.retries for t in ts)) for h,ts in sorted(hosts.items())])
+      metric('uavsar_download_seconds_total','counter','Seconds spent in transfers.',
+             [((('host',h),),sum(t.seconds() for t in ts)) for h,ts in sorted(hosts.items())])
+      metric('uavsar_download_throughput_bytes_per_second','gauge',
+             'Bytes per second of data transfer, over the transfers that moved data.',
+             [((('host',h),),_throughput(ts)) for h,ts in sorted(hosts.items())])
+      samples = []
+      for h, ts in sorted(hosts.items()):
+         ttfb = sorted(t.ttfb() for t in ts if t.first is not None)
+         for q in QUANTILES:
+            samples.append(((('host',h),('quantile',str(q))),_quantile(ttfb,q)))
+      metric('uavsar_download_ttfb_seconds','summary','Seconds to the first byte of data.',samples)
+      for h, ts in sorted(hosts.items()):
+         ttfb = [t.ttfb() for t in ts if t.first is not None]
+         lines.append('uavsar_download_ttfb_seconds_sum{host="%s"} %s' % (_escape(h),_number(sum(ttfb))))
+         lines.append('uavsar_download_ttfb_seconds_count{host="%s"} %d' % (_escape(h),len(ttfb)))
+      lines.append('# HELP uavsar_login_seconds Seconds spent logging in.')
+      lines.append('# TYPE uavsar_login_seconds summary')
+      lines.append('uavsar_login_seconds_sum %s' % _number(sum(logins)))
+      lines.append('uavsar_login_seconds_count %d' % len(logins))
+      metric('uavsar_run_duration_seconds','gauge','Seconds the run took.',[((),self._elapsed())])
+      metric('uavsar_run_end_timestamp_seconds','gauge','Unix time the run ended.',[((),time.time())])
+      tmp = '%s.%d.tmp' % (path,os.getpid())
+      fid = open(tmp,'w')
+      try:
+         fid.write('\n'.join(lines)+'\n')
+      finally:
+         fid.close()
+      os.rename(tmp,path)
+
+   def progress_line(self):
+      """
+      Totals of the run so far, e.g. '3/12 files  812.4/2048.0 MB  40%  35.2 MB/s  ETA 0:35'
+      """
+      now = time.time()
+      self._lock.acquire()
+      try:
+         nbytes = sum(t.nbytes for t in self.transfers)
+         ndone = sum(t.status is not None for t in self.transfers)
+         active = sum(t.status is None for t in self.transfers)
+         self._samples.append((now,nbytes))
+         while self._samples[0][0] < now - RATE_WINDOW: self._samples.pop(0)
+         t0, b0 = self._samples[0]
+      finally:
+         self._lock.release()
+      rate = (nbytes-b0)/(now-t0) if now > t0 else 0.
+      line = '%d/%d files  ' % (ndone,self.nfiles)
+      if self.expected:
+         line += '%.1f/%.1f MB  %d%%' % (nbytes/1.e6,self.expected/1.e6,
+                                        min(100,100*nbytes//max(1,self.expected)))
+      else:
+         line += '%.1f MB' % (nbytes/1.e6)
+      line += '  %.1f MB/s  %d active' % (rate/1.e6,active)
+      if self.expected and rate > 0:
+         line += '  ETA %s' % _clock(max(0,self.expected-nbytes)/rate)
+      return line
+
+   def _show(self):
+      tty = sys.stdout.isatty()
+      last = time.time()
+      while not self._stop.wait(PROGRESS_INTERVAL if tty else 1.):
+         if tty:
+            set_status(self.progress_line())
+         elif time.time() - last >= LOG_INTERVAL:
+            say('progress: '+self.progress_line())
+            last = time.time()
+
+   def _elapsed(self):
+      return time.time() - self.started if self.started is not None else 0.
+
+###==============================================================================###
+class Transfer():
+   """
+   Metrics of the download of one URL
+
+   Attributes
+   ----------
+   url, filename, host
+   nbytes   :  bytes received
+   retries  :  attempts that were retried
+   login    :  seconds spent logging in during the transfer
+   source   :  'network', or 'cache' for a file linked from the download cache
+   status   :  None while running, then 'done', 'cached', or 'failed'
+   """
+   def __init__(self,metrics,url,filename=None):
+      self.metrics, self.url, self.filename = metrics, url, filename
+      self.host = urlparse.urlsplit(url).netloc
+      self.started, self.first, self.ended = time.time(), None, None
+      self.nbytes, self.retries, self.login, self.status = 0, 0, 0., None
+      self.source = 'network'
+
+   def count(self,nbytes):
+      """
+      nbytes more bytes were received
+      """
+      if self.first is None: self.first = time.time()
+      self.nbytes += nbytes
+
+   def retry(self,error):
+      self.retries += 1
+      self.metrics.emit('retry',url=self.url,attempt=self.retries,error=str(error))
+
+   def logged_in(self,seconds):
+      self.login += seconds
+      self.metrics.emit('login',url=self.url,seconds=seconds)
+
+   def finish(self,status,filename=None):
+      """
+      The transfer ended with status 'done', 'cached', or 'failed'
+      """
+      self.ended, self.status = time.time(), status
+      if filename is not None: self.filename = filename
+      rate = self.rate()
+      self.metrics.emit('finish',url=self.url,file=self.filename,status=status,bytes=self.nbytes,
+                        seconds=self.seconds(),ttfb=self.ttfb(),login_seconds=self.login,
+                        retries=self.retries,mb_per_s=rate/1.e6 if rate is not None else None)
+
+   def seconds(self):
+      return (self.ended or time.time()) - self.started
+
+   def ttfb(self):
+      return self.first - self.started if self.first is not None else None
+
+   def rate(self):
+      """
+      Bytes per second from the first byte to the end (None if no data came)
+      """
+      if self.first is None or self.nbytes == 0: return None
+      return self.nbytes/max((self.ended or time.time()) - self.first,1.e-6)
+
+   def counting(self,throttle):
+      """
+      A throttle that counts the bytes of this transfer and passes them on to throttle
+      """
+      return _CountingThrottle(self,throttle)
+
+###-------------------------------------------------------------------------------###
+class _CountingThrottle():
+   """
+   Stand-in for the :class:`throttle.Throttle` of a transfer that also counts its bytes
+   """
+   def __init__(self,transfer,throttle):
+      self.transfer, self.throttle = transfer, throttle
+
+   def blocksize(self,blocksize):
+      return self.throttle.blocksize(blocksize) if self.throttle is not None else blocksize
+
+   def wait(self,host,nbytes):
+      self.transfer.count(nbytes)
+      if self.throttle is not None: self.throttle.wait(host,nbytes)
+
+   def take(self,host,nbytes):
+      self.transfer.count(nbytes)
+      return self.throttle.take(host,nbytes) if self.throttle is not None else 0.
+
+###-------------------------------------------------------------------------------###
+def _throughput(transfers):
+   moving = [t for t in transfers if t.first is not None and t.nbytes > 0]
+   seconds = sum((t.ended or time.time()) - t.first for t in moving)
+   return sum(t.nbytes for t in moving)/seconds if seconds > 0 else 0.
+
+def _quantile(values,q):
+   if not values: return float('nan')
+   return values[min(len(values)-1,int(q*len(values)))]
+
+def _number(value):
+   if value != value: return 'NaN'
+   return '%d' % value if isinstance(value,(int,long,bool)) else repr(float(value))
+
+def _escape(value):
+   return str(value).replace('\\','\\\\').replace('"','\\"').replace('\n','\\n')
+
+def _clock(seconds):
+   seconds = int(seconds)
+   if seconds >= 3600:
+      return '%d:%02d:%02d' % (seconds//3600,seconds%3600//60,seconds%60)
+   return '%d:%02d' % (seconds//60,seconds%60)
+
+###-------------------------------------------------------------------------------###
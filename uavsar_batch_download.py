@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+
+"""
+uavsar_batch_download.py  :  Download many UAVSAR flight lines (or InSAR pairs) in one run
+
+Usage:
+
+.. code-block:: bash
+
+   $ uavsar_batch_download.py listfile [options]
+
+Parameter
+---------
+   listfile :  text, CSV, or JSON file listing one sample URL per flight line or pair
+
+Options
+-------
+   --out DIR      :  directory in which the flight-line folders are created [.]
+
+   --jobs, --per-host, --segments, --segment-min, --sync, --no-index, --plan, --cache,
+   --cache-size, --engine, --retries, --backoff, --rate, --host-rate, --rate-file,
+   --convert, --lines, --samples, --bbox, --events, --prometheus, --progress, --trace
+                  :  as for :ref:`uavsar_insar_download`
+
+Notes
+-----
+* Every entry is expanded with the URLs class of :ref:`uavsar_insar_download` (InSAR
+   pairs, recognized by the ``NNNNN-NNN_NNNNN-NNN`` flight IDs in the file name) or
+   :ref:`uavsar_polsar_download` (everything else), and all files of all entries are
+   fetched by a single download queue over a single login
+
+* The folders of all entries are indexed (see :ref:`folder_index`) before anything
+   is queued, several at a time, and a folder named by several entries only once
+
+* Text files hold one entry per line: a sample URL followed by the para, type, and/or
+   chan options exactly as they would be given to the download scripts.  Blank lines
+   and lines starting with # are ignored::
+
+   http://uavsar.asfdaac.alaska.edu/UA_SanAnd_08503_09083-008_10027-003_0174d_s01_L090_01/SanAnd_08503_09083-008_10027-003_0174d_s01_L090HH_01.int unw,cor rdr,grd
+   http://uavsar.asfdaac.alaska.edu/UA_SanAnd_08503_10071_003_100928_L090_CX_01/SanAnd_08503_10071_003_100928_L090HHHH_CX_01.mlc mlc hhhh
+
+* CSV files (extension .csv) have a header row with a url column and optional para,
+   type, chan, and kind (insar or polsar) columns; quote lists such as "mlc,grd"
+
+* JSON files (extension .json) hold a list of objects with the same keys as the CSV
+   columns; para, type, and chan may be strings or lists
+
+* Entries with invalid options are reported and skipped
+
+See Also
+--------
+:ref:`uavsar_insar_download`, :ref:`uavsar_polsar_download`, :ref:`download_queue`
+"""
+from __future__ import print_function, division
+import sys,os,re,csv,json
+from http_retrieve import get_password, Session
+from download_queue import (DownloadQueue, retrieve_options, DOWNLOAD_FLAGS, get_options, sync_filter,
+                            _path)
+from line_manifest import LineManifest
+from folder_index import FolderIndex, folder_indexes
+from download_plan import DownloadPlan
+from trace_events import traced, enable
+import uavsar_insar_download, uavsar_polsar_download
+
+__title__      = 'uavsar_batch_download.py'
+__author__     = 'UAVSAR_WebPy contributors'
+__email__      = ''
+__created__    = 'October 2026'
+__modified__   = ''
+__version__    = '1.0'
+__status__     = 'Development'
+__conditions__ = 'Use at your own risk.'
+__license__    = """
+Copyright (C) 2026   UAVSAR_WebPy contributors
+--------------------------------------------------------------------
+GNU Licensed
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+--------------------------------------------------------------------
+"""
+
+BATCH_FLAGS = dict(DOWNLOAD_FLAGS,out=_path)
+INSAR_PATTERN = re.compile(r'_\d{5}-\d{3}_\d{5}-\d{3}_')
+
+###==============================================================================###
+@traced('main')
+def main(args,opts=None):
+   if opts is None: opts = {}
+   outdir = opts.pop('out','.')
+   sync = opts.pop('sync',False)
+   use_index = not opts.pop('no_index',False)
+   entries = read_list(args[0])
+   username, password = get_password()
+   session = Session(username=username,password=password)
+
+   expanded = []
+   for lineno, entry in entries:
+      urls = expand_entry(entry)
+      if urls is None:
+         print('Skipping entry %d of %s: %s' % (lineno,args[0],entry.get('url')))
+         continue
+      expanded.append(urls)
+   if use_index:
+      indexes = folder_indexes([(urls.urllead,urls.filenames) for urls in expanded],session,
+                               jobs=opts.get('jobs',4))
+
+   todo, filenames, manifests, sizes = [], [], [], []
+   queued, nlines = set(), len(expanded)
+   for urls in expanded:
+      folder = os.path.join(outdir,_local_folder(urls))
+      if not os.path.exists(folder):
+         os.makedirs(folder)
+      manifest = LineManifest(folder)
+      index = indexes[urls.urllead] if use_index else FolderIndex(urls.urllead)
+      found, missing = index.select(urls.filenames)
+      for fname in missing:
+         print('Not on server: '+urls.urllead+fname)
+      for fname in found:
+         filename = os.path.join(folder,fname)
+         if filename in queued: continue
+         queued.add(filename)
+         todo.append(urls.urllead+fname)
+         filenames.append(filename)
+         manifests.append(manifest)
+         sizes.append(index.size(fname))
+
+   if sync:
+      stale = set(sync_filter(todo,session,manifests,jobs=opts.get('jobs',4)))
+      keep = [i for i in range(len(todo)) if todo[i] in stale]
+      todo = [todo[i] for i in keep]
+      filenames = [filenames[i] for i in keep]
+      manifests = [manifests[i] for i in keep]
+      sizes = [sizes[i] for i in keep]
+
+   if opts.pop('plan',False):
+      plan = DownloadPlan(todo,filenames,sizes,session,jobs=opts.get('jobs',4))
+      session.close()
+      sys.exit(0 if plan.report() else 1)
+   unknown = sizes.count(None)
+   print('Queued %d files (%.1f MB%s) from %d entries\n' % (len(todo),
+         sum(size for size in sizes if size is not None)/1.e6,
+         ', %d of unknown size' % unknown if unknown else '',nlines))
+   queue = DownloadQueue(session=session,**retrieve_options(opts))
+   for url, filename, manifest, size in zip(todo,filenames,manifests,sizes):
+      queue.add(url,size=size,filename=filename,manifest=manifest)
+   results = queue.run()
+   session.close()
+   nfail = len([r for r in results if r is None])
+   print('\n%d of %d files downloaded' % (len(results)-nfail,len(results)))
+
+###==============================================================================###
+def read_list(listfile):
+   """
+   Read a text, CSV (.csv), or JSON (.json) list of sample URLs
+
+   Returns a list of (entry number, dict) with keys url and, where given, para,
+   type, chan, and kind.  For text files the options after the URL are kept
+   unclassified under the key opts.
+   """
+   entries = []
+   ext = listfile.split('.')[-1].lower()
+   fid = open(listfile)
+   try:
+      if ext == 'json':
+         for i, entry in enumerate(json.load(fid)):
+            entries.append((i+1,entry))
+      elif ext == 'csv':
+         for i, row in enumerate(csv.DictReader(fid)):
+            entry = dict((k.strip().lower(),v.strip()) for k,v in row.items() if k and v)
+            entries.append((i+2,entry))
+      else:
+         for i, line in enumerate(fid):
+            fields = line.split()
+            if len(fields) < 1 or fields[0][0] == '#': continue
+            entries.append((i+1,{'url': fields[0], 'opts': fields[1:]}))
+   finally:
+      fid.close()
+   return entries
+
+###-------------------------------------------------------------------------------###
+def expand_entry(entry):
+   """
+   Build the URLs object (InSAR or PolSAR) for one list entry; None if the entry is invalid
+   """
+   url = entry.get('url')
+   if not url: return None
+   kind = entry.get('kind')
+   if kind is None:
+      kind = 'insar' if INSAR_PATTERN.search(url.split('/')[-1]) else 'polsar'
+   args = [url] + list(entry.get('opts',[]))
+   for key in ['para','type','chan']:
+      value = entry.get(key)
+      if isinstance(value,list): value = ','.join(value)
+      if value: args.append(value)
+   try:
+      if kind == 'insar':
+         para,types,chan = uavsar_insar_download._get_paradigm_channels(args)
+         return uavsar_insar_download.URLs(url,para,types,chan)
+      else:
+         para,chan = uavsar_polsar_download._get_paradigm_channels(args)
+         return uavsar_polsar_download.URLs(url,para,chan)
+   except SystemExit:  # invalid options have already been reported
+      return None
+
+###-------------------------------------------------------------------------------###
+def _local_folder(urls):
+   localfldr = urls.fldr.split('/')[-1]
+   if 'UA_' == localfldr[:3]: localfldr = localfldr[3:]
+   return localfldr
+
+###-------------------------------------------------------------------------------###
+if __name__=='__main__':
+   args, opts = get_options(sys.argv[1:],BATCH_FLAGS)
+   if len(args) != 1:
+      print(__doc__)
+      sys.exit()
+   if opts.get('trace'): enable(opts.pop('trace'))
+   main(args,opts)
@@ -33,6 +33,71 @@ Options
                |  powr  --  get power data (HHHH, VVVV, and HVHV)
                |  chan  --  any of {hhhh, hvhv, vvvv, hhhv, hhvv, hvvv} get data for the corresponding channel 
 
+   --jobs N       :  number of files to download at once [4]
+
+   --per-host N   :  maximum number of files downloaded at once from the data host [4]
+
+   --segments N   :  split each large file into N byte ranges that are downloaded at once [1]
+
+   --segment-min MB  :  smallest file (in MB) that is split into segments [256]
+
+   --sync         :  only download files that are missing locally or have changed on the server
+
+   --no-index     :  do not read the folder listing (or probe the files) to drop products
+                     that do not exist on the server before downloading
+
+   --plan         :  print the size of every file, the disk space still needed, and the
+                     expected duration, then exit without downloading (exit status 1 if
+                     the disk lacks the space needed)
+
+   --cache DIR    :  shared cache of downloaded files; files already in the cache are
+                     linked instead of downloaded [$UAVSAR_CACHE]
+
+   --cache-size GB  :  size limit of the cache, least recently used files are removed first
+
+   --engine NAME  :  threads or async; async runs all transfers from one event loop,
+                     which scales to hundreds of files in flight [threads]
+
+   --retries N    :  retries of a failed file; dropped connections, timeouts, and server
+                     errors (5xx) are retried with exponential backoff [3]
+
+   --backoff SEC  :  delay before the first retry, doubled for every further one [1]
+
+   --rate MB      :  limit on the total download rate in MB/s [no limit]
+
+   --host-rate MB :  limit on the download rate from the data host in MB/s [no limit]
+
+   --rate-file FILE  :  file with ``rate`` and ``host-rate`` lines (MB/s) that is re-read
+                        when it changes, to adjust the limits of a running download
+
+   --convert LIST :  convert the products while they download (e.g. amp-phase,look=4x4);
+                     the stages are listed in :ref:`stream_stage`
+
+   --lines A:B    :  download only azimuth lines A to B-1 of the slant-range products, with
+                     HTTP Range requests; the subset and an .ann describing it are written
+                     to the folder linesA-B (see :ref:`raster_subset`)
+
+   --samples A:B  :  download only range samples A to B-1 of the slant-range products
+
+   --bbox S,N,W,E :  download only the pixels of the ground-projected products (grd
+                     paradigm) inside the box from latitude S to N and longitude W to E,
+                     with HTTP Range requests; the subset and an .ann giving its grid are
+                     written to the folder bboxS_N_W_E
+
+   --events FILE  :  append a JSON line for every transfer event: start, login, retry, and
+                     finish with bytes, time to first byte, throughput, retries, and status
+                     (see :ref:`transfer_metrics`)
+
+   --prometheus FILE  :  write a summary of the run (bytes, files, retries, throughput and
+                     time to first byte per host, login time) for the Prometheus textfile
+                     collector
+
+   --progress     :  show the total bytes, rate, and time left of the run on one line
+
+   --trace FILE   :  write a timeline of the run (credentials, login, DNS, connect, wait for
+                     the server, body of every file) as Chrome trace-event JSON, to open in
+                     chrome://tracing or Perfetto (see :ref:`trace_events`)
+
 Notes
 -----
 * Use a comma separted list (no spaces) for multiple options (e.g. mlc,grd)
@@ -57,7 +122,12 @@ See Also
 from __future__ import print_function, division
 import sys,os
 import numpy as np
-from http_retrieve import http_retrieve, get_password
+from http_retrieve import get_password, Session
+from download_queue import DownloadQueue, retrieve_options, get_options, sync_filter
+from line_manifest import LineManifest
+from folder_index import FolderIndex, folder_index
+from download_plan import DownloadPlan
+from trace_events import traced, enable
 
 __title__      = 'uavsar_polsar_download.py'
 __author__     = 'Brent Minchew'
@@ -89,18 +159,44 @@ GNU Licensed
 """
 
 ###==============================================================================###
-def main(args):
+@traced('main')
+def main(args,opts=None):
+   if opts is None: opts = {}
    para,chan = _get_paradigm_channels(args) 
    urls = URLs(args[0],para,chan)
+   if opts.get('bbox') is not None and 'grd' not in para and 'hgt' not in para:
+      print('Note: --bbox applies to ground-projected products only (grd paradigm)')
    _organize_fldr(urls)
    username, password = get_password()
+   session = Session(username=username,password=password)
+   manifest = LineManifest()
+   if opts.pop('no_index',False):
+      index = FolderIndex(urls.urllead)
+   else:
+      index = folder_index(urls.urllead,session,urls.filenames,jobs=opts.get('jobs',4))
+   filenames, missing = index.select(urls.filenames)
+   for fname in missing:
+      print('Not on server: '+fname)
+   todo = [urls.urllead+fname for fname in filenames]
+   if opts.pop('sync',False):
+      todo = sync_filter(todo,session,manifest,jobs=opts.get('jobs',4))
+   if opts.pop('plan',False):
+      names = [url.split('/')[-1] for url in todo]
+      plan = DownloadPlan(todo,names,[index.size(name) for name in names],session,
+                          jobs=opts.get('jobs',4))
+      session.close()
+      sys.exit(0 if plan.report() else 1)
    print('Files to download:')
-   for fname in urls.filenames:
-      print(urls.urllead+fname)
-   print('\n')
-   for fname in urls.filenames:
-      print('downloading: '+urls.urllead+fname)
-      http_retrieve(urls.urllead+fname, username=username, password=password)
+   for url in todo:
+      print(url)
+   nbytes, unknown = index.total([url.split('/')[-1] for url in todo])
+   print('%d files, %.1f MB%s\n' % (len(todo),nbytes/1.e6,
+         ' (+%d of unknown size)' % unknown if unknown else ''))
+   queue = DownloadQueue(session=session,manifest=manifest,**retrieve_options(opts))
+   for url in todo:
+      queue.add(url,size=index.size(url.split('/')[-1]))
+   queue.run()
+   session.close()
 
 ###==============================================================================###
 def _organize_fldr(urls):
@@ -214,11 +310,12 @@ class URLs():
 
 ###-------------------------------------------------------------------------------###
 if __name__=='__main__':
-   args = sys.argv[1:]
+   args, opts = get_options(sys.argv[1:])
    if len(args) < 1 or len(args) > 3:
       print(__doc__)
       sys.exit()
-   main(args)
+   if opts.get('trace'): enable(opts.pop('trace'))
+   main(args,opts)
 
 
 